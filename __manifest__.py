@@ -11,14 +11,29 @@
     "author": "wilopv",
     "icon": "/inmo_odoo/static/description/icon.png",
     "category": "Bienes raíces",
-    "version": "0.1",
-    "depends": ["base", "calendar"],
+    "version": "0.2",
+    "depends": ["base", "bus", "calendar"],
     "data": [
         "data/event_type_visita_inmobiliaria.xml",
+        "data/catastro_config_data.xml",
+        "data/ir_cron_data.xml",
         "views/inmueble_wizard_views.xml",
+        "views/inmueble_catastro_lote_wizard_views.xml",
         "views/visita_inmueble_views.xml",
         "views/inmueble_views.xml",
+        "views/inmueble_import_wizard_views.xml",
+        "views/inmueble_catastro_callejero_wizard_views.xml",
         "views/inmueble_image_views.xml",
+        "views/foto_lote_wizard_views.xml",
+        "views/inmueble_estadistica_views.xml",
+        "views/visita_historico_views.xml",
+        "views/inmueble_duplicado_views.xml",
+        "views/busqueda_views.xml",
+        "views/visita_lote_wizard_views.xml",
+        "views/catastro_cache_views.xml",
+        "views/catastro_job_views.xml",
+        "views/catastro_sincronizacion_views.xml",
+        "views/metricas_panel_views.xml",
         "security/ir.model.access.csv",
     ],
     "license": "LGPL-3",
@@ -0,0 +1 @@
+from . import feed_portales, metricas
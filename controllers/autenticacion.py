@@ -0,0 +1,18 @@
+import hmac
+
+from odoo.http import request
+from werkzeug.exceptions import Forbidden, NotFound
+
+
+def comprobar_token(parametro, token=None):
+    """Exige el token guardado en el parámetro `parametro`, en la cabecera
+    `Authorization: Bearer <token>` o en el parámetro `token`; si no hay
+    token configurado, la ruta no existe."""
+    esperado = request.env["ir.config_parameter"].sudo().get_param(parametro)
+    if not esperado:
+        raise NotFound()
+    cabecera = request.httprequest.headers.get("Authorization", "")
+    if cabecera.startswith("Bearer "):
+        token = cabecera[len("Bearer ") :]
+    if not token or not hmac.compare_digest(token, esperado):
+        raise Forbidden()
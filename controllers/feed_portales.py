@@ -0,0 +1,100 @@
+from datetime import UTC, datetime
+
+from odoo import SUPERUSER_ID, api, http
+from odoo.http import request
+from werkzeug.exceptions import BadRequest, NotFound
+from werkzeug.http import http_date
+
+from ..models import feed_portales
+from .autenticacion import comprobar_token
+
+
+class FeedPortalesController(http.Controller):
+    """Feed del catálogo para los portales inmobiliarios."""
+
+    @http.route(
+        "/inmo/feed.<any(xml,json):formato>",
+        type="http",
+        auth="public",
+        methods=["GET"],
+        csrf=False,
+        save_session=False,
+    )
+    def feed(self, formato, token=None, since=None, **kwargs):
+        """Requiere el token de `inmo_odoo.feed_token`. Con `since` (fecha
+        ISO en UTC) solo devuelve lo modificado después; responde 304 si el
+        portal ya tiene la versión actual según `If-None-Match` o
+        `If-Modified-Since`."""
+        comprobar_token(feed_portales.PARAM_TOKEN, token)
+        desde = self._desde(since)
+
+        hasta, total = feed_portales.marca(request.env(su=True), desde)
+        etag = feed_portales.etag(formato, desde, hasta, total)
+        cabeceras = [("ETag", f'"{etag}"'), ("Cache-Control", "no-cache")]
+        if hasta:
+            cabeceras.append(("Last-Modified", http_date(hasta)))
+        if self._sin_cambios(etag, hasta):
+            return request.make_response("", headers=cabeceras, status=304)
+
+        base_url = request.env["ir.config_parameter"].sudo().get_param("web.base.url")
+        return request.make_response(
+            self._generar(request.env.registry, formato, desde, hasta, base_url),
+            headers=[("Content-Type", feed_portales.FORMATOS[formato]), *cabeceras],
+        )
+
+    @http.route(
+        "/inmo/feed/foto/<string:checksum>",
+        type="http",
+        auth="public",
+        methods=["GET"],
+        csrf=False,
+        save_session=False,
+    )
+    def foto(self, checksum, **kwargs):
+        """Sirve una foto del feed por su huella. La URL cambia con el
+        contenido, así que los portales pueden guardarla indefinidamente.
+        Solo se sirven fotos de inmuebles publicados: la de un borrador no
+        ha salido en el feed."""
+        if (
+            not request.env["ir.config_parameter"]
+            .sudo()
+            .get_param(feed_portales.PARAM_TOKEN)
+        ):
+            raise NotFound()
+        contenido = feed_portales.foto_publicada(request.env(su=True), checksum)
+        if not contenido:
+            raise NotFound()
+        return (
+            request.env["ir.binary"]
+            ._get_image_stream_from(contenido, "imagen")
+            .get_response(immutable=True)
+        )
+
+    def _desde(self, since):
+        if not since:
+            return None
+        try:
+            desde = datetime.fromisoformat(since)
+        except ValueError as err:
+            raise BadRequest("Fecha 'since' no válida.") from err
+        if desde.tzinfo:
+            desde = desde.astimezone(UTC).replace(tzinfo=None)
+        return desde
+
+    def _sin_cambios(self, etag, hasta):
+        peticion = request.httprequest
+        if peticion.if_none_match:
+            return peticion.if_none_match.contains(etag)
+        if peticion.if_modified_since and hasta:
+            return peticion.if_modified_since >= hasta.replace(
+                microsecond=0, tzinfo=UTC
+            )
+        return False
+
+    @staticmethod
+    def _generar(registro, formato, desde, hasta, base_url):
+        """El cuerpo se envía después de cerrar el cursor de la petición, así
+        que el generador abre el suyo mientras dura la descarga."""
+        with registro.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            yield from feed_portales.exportar(env, formato, desde, hasta, base_url)
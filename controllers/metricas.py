@@ -0,0 +1,29 @@
+from odoo import http
+from odoo.http import request
+
+from ..models import metricas
+from .autenticacion import comprobar_token
+
+
+class MetricasController(http.Controller):
+    """Expone las métricas del proceso en formato de texto de Prometheus."""
+
+    @http.route(
+        "/inmo/metrics",
+        type="http",
+        auth="public",
+        methods=["GET"],
+        csrf=False,
+        save_session=False,
+    )
+    def metricas(self, token=None, **kwargs):
+        """Requiere el token de `inmo_odoo.metricas_token`, en la cabecera
+        `Authorization: Bearer <token>` o en el parámetro `token`; si no hay
+        token configurado, la ruta no existe."""
+        comprobar_token(metricas.PARAM_TOKEN, token)
+
+        metricas.sincronizar(request.env)
+        return request.make_response(
+            metricas.exportar_prometheus(),
+            headers=[("Content-Type", "text/plain; version=0.0.4; charset=utf-8")],
+        )
@@ -0,0 +1,38 @@
+import logging
+
+from odoo import SUPERUSER_ID, api
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+CAMPOS_ANTIGUOS = ["foto", "foto_512", "foto_256", "foto_128"]
+
+
+def migrate(cr, version):
+    """Pasa las imágenes guardadas en cada foto a contenidos compartidos."""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    Attachment = env["ir.attachment"]
+    Foto = env["inmo.inmueble.foto"]
+    Contenido = env["inmo.foto.contenido"]
+
+    adjuntos = Attachment.search(
+        [("res_model", "=", Foto._name), ("res_field", "=", "foto")]
+    )
+    for ids in split_every(100, adjuntos.ids):
+        lote = Attachment.browse(ids)
+        existentes = set(Foto.browse(lote.mapped("res_id")).exists().ids)
+        lote = Attachment.browse(
+            [adjunto.id for adjunto in lote if adjunto.res_id in existentes]
+        )
+        contenidos = Contenido._obtener_o_crear(lote.mapped("datas"))
+        for adjunto, contenido in zip(lote, contenidos, strict=True):
+            Foto.browse(adjunto.res_id).contenido_id = contenido
+        Foto.flush_model()
+        Attachment.invalidate_model()
+
+    Attachment.search(
+        [("res_model", "=", Foto._name), ("res_field", "in", CAMPOS_ANTIGUOS)]
+    ).unlink()
+    _logger.info("Fotos migradas a contenidos compartidos: %s", len(adjuntos))
@@ -1,7 +1,21 @@
 from . import (
+    busqueda,
+    catastro_cache,
     catastro_config,
+    catastro_job,
     catastro_service,
+    catastro_sincronizacion,
+    feed_baja,
+    feed_portales,
+    foto_contenido,
     foto_inmueble,
     inmueble,
+    inmueble_duplicado,
+    inmueble_estadistica,
+    metricas,
+    normalizacion,
+    parametros,
+    res_country_state,
+    visita_historico,
     visita_inmueble,
 )
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Campos del inmueble que pueden cambiar si encaja en una búsqueda.
+CAMPOS_INMUEBLE = frozenset(
+    {
+        "estado",
+        "tipo_inmueble",
+        "superficie_construida",
+        "habitaciones",
+        "banos",
+        "ciudad",
+        "provincia",
+        "precio",
+    }
+)
+CAMPOS_CRITERIO = frozenset(
+    {
+        "activa",
+        "cliente_id",
+        "tipo_inmueble",
+        "superficie_min",
+        "habitaciones_min",
+        "banos_min",
+        "ciudad",
+        "provincia",
+        "presupuesto_max",
+    }
+)
+# Solo se ofrecen los inmuebles en estos estados.
+ESTADOS_OFERTABLES = ("disponible",)
+
+# Condición de encaje entre una búsqueda `b` y un inmueble `i`; un criterio
+# vacío no filtra.
+_CONDICION_ENCAJE = """
+        b.activa
+    AND i.estado IN %(estados)s
+    AND (b.tipo_inmueble IS NULL OR b.tipo_inmueble = i.tipo_inmueble)
+    AND coalesce(b.superficie_min, 0) <= coalesce(i.superficie_construida, 0)
+    AND coalesce(b.habitaciones_min, 0) <= coalesce(i.habitaciones, 0)
+    AND coalesce(b.banos_min, 0) <= coalesce(i.banos, 0)
+    AND (b.ciudad IS NULL OR lower(b.ciudad) = lower(i.ciudad))
+    AND (b.provincia IS NULL OR b.provincia = i.provincia)
+    AND (coalesce(b.presupuesto_max, 0) = 0
+         OR coalesce(i.precio, 0) BETWEEN 1 AND b.presupuesto_max)
+"""
+
+
+class Busqueda(models.Model):
+    """Criterios de búsqueda guardados de un cliente.
+
+    Los inmuebles que encajan se guardan como candidatos y se mantienen al día
+    solo para lo que cambia: al dar de alta o modificar un inmueble se cruza
+    con todas las búsquedas activas, y al cambiar una búsqueda con todo el
+    catálogo, siempre en una única consulta.
+    """
+
+    _name = "inmo.busqueda"
+    _description = "Búsqueda de cliente"
+    _order = "cliente_id, id"
+
+    nombre = fields.Char(string="Nombre", required=True)
+    cliente_id = fields.Many2one(
+        comodel_name="res.partner",
+        string="Cliente",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    usuario_id = fields.Many2one(
+        comodel_name="res.users",
+        string="Agente",
+        default=lambda self: self.env.user,
+        help="Recibe los avisos de nuevas coincidencias.",
+    )
+    activa = fields.Boolean(string="Activa", default=True, index=True)
+    tipo_inmueble = fields.Selection(
+        selection=lambda self: self.env["inmo.inmueble"]
+        ._fields["tipo_inmueble"]
+        .selection,
+        string="Tipo de inmueble",
+    )
+    superficie_min = fields.Float(string="Superficie mínima (m2)")
+    habitaciones_min = fields.Integer(string="Habitaciones mínimas")
+    banos_min = fields.Integer(string="Baños mínimos")
+    ciudad = fields.Char(string="Ciudad")
+    provincia = fields.Many2one(comodel_name="res.country.state", string="Provincia")
+    presupuesto_max = fields.Float(
+        string="Presupuesto máximo (€)", help="0 para no limitar el precio."
+    )
+    candidato_ids = fields.One2many(
+        comodel_name="inmo.busqueda.candidato",
+        inverse_name="busqueda_id",
+        string="Coincidencias",
+    )
+    total_candidatos = fields.Integer(
+        string="Nº de coincidencias", compute="_compute_total_candidatos"
+    )
+
+    @api.depends("candidato_ids")
+    def _compute_total_candidatos(self):
+        totales = {
+            busqueda.id: total
+            for busqueda, total in self.env["inmo.busqueda.candidato"]._read_group(
+                [("busqueda_id", "in", self.ids)], ["busqueda_id"], ["__count"]
+            )
+        }
+        for busqueda in self:
+            busqueda.total_candidatos = totales.get(busqueda.id, 0)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        busquedas = super().create(vals_list)
+        self._sincronizar("b.id", busquedas.ids)
+        return busquedas
+
+    def write(self, vals):
+        resultado = super().write(vals)
+        if CAMPOS_CRITERIO & vals.keys():
+            self._sincronizar("b.id", self.ids)
+        return resultado
+
+    @api.model
+    def _sincronizar_inmuebles(self, inmuebles):
+        """Actualiza los candidatos de los inmuebles dados."""
+        self._sincronizar("i.id", inmuebles.ids)
+
+    @api.model
+    def _sincronizar(self, columna, ids):
+        """Recalcula los candidatos de las búsquedas (`b.id`) o inmuebles
+        (`i.id`) indicados: añade los nuevos, quita los que ya no encajan y
+        avisa a cada agente de sus coincidencias nuevas."""
+        lado = {"b.id": "busqueda_id", "i.id": "inmueble_id"}[columna]
+        if not ids:
+            return
+        self.env.flush_all()
+        Candidato = self.env["inmo.busqueda.candidato"]
+        self.env.cr.execute(
+            f"""
+            WITH encajes AS (
+                SELECT b.id AS busqueda_id, b.cliente_id, i.id AS inmueble_id
+                  FROM {self._table} b
+                  JOIN {self.env["inmo.inmueble"]._table} i ON {_CONDICION_ENCAJE}
+                 WHERE {columna} IN %(ids)s
+            ),
+            obsoletos AS (
+                DELETE FROM {Candidato._table} c
+                 WHERE c.{lado} IN %(ids)s
+                   AND NOT EXISTS (
+                           SELECT 1
+                             FROM encajes e
+                            WHERE e.busqueda_id = c.busqueda_id
+                              AND e.inmueble_id = c.inmueble_id
+                       )
+            )
+            INSERT INTO {Candidato._table}
+                   (busqueda_id, cliente_id, inmueble_id, visto,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT busqueda_id, cliente_id, inmueble_id, false,
+                   %(uid)s, now() at time zone 'UTC',
+                   %(uid)s, now() at time zone 'UTC'
+              FROM encajes
+                ON CONFLICT (busqueda_id, inmueble_id) DO NOTHING
+            RETURNING busqueda_id
+            """,
+            {
+                "ids": tuple(ids),
+                "estados": ESTADOS_OFERTABLES,
+                "uid": self.env.uid,
+            },
+        )
+        nuevas = Counter(fila[0] for fila in self.env.cr.fetchall())
+        Candidato.invalidate_model()
+        self.invalidate_model(["candidato_ids", "total_candidatos"])
+        if nuevas:
+            self._notificar(self.browse(nuevas), nuevas)
+
+    @api.model
+    def _notificar(self, busquedas, nuevas):
+        """Un aviso por agente con el total de coincidencias nuevas."""
+        por_usuario = Counter()
+        for busqueda in busquedas.sudo():
+            por_usuario[busqueda.usuario_id] += nuevas[busqueda.id]
+        for usuario, total in por_usuario.items():
+            if not usuario:
+                continue
+            self.env["bus.bus"]._sendone(
+                usuario.partner_id,
+                "simple_notification",
+                {
+                    "title": "Búsquedas de clientes",
+                    "message": f"{total} coincidencia(s) nueva(s) para sus clientes.",
+                    "type": "info",
+                },
+            )
+        _logger.info("Búsquedas de clientes: %s coincidencias nuevas", nuevas.total())
+
+    def action_marcar_vistos(self):
+        self.candidato_ids.filtered(lambda c: not c.visto).visto = True
+
+
+class BusquedaCandidato(models.Model):
+    """Inmueble que encaja en una búsqueda guardada."""
+
+    _name = "inmo.busqueda.candidato"
+    _description = "Coincidencia de búsqueda"
+    _order = "create_date desc, id desc"
+
+    busqueda_id = fields.Many2one(
+        comodel_name="inmo.busqueda",
+        string="Búsqueda",
+        required=True,
+        ondelete="cascade",
+    )
+    cliente_id = fields.Many2one(
+        comodel_name="res.partner",
+        string="Cliente",
+        related="busqueda_id.cliente_id",
+        store=True,
+        index=True,
+    )
+    inmueble_id = fields.Many2one(
+        comodel_name="inmo.inmueble",
+        string="Inmueble",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    visto = fields.Boolean(string="Visto", default=False, index=True)
+
+    _sql_constraints = [
+        (
+            "busqueda_inmueble_unico",
+            "unique(busqueda_id, inmueble_id)",
+            "El inmueble ya es una coincidencia de la búsqueda.",
+        ),
+    ]
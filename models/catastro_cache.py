@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from . import catastro_config as cfg
+from .parametros import leer_parametro
+
+
+class CatastroCache(models.Model):
+    """Respuestas normalizadas de Catastro guardadas por referencia catastral.
+
+    Evita repetir la llamada a la API cuando la misma referencia se consulta
+    varias veces dentro del periodo de validez configurado.
+    """
+
+    _name = "inmo.catastro.cache"
+    _description = "Caché de consultas a Catastro"
+    _rec_name = "referencia_catastral"
+    _order = "fecha_consulta desc"
+
+    referencia_catastral = fields.Char(string="Referencia catastral", required=True)
+    datos = fields.Json(string="Respuesta normalizada", required=True)
+    fecha_consulta = fields.Datetime(string="Consultado el", required=True, index=True)
+    fecha_caducidad = fields.Datetime(string="Caduca el", required=True, index=True)
+
+    _sql_constraints = [
+        (
+            "referencia_unica",
+            "unique(referencia_catastral)",
+            "Sólo puede haber una entrada de caché por referencia catastral.",
+        ),
+    ]
+
+    def _obtener(self, refcat):
+        """Devuelve los datos vigentes de `refcat` (o None).
+
+        Es una lectura sin más: anotar cada acierto dejaría la fila bloqueada
+        hasta el final de la transacción, y los lotes y crons leen miles. Los
+        aciertos se cuentan en las métricas del proceso.
+        """
+        self.env.cr.execute(
+            f"""
+            SELECT datos
+              FROM {self._table}
+             WHERE referencia_catastral = %s
+               AND fecha_caducidad > %s
+            """,
+            (refcat, fields.Datetime.now()),
+        )
+        fila = self.env.cr.fetchone()
+        return fila[0] if fila else None
+
+    def _guardar(self, refcat, datos, ttl):
+        """Inserta o renueva la entrada de `refcat` con una validez de `ttl` s."""
+        ahora = fields.Datetime.now()
+        self.env.cr.execute(
+            f"""
+            INSERT INTO {self._table}
+                   (referencia_catastral, datos, fecha_consulta, fecha_caducidad,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s::jsonb, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (referencia_catastral) DO UPDATE
+               SET datos = EXCLUDED.datos,
+                   fecha_consulta = EXCLUDED.fecha_consulta,
+                   fecha_caducidad = EXCLUDED.fecha_caducidad,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+            """,
+            (
+                refcat,
+                json.dumps(datos),
+                ahora,
+                ahora + timedelta(seconds=ttl),
+                self.env.uid,
+                ahora,
+                self.env.uid,
+                ahora,
+            ),
+        )
+        self.invalidate_model()
+
+    def _aplicar_limite(self, max_registros):
+        """Elimina las entradas más antiguas por encima de `max_registros`."""
+        self.env.cr.execute(
+            f"""
+            DELETE FROM {self._table}
+             WHERE id IN (
+                    SELECT id
+                      FROM {self._table}
+                  ORDER BY fecha_consulta DESC, id DESC
+                    OFFSET %s
+             )
+            """,
+            (max_registros,),
+        )
+        return self.env.cr.rowcount
+
+    @api.model
+    def _cron_purgar(self):
+        """Borra las entradas caducadas y recorta la tabla al tamaño máximo."""
+        self.env.cr.execute(
+            f"DELETE FROM {self._table} WHERE fecha_caducidad <= %s",
+            (fields.Datetime.now(),),
+        )
+        max_registros = leer_parametro(
+            self.env, cfg.PARAM_CACHE_MAX_REGISTROS, cfg.CACHE_MAX_REGISTROS
+        )
+        self._aplicar_limite(max_registros)
+        self.invalidate_model()
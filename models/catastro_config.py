@@ -1,6 +1,74 @@
 CATRASTRO_URL = "https://ovc.catastro.meh.es/OVCServWeb/OVCWcfCallejero/COVCCallejero.svc/json/Consulta_DNPRC"
+
+# Servicios del callejero que se consultan junto a Consulta_DNPRC (misma ruta).
+SERVICIO_DNPLOC = "Consulta_DNPLOC"
+
+# Las coordenadas se publican en otro servicio de la OVC (COVCCoordenadas.svc).
+SERVICIO_CPMRC = "Consulta_CPMRC"
+RUTA_CALLEJERO = "COVCCallejero.svc"
+RUTA_COORDENADAS = "COVCCoordenadas.svc"
+SRS_COORDENADAS = "EPSG:4326"
+
 DEFAULT_HEADERS = {
     "Accept": "application/json",
     "User-Agent": "catastro-client/1.0",
 }
 DEFAULT_TIMEOUT = 25
+TIMEOUT_CONEXION = 5
+
+# Reintentos con espera exponencial ante errores 5xx y de red.
+REINTENTOS = 2
+REINTENTOS_BACKOFF = 0.5
+POOL_CONEXIONES = 10
+
+# Cortacircuitos: fallos seguidos antes de abrir y segundos de enfriamiento.
+CIRCUITO_FALLOS = 5
+CIRCUITO_ENFRIAMIENTO = 60
+
+# Caché de respuestas normalizadas (segundos / número de entradas).
+CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_REGISTROS = 50000
+CACHE_MEMORIA_TTL = 3600
+CACHE_MEMORIA_MAX = 512
+
+# Parámetros del sistema que permiten ajustar la caché sin tocar código.
+PARAM_CACHE_TTL = "inmo_odoo.catastro_cache_ttl"
+PARAM_CACHE_MAX_REGISTROS = "inmo_odoo.catastro_cache_max_registros"
+PARAM_URL = "inmo_odoo.catastro_url"
+PARAM_TIMEOUT = "inmo_odoo.catastro_timeout"
+PARAM_TIMEOUT_CONEXION = "inmo_odoo.catastro_timeout_conexion"
+PARAM_REINTENTOS = "inmo_odoo.catastro_reintentos"
+PARAM_REINTENTOS_BACKOFF = "inmo_odoo.catastro_reintentos_backoff"
+PARAM_POOL_CONEXIONES = "inmo_odoo.catastro_pool_conexiones"
+PARAM_CIRCUITO_FALLOS = "inmo_odoo.catastro_circuito_fallos"
+PARAM_CIRCUITO_ENFRIAMIENTO = "inmo_odoo.catastro_circuito_enfriamiento"
+
+# Consultas en lote: hilos simultáneos y ritmo máximo contra Catastro.
+LOTE_MAX_HILOS = 4
+LOTE_PETICIONES_POR_SEGUNDO = 5.0
+
+# Cola de consultas en segundo plano.
+COLA_TAMANO_LOTE = 50
+COLA_MAX_INTENTOS = 5
+COLA_ESPERA_BASE = 60
+COLA_BLOQUEO_MAXIMO = 15 * 60
+
+# Prospección por calle o parcela: portales por consulta y altas por lote.
+CALLEJERO_MAX_PORTALES = 500
+CALLEJERO_TAMANO_LOTE = 200
+
+# Geolocalización en segundo plano: inmuebles por ejecución del cron.
+GEO_TAMANO_LOTE = 100
+
+# Resincronización nocturna: inmuebles por lote, ventana de ejecución y ritmo.
+RESYNC_TAMANO_LOTE = 200
+RESYNC_MINUTOS = 240
+PARAM_RESYNC_MINUTOS = "inmo_odoo.catastro_resync_minutos"
+PARAM_RESYNC_PETICIONES_POR_SEGUNDO = "inmo_odoo.catastro_resync_peticiones_por_segundo"
+
+# Dígitos de control de la referencia catastral (dos últimos caracteres).
+REFCAT_PESOS_CONTROL = (13, 15, 12, 5, 4, 17, 9, 21, 3, 7, 1)
+REFCAT_LETRAS_CONTROL = "MQWERTYUIOPASDFGHJKLBZX"
+
+# Precarga al teclear una referencia en la ficha del inmueble.
+PRECARGA_HILOS = 2
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+from . import catastro_config as cfg
+from . import catastro_service, metricas
+
+_logger = logging.getLogger(__name__)
+
+
+class CatastroJob(models.Model):
+    """Consulta a Catastro pendiente de ejecutar en segundo plano.
+
+    El asistente encola el trabajo y devuelve el control al usuario; un cron
+    vacía la cola por lotes, actualiza el inmueble y avisa al solicitante.
+    """
+
+    _name = "inmo.catastro.job"
+    _description = "Consulta a Catastro en segundo plano"
+    _rec_name = "referencia_catastral"
+    _order = "fecha_siguiente_intento, id"
+
+    inmueble_id = fields.Many2one(
+        comodel_name="inmo.inmueble",
+        string="Inmueble",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    referencia_catastral = fields.Char(string="Referencia catastral", required=True)
+    estado = fields.Selection(
+        selection=[
+            ("pendiente", "Pendiente"),
+            ("en_curso", "En curso"),
+            ("hecho", "Hecho"),
+            ("fallido", "Fallido"),
+        ],
+        string="Estado",
+        default="pendiente",
+        required=True,
+        index=True,
+    )
+    intentos = fields.Integer(string="Intentos", default=0)
+    ultimo_error = fields.Text(string="Último error")
+    fecha_siguiente_intento = fields.Datetime(
+        string="Próximo intento",
+        default=fields.Datetime.now,
+        index=True,
+    )
+    fecha_inicio = fields.Datetime(string="Inicio de la ejecución")
+    usuario_id = fields.Many2one(
+        comodel_name="res.users",
+        string="Solicitado por",
+        default=lambda self: self.env.user,
+    )
+
+    @api.model
+    def _encolar(self, inmuebles, referencia=None):
+        """Crea (o reutiliza) un trabajo pendiente por inmueble.
+
+        Se usa la referencia del inmueble salvo que se indique `referencia`.
+        Los inmuebles con una referencia no válida no se encolan: Catastro
+        nunca la encontraría.
+        """
+        referencias = {
+            inmueble.id: catastro_service.normalizar_referencia(
+                referencia or inmueble.referencia_catastral
+            )
+            for inmueble in inmuebles
+        }
+        inmuebles = inmuebles.filtered(lambda inmueble: referencias[inmueble.id])
+        if not inmuebles:
+            raise UserError("Los inmuebles no tienen referencia catastral.")
+        no_validas = inmuebles.filtered(
+            lambda inmueble: not catastro_service.referencia_valida(
+                referencias[inmueble.id]
+            )
+        )
+        if no_validas:
+            _logger.info("No se encolan referencias no válidas: %s", no_validas)
+            inmuebles -= no_validas
+            if not inmuebles:
+                raise catastro_service.CatastroReferenciaNoValidaError(
+                    "La referencia catastral no es válida: revise los dígitos "
+                    "de control."
+                )
+
+        Job = self.sudo()
+        existentes = Job.search(
+            [("inmueble_id", "in", inmuebles.ids), ("estado", "=", "pendiente")]
+        )
+        for job in existentes:
+            if job.referencia_catastral != referencias[job.inmueble_id.id]:
+                job.referencia_catastral = referencias[job.inmueble_id.id]
+        ya_encolados = set(existentes.inmueble_id.ids)
+        jobs = existentes | Job.create(
+            [
+                {
+                    "inmueble_id": inmueble.id,
+                    "referencia_catastral": referencias[inmueble.id],
+                    "usuario_id": self.env.uid,
+                }
+                for inmueble in inmuebles
+                if inmueble.id not in ya_encolados
+            ]
+        )
+        self._programar_cron()
+        return jobs
+
+    def action_reintentar(self):
+        """Vuelve a poner en cola los trabajos fallidos seleccionados."""
+        self.filtered(lambda job: job.estado == "fallido").write(
+            {
+                "estado": "pendiente",
+                "intentos": 0,
+                "fecha_siguiente_intento": fields.Datetime.now(),
+            }
+        )
+        self._programar_cron()
+
+    @api.model
+    def _cron_procesar_cola(self):
+        """Punto de entrada del cron: confirma cada fase por separado para no
+        mantener bloqueada la cola mientras se espera a Catastro."""
+        self._reactivar_bloqueados()
+        procesados = self._procesar_cola(auto_commit=True)
+        if procesados and self._hay_pendientes():
+            self._programar_cron()
+
+    @api.model
+    def _procesar_cola(self, limite=None, auto_commit=False):
+        """Ejecuta un lote de trabajos vencidos y devuelve cuántos procesó."""
+        jobs = self._reservar(limite or cfg.COLA_TAMANO_LOTE)
+        if not jobs:
+            return 0
+        if auto_commit:
+            self.env.cr.commit()
+
+        respuestas = catastro_service.consulta_lote(
+            self.env, jobs.mapped("referencia_catastral")
+        )
+        correctas = {
+            refcat: respuesta
+            for refcat, respuesta in respuestas.items()
+            if not isinstance(respuesta, UserError)
+        }
+        valores_por_ref = dict(
+            zip(
+                correctas,
+                catastro_service.mapear_campos_inmuebles(self.env, correctas.values()),
+                strict=True,
+            )
+        )
+        avisos = defaultdict(lambda: {"ok": 0, "error": 0})
+        for job in jobs:
+            respuesta = respuestas.get(job.referencia_catastral)
+            if isinstance(respuesta, UserError):
+                job._registrar_fallo(respuesta)
+            else:
+                valores = dict(
+                    valores_por_ref[job.referencia_catastral],
+                    catastro_hash=catastro_service.huella(respuesta),
+                )
+                try:
+                    with (
+                        self.env.cr.savepoint(),
+                        metricas.medir("catastro.escritura", self.env),
+                    ):
+                        cambios = job.inmueble_id._cambios(valores)
+                        if cambios:
+                            job.inmueble_id.write(cambios)
+                except (UserError, ValueError) as err:
+                    job._registrar_fallo(err)
+                else:
+                    job.write({"estado": "hecho", "ultimo_error": False})
+            if job.estado in ("hecho", "fallido"):
+                avisos[job.usuario_id]["ok" if job.estado == "hecho" else "error"] += 1
+
+        self._notificar(avisos)
+        if auto_commit:
+            self.env.cr.commit()
+        return len(jobs)
+
+    def _reservar(self, limite):
+        """Marca como en curso los trabajos vencidos, saltando los bloqueados
+        por otra transacción."""
+        self.env.cr.execute(
+            f"""
+            SELECT id
+              FROM {self._table}
+             WHERE estado = 'pendiente'
+               AND fecha_siguiente_intento <= %s
+          ORDER BY fecha_siguiente_intento, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+            """,
+            (fields.Datetime.now(), limite),
+        )
+        jobs = self.browse([fila[0] for fila in self.env.cr.fetchall()])
+        if jobs:
+            jobs.write({"estado": "en_curso", "fecha_inicio": fields.Datetime.now()})
+        return jobs
+
+    def _registrar_fallo(self, error):
+        """Programa un nuevo intento con espera exponencial o da el trabajo
+        por fallido si el error no es recuperable o se agotan los intentos."""
+        self.ensure_one()
+        intentos = self.intentos + 1
+        valores = {"intentos": intentos, "ultimo_error": str(error)}
+        recuperable = not isinstance(
+            error,
+            catastro_service.CatastroNoEncontradoError
+            | catastro_service.CatastroReferenciaNoValidaError,
+        )
+        if recuperable and intentos < cfg.COLA_MAX_INTENTOS:
+            espera = cfg.COLA_ESPERA_BASE * 2 ** (intentos - 1)
+            siguiente = fields.Datetime.now() + timedelta(seconds=espera)
+            valores.update(estado="pendiente", fecha_siguiente_intento=siguiente)
+            self._programar_cron(siguiente)
+        else:
+            valores["estado"] = "fallido"
+        _logger.info(
+            "Consulta a Catastro %s fallida: %s", self.referencia_catastral, error
+        )
+        self.write(valores)
+
+    @api.model
+    def _reactivar_bloqueados(self):
+        """Devuelve a la cola los trabajos que quedaron en curso tras una caída."""
+        limite = fields.Datetime.now() - timedelta(seconds=cfg.COLA_BLOQUEO_MAXIMO)
+        self.search([("estado", "=", "en_curso"), ("fecha_inicio", "<", limite)]).write(
+            {"estado": "pendiente"}
+        )
+
+    @api.model
+    def _hay_pendientes(self):
+        return bool(
+            self.search_count(
+                [
+                    ("estado", "=", "pendiente"),
+                    ("fecha_siguiente_intento", "<=", fields.Datetime.now()),
+                ],
+                limit=1,
+            )
+        )
+
+    @api.model
+    def _programar_cron(self, cuando=None):
+        cron = self.env.ref(
+            "inmo_odoo.ir_cron_procesar_cola_catastro", raise_if_not_found=False
+        )
+        if cron:
+            cron.sudo()._trigger(cuando)
+
+    @api.model
+    def _notificar(self, avisos):
+        """Avisa a cada solicitante del resultado de sus consultas."""
+        for usuario, totales in avisos.items():
+            if not usuario:
+                continue
+            if totales["error"]:
+                mensaje = (
+                    f"{totales['ok']} inmueble(s) actualizados, "
+                    f"{totales['error']} con error. Revise la cola de Catastro."
+                )
+                tipo = "warning"
+            else:
+                mensaje = f"{totales['ok']} inmueble(s) actualizados desde Catastro."
+                tipo = "success"
+            self.env["bus.bus"]._sendone(
+                usuario.partner_id,
+                "simple_notification",
+                {"title": "Catastro", "message": mensaje, "type": tipo},
+            )
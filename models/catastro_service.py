@@ -1,13 +1,29 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import TypedDict
 
 import requests
+from odoo import SUPERUSER_ID
 from odoo.api import Environment
 from odoo.exceptions import UserError
+from odoo.modules.registry import Registry
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from . import catastro_config as cfg
+from . import metricas
+from .parametros import leer_parametro
 
 _logger = logging.getLogger(__name__)
 
@@ -24,40 +40,698 @@ class ResponseCatastroInmueble(TypedDict):
     tipo_constructivo: str | None
 
 
+class CatastroNoEncontradoError(UserError):
+    """Catastro respondió correctamente pero no conoce la referencia."""
+
+
+class CatastroNoDisponibleError(UserError):
+    """No se pudo obtener respuesta de Catastro (red, 5xx o circuito abierto)."""
+
+
+class CatastroReferenciaNoValidaError(UserError):
+    """La referencia no tiene el formato o los dígitos de control correctos,
+    así que no tiene sentido consultarla ni reintentarla."""
+
+
+@dataclass(frozen=True)
+class AjustesCatastro:
+    """Parámetros de conexión con Catastro, ajustables como parámetros
+    del sistema (ver `catastro_config`)."""
+
+    url: str = cfg.CATRASTRO_URL
+    timeout: float = cfg.DEFAULT_TIMEOUT
+    timeout_conexion: float = cfg.TIMEOUT_CONEXION
+    reintentos: int = cfg.REINTENTOS
+    reintentos_backoff: float = cfg.REINTENTOS_BACKOFF
+    pool_conexiones: int = cfg.POOL_CONEXIONES
+    circuito_fallos: int = cfg.CIRCUITO_FALLOS
+    circuito_enfriamiento: float = cfg.CIRCUITO_ENFRIAMIENTO
+
+    @classmethod
+    def desde_parametros(cls, env: Environment) -> AjustesCatastro:
+        return cls(
+            url=leer_parametro(env, cfg.PARAM_URL, cfg.CATRASTRO_URL),
+            timeout=leer_parametro(env, cfg.PARAM_TIMEOUT, float(cfg.DEFAULT_TIMEOUT)),
+            timeout_conexion=leer_parametro(
+                env, cfg.PARAM_TIMEOUT_CONEXION, float(cfg.TIMEOUT_CONEXION)
+            ),
+            reintentos=leer_parametro(env, cfg.PARAM_REINTENTOS, cfg.REINTENTOS),
+            reintentos_backoff=leer_parametro(
+                env, cfg.PARAM_REINTENTOS_BACKOFF, cfg.REINTENTOS_BACKOFF
+            ),
+            pool_conexiones=leer_parametro(
+                env, cfg.PARAM_POOL_CONEXIONES, cfg.POOL_CONEXIONES
+            ),
+            circuito_fallos=leer_parametro(
+                env, cfg.PARAM_CIRCUITO_FALLOS, cfg.CIRCUITO_FALLOS
+            ),
+            circuito_enfriamiento=leer_parametro(
+                env, cfg.PARAM_CIRCUITO_ENFRIAMIENTO, float(cfg.CIRCUITO_ENFRIAMIENTO)
+            ),
+        )
+
+
+class _Circuito:
+    """Cortacircuitos: tras varios fallos seguidos rechaza las llamadas durante
+    un tiempo de enfriamiento y después deja pasar una sola de prueba."""
+
+    def __init__(self, umbral: int, enfriamiento: float):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self._fallos = 0
+        self._abierto_hasta: float | None = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def abierto(self) -> bool:
+        with self._lock:
+            return self._abierto_hasta is not None
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self._abierto_hasta is None:
+                return True
+            if self._prueba_en_curso or time.monotonic() < self._abierto_hasta:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def exito(self) -> None:
+        with self._lock:
+            self._fallos = 0
+            self._abierto_hasta = None
+            self._prueba_en_curso = False
+
+    def fallo(self) -> None:
+        with self._lock:
+            self._fallos += 1
+            if self._prueba_en_curso or self._fallos >= self.umbral:
+                self._abierto_hasta = time.monotonic() + self.enfriamiento
+                self._prueba_en_curso = False
+
+
+class _ClienteCatastro:
+    """Sesión HTTP reutilizable por proceso, con reintentos y cortacircuitos."""
+
+    def __init__(self, ajustes: AjustesCatastro):
+        self.ajustes = ajustes
+        self.circuito = _Circuito(
+            ajustes.circuito_fallos, ajustes.circuito_enfriamiento
+        )
+        self._sesion: requests.Session | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def configurar(self, ajustes: AjustesCatastro) -> None:
+        """Aplica nuevos ajustes; la sesión se recrea en la siguiente llamada."""
+        if ajustes == self.ajustes:
+            return
+        with self._lock:
+            self.ajustes = ajustes
+            self.circuito.umbral = ajustes.circuito_fallos
+            self.circuito.enfriamiento = ajustes.circuito_enfriamiento
+            self._cerrar()
+
+    def get(
+        self, params: dict[str, str], servicio: str | None = None
+    ) -> requests.Response:
+        """GET a `Consulta_DNPRC` o, si se indica, a otro `servicio` del
+        callejero publicado en la misma ruta (o en la de coordenadas)."""
+        if not self.circuito.permitir():
+            raise CatastroNoDisponibleError(
+                "Catastro no responde. Se reintentará automáticamente en unos minutos."
+            )
+        ajustes = self.ajustes
+        try:
+            url = ajustes.url
+            if servicio:
+                url = f"{url.rsplit('/', 1)[0]}/{servicio}"
+                if servicio == cfg.SERVICIO_CPMRC:
+                    url = url.replace(cfg.RUTA_CALLEJERO, cfg.RUTA_COORDENADAS)
+            response = self._obtener_sesion().get(
+                url,
+                params=params,
+                timeout=(ajustes.timeout_conexion, ajustes.timeout),
+            )
+            response.raise_for_status()
+        except requests.HTTPError as err:
+            if err.response is not None and err.response.status_code < 500:
+                self.circuito.exito()
+            else:
+                self.circuito.fallo()
+            raise
+        except requests.RequestException:
+            self.circuito.fallo()
+            raise
+        self.circuito.exito()
+        return response
+
+    def _obtener_sesion(self) -> requests.Session:
+        with self._lock:
+            # Tras un fork (workers de Odoo) cada proceso abre sus conexiones.
+            if self._sesion is None or self._pid != os.getpid():
+                self._sesion = self._crear_sesion()
+                self._pid = os.getpid()
+            return self._sesion
+
+    def _crear_sesion(self) -> requests.Session:
+        ajustes = self.ajustes
+        # Sin reintentar lecturas agotadas: una llamada colgada ya ha ocupado
+        # el worker `timeout` segundos y repetirla solo lo multiplica.
+        reintentos = Retry(
+            total=ajustes.reintentos,
+            read=0,
+            backoff_factor=ajustes.reintentos_backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adaptador = HTTPAdapter(
+            pool_connections=ajustes.pool_conexiones,
+            pool_maxsize=ajustes.pool_conexiones,
+            max_retries=reintentos,
+        )
+        sesion = requests.Session()
+        sesion.headers.update(cfg.DEFAULT_HEADERS)
+        sesion.mount("https://", adaptador)
+        sesion.mount("http://", adaptador)
+        return sesion
+
+    def _cerrar(self) -> None:
+        if self._sesion is not None and self._pid == os.getpid():
+            self._sesion.close()
+        self._sesion = None
+        self._pid = None
+
+
+_cliente = _ClienteCatastro(AjustesCatastro())
+
+
+def configurar_cliente(env: Environment) -> None:
+    """Sincroniza el cliente HTTP del proceso con los parámetros del sistema."""
+    _cliente.configurar(AjustesCatastro.desde_parametros(env))
+
+
 def consulta_por_referencia(referencia: str) -> ResponseCatastroInmueble:
     """Consulta la API del Catastro y devuelve una estructura normalizada."""
-    refcat = (referencia or "").strip().upper()
+    refcat = normalizar_referencia(referencia)
     if not refcat:
         raise UserError("Debe indicar una referencia catastral.")
 
+    with metricas.medir("catastro.consulta"):
+        data = _obtener_json({"RefCat": refcat}, refcat)
+        if "consulta_dnprcResult" not in data:
+            _logger.warning("Respuesta inesperada de Catastro: %s", data)
+            raise UserError("Catastro devolvió una respuesta inesperada.")
+
+        errores = data["consulta_dnprcResult"].get("lerr")
+        if errores:
+            _logger.info("Catastro no reconoce %s: %s", refcat, errores)
+            raise CatastroNoEncontradoError(
+                f"Catastro no tiene datos para la referencia {refcat}."
+            )
+
+        try:
+            with metricas.medir("catastro.normalizar"):
+                resultado = _normalizar_respuesta_catastro(data)
+        except KeyError as err:
+            _logger.warning(
+                "Estructura no reconocida en respuesta de Catastro: %s", data
+            )
+            raise UserError("Catastro devolvió una estructura no reconocida.") from err
+
+    resultado["referencia_catastral"] = refcat
+    return resultado
+
+
+def consulta_por_parcela(referencia: str) -> list[ResponseCatastroInmueble]:
+    """Todos los inmuebles de una parcela (los 14 primeros caracteres de
+    la referencia catastral)."""
+    parcela = normalizar_referencia(referencia)[:14]
+    if len(parcela) != 14:
+        raise UserError("La referencia de parcela debe tener 14 caracteres.")
+
+    with metricas.medir("catastro.parcela"):
+        data = _obtener_json({"RefCat": parcela}, parcela)
+        resultado = data.get("consulta_dnprcResult")
+        if resultado is None:
+            _logger.warning("Respuesta inesperada de Catastro: %s", data)
+            raise UserError("Catastro devolvió una respuesta inesperada.")
+        if resultado.get("lerr"):
+            raise CatastroNoEncontradoError(
+                f"Catastro no tiene datos para la parcela {parcela}."
+            )
+        return _normalizar_lista_catastro(resultado)
+
+
+def consulta_por_localizacion(
+    provincia: str, municipio: str, sigla: str, calle: str, numero: int
+) -> list[ResponseCatastroInmueble]:
+    """Inmuebles de un portal según el callejero (`Consulta_DNPLOC`).
+
+    Un número inexistente no es un error: devuelve una lista vacía.
+    """
+    params = {
+        "Provincia": provincia,
+        "Municipio": municipio,
+        "Sigla": sigla or "",
+        "Calle": calle,
+        "Numero": str(numero),
+        "Bloque": "",
+        "Escalera": "",
+        "Planta": "",
+        "Puerta": "",
+    }
+    descripcion = f"{sigla} {calle} {numero}, {municipio}"
+    with metricas.medir("catastro.localizacion"):
+        data = _obtener_json(params, descripcion, servicio=cfg.SERVICIO_DNPLOC)
+        resultado = data.get("consulta_dnplocResult")
+        if resultado is None:
+            _logger.warning("Respuesta inesperada de Catastro: %s", data)
+            raise UserError("Catastro devolvió una respuesta inesperada.")
+        if resultado.get("lerr"):
+            _logger.info(
+                "Catastro sin datos para %s: %s", descripcion, resultado["lerr"]
+            )
+            return []
+        return _normalizar_lista_catastro(resultado)
+
+
+def coordenadas_por_referencia(referencia: str) -> tuple[float, float]:
+    """Latitud y longitud (WGS84) de la parcela según `Consulta_CPMRC`."""
+    parcela = normalizar_referencia(referencia)[:14]
+    if len(parcela) != 14:
+        raise UserError("La referencia catastral debe tener al menos 14 caracteres.")
+
+    params = {
+        "Provincia": "",
+        "Municipio": "",
+        "SRS": cfg.SRS_COORDENADAS,
+        "RefCat": parcela,
+    }
+    with metricas.medir("catastro.coordenadas"):
+        data = _obtener_json(params, parcela, servicio=cfg.SERVICIO_CPMRC)
+        resultado = data.get("Consulta_CPMRCResult")
+        if resultado is None:
+            _logger.warning("Respuesta inesperada de Catastro: %s", data)
+            raise UserError("Catastro devolvió una respuesta inesperada.")
+        if resultado.get("lerr"):
+            raise CatastroNoEncontradoError(
+                f"Catastro no tiene coordenadas para la parcela {parcela}."
+            )
+        try:
+            punto = _como_lista(resultado["coordenadas"]["coord"])[0]["geo"]
+            return float(punto["ycen"]), float(punto["xcen"])
+        except (KeyError, IndexError, TypeError, ValueError) as err:
+            _logger.warning(
+                "Estructura no reconocida en respuesta de Catastro: %s", data
+            )
+            raise UserError("Catastro devolvió una estructura no reconocida.") from err
+
+
+def recorrer_calle(
+    env: Environment,
+    provincia: str,
+    municipio: str,
+    sigla: str,
+    calle: str,
+    numeros: Iterable[int],
+    max_hilos: int = cfg.LOTE_MAX_HILOS,
+    peticiones_por_segundo: float = cfg.LOTE_PETICIONES_POR_SEGUNDO,
+) -> Iterator[tuple[int, list[ResponseCatastroInmueble] | UserError]]:
+    """Consulta los portales `numeros` de una calle y los va entregando en
+    orden, uno por uno, según llegan las respuestas.
+
+    Cada portal produce su lista de inmuebles o el error obtenido, de modo
+    que un fallo no interrumpe el recorrido.
+    """
+    numeros = list(numeros)
+    if not numeros:
+        return
+    configurar_cliente(env)
+    limitador = _LimitadorTasa(peticiones_por_segundo)
+
+    def _consultar(numero: int) -> list[ResponseCatastroInmueble] | UserError:
+        limitador.esperar()
+        try:
+            return consulta_por_localizacion(provincia, municipio, sigla, calle, numero)
+        except UserError as err:
+            return err
+        except Exception:
+            _logger.exception("Error inesperado consultando el portal %s", numero)
+            return UserError("Error inesperado consultando Catastro.")
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_hilos, len(numeros))),
+        thread_name_prefix="catastro",
+    ) as pool:
+        yield from zip(numeros, pool.map(_consultar, numeros), strict=True)
+
+
+def _obtener_json(
+    params: dict[str, str], descripcion: str, servicio: str | None = None
+) -> dict:
+    """Hace la petición a Catastro y devuelve el JSON de la respuesta."""
     try:
-        response = requests.get(
-            cfg.CATRASTRO_URL,
-            params={"RefCat": refcat},
-            headers=cfg.DEFAULT_HEADERS,
-            timeout=cfg.DEFAULT_TIMEOUT,
-        )
-        response.raise_for_status()
+        with metricas.medir("catastro.http"):
+            response = _cliente.get(params=params, servicio=servicio)
     except requests.Timeout as err:
-        _logger.exception("Timeout consultando Catastro para %s", refcat)
-        raise UserError("La consulta a Catastro excedió el tiempo límite.") from err
+        _logger.exception("Timeout consultando Catastro para %s", descripcion)
+        raise CatastroNoDisponibleError(
+            "La consulta a Catastro excedió el tiempo límite."
+        ) from err
     except requests.RequestException as err:
-        _logger.exception("Error HTTP consultando Catastro para %s", refcat)
-        raise UserError("No se pudo contactar con Catastro. Intente de nuevo.") from err
+        _logger.exception("Error HTTP consultando Catastro para %s", descripcion)
+        raise CatastroNoDisponibleError(
+            "No se pudo contactar con Catastro. Intente de nuevo."
+        ) from err
+
+    with metricas.medir("catastro.json"):
+        return response.json()
+
+
+def huella(datos: ResponseCatastroInmueble) -> str:
+    """Huella del contenido de una respuesta normalizada, para saber sin
+    comparar campo a campo si cambió desde la última sincronización."""
+    contenido = json.dumps(datos, sort_keys=True, default=str)
+    return hashlib.sha1(contenido.encode()).hexdigest()
+
+
+def normalizar_referencia(referencia: str | None) -> str:
+    """Devuelve la referencia catastral sin espacios y en mayúsculas."""
+    return "".join((referencia or "").split()).upper()
+
+
+_FORMATO_REFERENCIA = re.compile(r"[0-9A-ZÑ]{18}[A-Z]{2}")
+
+
+def digitos_control(referencia: str) -> str:
+    """Dígitos de control de los 18 primeros caracteres de una referencia."""
+
+    def valor(caracter):
+        if caracter.isdigit():
+            return int(caracter)
+        if caracter == "Ñ":
+            return 15
+        return ord(caracter) - (64 if caracter <= "N" else 63)
+
+    cargo = referencia[14:18]
+    digitos = ""
+    for parte in (referencia[0:7] + cargo, referencia[7:14] + cargo):
+        suma = sum(
+            valor(c) * peso
+            for c, peso in zip(parte, cfg.REFCAT_PESOS_CONTROL, strict=True)
+        )
+        digitos += cfg.REFCAT_LETRAS_CONTROL[suma % 23]
+    return digitos
+
+
+def referencia_valida(referencia: str | None) -> bool:
+    """Comprueba el formato y los dígitos de control sin consultar Catastro."""
+    refcat = normalizar_referencia(referencia)
+    if not _FORMATO_REFERENCIA.fullmatch(refcat):
+        return False
+    return refcat[18:] == digitos_control(refcat)
 
-    data = response.json()
-    if "consulta_dnprcResult" not in data:
-        _logger.warning("Respuesta inesperada de Catastro: %s", data)
-        raise UserError("Catastro devolvió una respuesta inesperada.")
 
+def validar_referencia(referencia: str | None) -> str:
+    """Devuelve la referencia normalizada o lanza `UserError` si no es válida."""
+    refcat = normalizar_referencia(referencia)
+    if not refcat:
+        raise UserError("Debe indicar una referencia catastral.")
+    if not referencia_valida(refcat):
+        raise CatastroReferenciaNoValidaError(
+            f"La referencia catastral {refcat} no es válida: debe tener 20 "
+            "caracteres y los dos últimos deben ser sus dígitos de control."
+        )
+    return refcat
+
+
+class _CacheMemoria:
+    """LRU en memoria del proceso con caducidad por entrada."""
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._datos: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: tuple[str, str]) -> ResponseCatastroInmueble | None:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            caduca, datos = entrada
+            if caduca <= time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return ResponseCatastroInmueble(**datos)
+
+    def guardar(
+        self, clave: tuple[str, str], datos: ResponseCatastroInmueble, ttl: int
+    ) -> None:
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, dict(datos))
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+
+_cache_memoria = _CacheMemoria(cfg.CACHE_MEMORIA_MAX)
+_estadisticas_cache: Counter[str] = Counter()
+_estadisticas_lock = threading.Lock()
+
+
+def consulta_con_cache(env: Environment, referencia: str) -> ResponseCatastroInmueble:
+    """Igual que `consulta_por_referencia`, pero sirviendo primero desde la
+    caché en memoria y después desde `inmo.catastro.cache`."""
+    refcat = validar_referencia(referencia)
+
+    with metricas.medir("catastro.consulta_con_cache", env):
+        datos = _buscar_en_cache(env, refcat)
+        if datos is None and _esperar_precarga(env, refcat):
+            datos = _buscar_en_cache(env, refcat)
+        if datos is None:
+            configurar_cliente(env)
+            datos = consulta_por_referencia(refcat)
+            _guardar_en_cache(env, refcat, datos)
+    return datos
+
+
+def consulta_lote(
+    env: Environment,
+    referencias: Iterable[str],
+    max_hilos: int = cfg.LOTE_MAX_HILOS,
+    peticiones_por_segundo: float = cfg.LOTE_PETICIONES_POR_SEGUNDO,
+    usar_cache: bool = True,
+) -> dict[str, ResponseCatastroInmueble | UserError]:
+    """Consulta muchas referencias a la vez.
+
+    Deduplica las referencias, sirve las que estén en caché y reparte el
+    resto entre `max_hilos` hilos sin superar `peticiones_por_segundo`.
+    Devuelve, por referencia normalizada, los datos o el error obtenido, de
+    modo que un fallo no interrumpe el resto del lote. Con `usar_cache` a
+    False se consulta todo a Catastro, aunque las respuestas se siguen
+    guardando en la caché.
+    """
+    pendientes: list[str] = []
+    resultados: dict[str, ResponseCatastroInmueble | UserError] = {}
+    for refcat in dict.fromkeys(map(normalizar_referencia, referencias)):
+        if not refcat:
+            continue
+        if not referencia_valida(refcat):
+            resultados[refcat] = CatastroReferenciaNoValidaError(
+                "Referencia catastral no válida: revise los dígitos de control."
+            )
+            continue
+        datos = _buscar_en_cache(env, refcat) if usar_cache else None
+        if datos is None:
+            pendientes.append(refcat)
+        else:
+            resultados[refcat] = datos
+
+    if not pendientes:
+        return resultados
+
+    configurar_cliente(env)
+    limitador = _LimitadorTasa(peticiones_por_segundo)
+
+    def _consultar(refcat: str) -> ResponseCatastroInmueble | UserError:
+        limitador.esperar()
+        try:
+            return consulta_por_referencia(refcat)
+        except UserError as err:
+            return err
+        except Exception:
+            _logger.exception("Error inesperado consultando Catastro para %s", refcat)
+            return UserError("Error inesperado consultando Catastro.")
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_hilos, len(pendientes))),
+        thread_name_prefix="catastro",
+    ) as pool:
+        # Las escrituras en caché usan el cursor de la petición, así que se
+        # hacen aquí, en el hilo principal, a medida que llegan los resultados.
+        for refcat, resultado in zip(
+            pendientes, pool.map(_consultar, pendientes), strict=True
+        ):
+            if not isinstance(resultado, UserError):
+                _guardar_en_cache(env, refcat, resultado)
+            resultados[refcat] = resultado
+    return resultados
+
+
+_precargas: dict[tuple[str, str], Future] = {}
+_precargas_lock = threading.Lock()
+_pool_precarga = ThreadPoolExecutor(
+    max_workers=cfg.PRECARGA_HILOS, thread_name_prefix="catastro-precarga"
+)
+
+
+def precargar(env: Environment, referencia: str | None) -> bool:
+    """Empieza a traer de Catastro una referencia sin esperar la respuesta.
+
+    La consulta corre en otro hilo con su propio cursor y deja el resultado
+    en la caché, de modo que el asistente lo encuentra ya en local. Devuelve
+    False, sin consultar nada, si la referencia no es válida.
+    """
+    refcat = normalizar_referencia(referencia)
+    if not referencia_valida(refcat):
+        return False
+    clave = (env.cr.dbname, refcat)
+    if _cache_memoria.obtener(clave) is not None:
+        return True
+    if getattr(threading.current_thread(), "testing", False):
+        # En las pruebas el otro hilo no vería los datos de la transacción.
+        _precargar(env, refcat)
+        return True
+    with _precargas_lock:
+        if clave in _precargas:
+            return True
+        futuro = _pool_precarga.submit(_precargar_en_hilo, env.cr.dbname, refcat)
+        _precargas[clave] = futuro
+    futuro.add_done_callback(lambda _futuro: _fin_precarga(clave))
+    return True
+
+
+def _fin_precarga(clave: tuple[str, str]) -> None:
+    with _precargas_lock:
+        _precargas.pop(clave, None)
+
+
+def _precargar_en_hilo(dbname: str, refcat: str) -> None:
+    with Registry(dbname).cursor() as cr:
+        _precargar(Environment(cr, SUPERUSER_ID, {}), refcat)
+
+
+def _precargar(env: Environment, refcat: str) -> None:
+    # Sin pasar por `consulta_con_cache`, que esperaría a esta misma precarga.
     try:
-        resultado = _normalizar_respuesta_catastro(data)
-    except KeyError as err:
-        _logger.warning("Estructura no reconocida en respuesta de Catastro: %s", data)
-        raise UserError("Catastro devolvió una estructura no reconocida.") from err
+        if _buscar_en_cache(env, refcat) is None:
+            configurar_cliente(env)
+            _guardar_en_cache(env, refcat, consulta_por_referencia(refcat))
+    except UserError as err:
+        _logger.debug("Precarga de %s sin resultado: %s", refcat, err)
+    except Exception:
+        _logger.exception("Error inesperado precargando %s de Catastro", refcat)
+
+
+def _esperar_precarga(env: Environment, refcat: str) -> bool:
+    """Si hay una precarga de `refcat` en curso, espera a que termine en
+    vez de repetir la consulta. Devuelve True si había una."""
+    with _precargas_lock:
+        futuro = _precargas.get((env.cr.dbname, refcat))
+    if futuro is None:
+        return False
+    try:
+        futuro.result(
+            timeout=leer_parametro(env, cfg.PARAM_TIMEOUT, float(cfg.DEFAULT_TIMEOUT))
+        )
+    except Exception:
+        return False
+    return True
+
+
+class _LimitadorTasa:
+    """Espacia las llamadas para no superar un número de peticiones por segundo."""
+
+    def __init__(self, peticiones_por_segundo: float):
+        peticiones_por_segundo = max(peticiones_por_segundo or 0, 0)
+        self.intervalo = 1.0 / peticiones_por_segundo if peticiones_por_segundo else 0
+        self._siguiente = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self) -> None:
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def _buscar_en_cache(env: Environment, refcat: str) -> ResponseCatastroInmueble | None:
+    """Busca `refcat` en memoria y, si no está, en `inmo.catastro.cache`."""
+    clave = (env.cr.dbname, refcat)
+    datos = _cache_memoria.obtener(clave)
+    if datos is not None:
+        _contar_cache("memoria")
+        return datos
+
+    datos = env["inmo.catastro.cache"].sudo()._obtener(refcat)
+    if datos is not None:
+        _contar_cache("bd")
+        _cache_memoria.guardar(clave, datos, _ttl_memoria(env))
+        return datos
+
+    _contar_cache("fallos")
+    return None
+
+
+def _guardar_en_cache(
+    env: Environment, refcat: str, datos: ResponseCatastroInmueble
+) -> None:
+    """Guarda la respuesta en ambos niveles de caché."""
+    ttl = leer_parametro(env, cfg.PARAM_CACHE_TTL, cfg.CACHE_TTL)
+    env["inmo.catastro.cache"].sudo()._guardar(refcat, datos, ttl)
+    _cache_memoria.guardar(
+        (env.cr.dbname, refcat), datos, min(ttl, cfg.CACHE_MEMORIA_TTL)
+    )
+
+
+def _ttl_memoria(env: Environment) -> int:
+    ttl = leer_parametro(env, cfg.PARAM_CACHE_TTL, cfg.CACHE_TTL)
+    return min(ttl, cfg.CACHE_MEMORIA_TTL)
+
+
+def estadisticas_cache() -> dict[str, int]:
+    """Aciertos (memoria / base de datos) y fallos acumulados en este proceso."""
+    with _estadisticas_lock:
+        return {
+            "memoria": _estadisticas_cache["memoria"],
+            "bd": _estadisticas_cache["bd"],
+            "fallos": _estadisticas_cache["fallos"],
+        }
+
+
+def limpiar_cache_memoria() -> None:
+    """Vacía la caché en memoria y sus contadores."""
+    _cache_memoria.limpiar()
+    with _estadisticas_lock:
+        _estadisticas_cache.clear()
 
-    resultado["referencia_catastral"] = refcat
-    return resultado
+
+def _contar_cache(tipo: str) -> None:
+    with _estadisticas_lock:
+        _estadisticas_cache[tipo] += 1
+    metricas.contar("catastro_cache", resultado=tipo)
 
 
 def mapear_campos_inmueble(
@@ -65,7 +739,23 @@ def mapear_campos_inmueble(
 ) -> dict[str, object]:
     """Convierte la respuesta normalizada en valores
     aptos para el modelo `inmo.inmueble`."""
+    return mapear_campos_inmuebles(env, [data])[0]
+
+
+def mapear_campos_inmuebles(
+    env: Environment, datos: Iterable[ResponseCatastroInmueble]
+) -> list[dict[str, object]]:
+    """Variante por lotes de `mapear_campos_inmueble`: el índice de
+    provincias se obtiene una vez y cada respuesta se mapea sin consultas."""
+    with metricas.medir("catastro.mapear", env):
+        Provincia = env["res.country.state"]
+        indice, espana_id = Provincia._inmo_indice_provincias()
+        return [_mapear_campos(data, Provincia, indice, espana_id) for data in datos]
 
+
+def _mapear_campos(
+    data: ResponseCatastroInmueble, Provincia, indice: dict[str, int], espana_id
+) -> dict[str, object]:
     resultado: dict[str, object] = {
         "calle": data.get("nombre_via") or False,
         "calle2": data.get("complemento_via") or False,
@@ -78,18 +768,10 @@ def mapear_campos_inmueble(
     if tipo_mapeado:
         resultado["tipo_inmueble"] = tipo_mapeado
 
-    provincia_nombre = data.get("provincia")
-    province = False
-    if provincia_nombre:
-        province = env["res.country.state"].search(
-            [("name", "ilike", provincia_nombre)], limit=1
-        )
-    resultado["provincia"] = province.id if province else False
-
-    country = province.country_id if province else False
-    if not country:
-        country = env["res.country"].search([("code", "=", "ES")], limit=1)
-    resultado["id_pais"] = country.id if country else False
+    resultado["provincia"] = Provincia._inmo_resolver_provincia(
+        data.get("provincia"), indice=indice
+    )
+    resultado["id_pais"] = espana_id
 
     # Generar el nombre comercial: TIPO_INMUEBLE + "EN" + DIRECCION
     tipo_codigo = resultado.get("tipo_inmueble")
@@ -108,7 +790,46 @@ def mapear_campos_inmueble(
 def _normalizar_respuesta_catastro(payload: dict) -> ResponseCatastroInmueble:
     """Reduce el JSON del Catastro a un diccionario de claves legibles."""
 
-    bi = payload["consulta_dnprcResult"]["bico"]["bi"]
+    return _normalizar_bi(payload["consulta_dnprcResult"]["bico"]["bi"])
+
+
+def _normalizar_lista_catastro(resultado: dict) -> list[ResponseCatastroInmueble]:
+    """Normaliza todos los inmuebles de una respuesta del callejero.
+
+    Catastro devuelve un único `bico.bi` cuando hay un inmueble y la lista
+    `lrcdnp.rcdnp` cuando hay varios; en ambos casos `bi` puede ser una lista.
+    Los elementos sin dirección urbana (p. ej. rústicos) se descartan.
+    """
+    bienes = []
+    for bico in _como_lista(resultado.get("bico")):
+        bienes += _como_lista(bico.get("bi"))
+    bienes += _como_lista((resultado.get("lrcdnp") or {}).get("rcdnp"))
+
+    normalizados = []
+    for bi in bienes:
+        rc = (bi.get("idbi") or {}).get("rc") or bi.get("rc") or {}
+        refcat = "".join(
+            rc.get(clave, "") for clave in ("pc1", "pc2", "car", "cc1", "cc2")
+        )
+        try:
+            datos = _normalizar_bi(bi)
+        except KeyError:
+            _logger.info("Inmueble de Catastro sin dirección urbana: %s", refcat)
+            continue
+        datos["referencia_catastral"] = normalizar_referencia(refcat)
+        normalizados.append(datos)
+    return normalizados
+
+
+def _como_lista(valor) -> list:
+    if not valor:
+        return []
+    return valor if isinstance(valor, list) else [valor]
+
+
+def _normalizar_bi(bi: dict) -> ResponseCatastroInmueble:
+    """Normaliza un elemento `bi` (o `rcdnp`, que no trae `debi`)."""
+    debi = bi.get("debi") or {}
     dir_urb = bi["dt"]["locs"]["lous"]["lourb"]
     dir_info = dir_urb["dir"]
     dir_int = dir_urb.get("loint", {})
@@ -120,8 +841,8 @@ def _normalizar_respuesta_catastro(payload: dict) -> ResponseCatastroInmueble:
         codigo_postal=dir_urb.get("dp", ""),
         nombre_via=f"{dir_info.get('tv', '')} {dir_info.get('nv', '')}".strip(),
         complemento_via=_formatea_complemento(dir_info, dir_int) or None,
-        superficie_m2=float(bi["debi"].get("sfc") or 0.0),
-        uso=bi["debi"].get("luso"),
+        superficie_m2=float(debi.get("sfc") or 0.0),
+        uso=debi.get("luso"),
         tipo_constructivo=bi["dt"].get("cmc"),
     )
 
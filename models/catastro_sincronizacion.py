@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter, defaultdict
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+from . import catastro_config as cfg
+from . import catastro_service, metricas
+from .parametros import leer_parametro
+
+_logger = logging.getLogger(__name__)
+
+# El nombre comercial se genera en el alta pero se suele retocar a mano,
+# así que la resincronización no lo toca.
+CAMPOS_EXCLUIDOS = frozenset({"nombre"})
+
+
+class CatastroSincronizacion(models.Model):
+    """Informe de una pasada de resincronización con Catastro.
+
+    El cron recorre por lotes los inmuebles con referencia catastral,
+    retomando donde lo dejó la ejecución anterior según su informe. Las respuestas cuya
+    huella coincide con la guardada se descartan sin escribir nada; en el
+    resto solo se escriben los campos que cambian.
+    """
+
+    _name = "inmo.catastro.sincronizacion"
+    _description = "Resincronización con Catastro"
+    _order = "fecha_inicio desc, id desc"
+    _rec_name = "fecha_inicio"
+
+    fecha_inicio = fields.Datetime(string="Inicio", readonly=True)
+    fecha_fin = fields.Datetime(string="Fin", readonly=True)
+    estado = fields.Selection(
+        selection=[
+            ("en_curso", "En curso"),
+            ("pausada", "Pausada"),
+            ("completa", "Recorrido completo"),
+            ("interrumpida", "Catastro no disponible"),
+        ],
+        string="Estado",
+        default="en_curso",
+        readonly=True,
+    )
+    revisados = fields.Integer(string="Revisados", readonly=True)
+    sin_cambios = fields.Integer(string="Sin cambios", readonly=True)
+    actualizados = fields.Integer(string="Actualizados", readonly=True)
+    no_encontrados = fields.Integer(string="No encontrados", readonly=True)
+    errores = fields.Integer(string="Con error", readonly=True)
+    ultimo_id = fields.Integer(
+        string="Último inmueble revisado",
+        readonly=True,
+        help="La siguiente pasada sigue a partir de este inmueble; 0 si el "
+        "recorrido terminó.",
+    )
+    campos_cambiados = fields.Json(string="Cambios por campo", readonly=True)
+    resumen_cambios = fields.Text(
+        string="Campos cambiados", compute="_compute_resumen_cambios"
+    )
+
+    @api.depends("campos_cambiados")
+    def _compute_resumen_cambios(self):
+        Inmueble = self.env["inmo.inmueble"]
+        for informe in self:
+            informe.resumen_cambios = "\n".join(
+                f"{Inmueble._fields[campo].string}: {total}"
+                for campo, total in sorted(
+                    (informe.campos_cambiados or {}).items(), key=lambda c: -c[1]
+                )
+                if campo in Inmueble._fields
+            )
+
+    @api.model
+    def _cron_resincronizar(self):
+        return self._resincronizar(auto_commit=True)
+
+    @api.model
+    def _resincronizar(self, auto_commit=False, max_lotes=None):
+        """Procesa lotes hasta agotar la ventana de tiempo, terminar el
+        recorrido o encontrar Catastro caído, y devuelve el informe."""
+        minutos = leer_parametro(self.env, cfg.PARAM_RESYNC_MINUTOS, cfg.RESYNC_MINUTOS)
+        peticiones_por_segundo = leer_parametro(
+            self.env,
+            cfg.PARAM_RESYNC_PETICIONES_POR_SEGUNDO,
+            cfg.LOTE_PETICIONES_POR_SEGUNDO,
+        )
+        cursor = self.search([], limit=1).ultimo_id
+        limite = time.monotonic() + minutos * 60
+        informe = self.create(
+            {"fecha_inicio": fields.Datetime.now(), "ultimo_id": cursor}
+        )
+        lotes = 0
+
+        while True:
+            if time.monotonic() >= limite or (max_lotes and lotes >= max_lotes):
+                estado = "pausada"
+                break
+            inmuebles = self.env["inmo.inmueble"].search(
+                [("referencia_catastral", "!=", False), ("id", ">", cursor)],
+                order="id",
+                limit=cfg.RESYNC_TAMANO_LOTE,
+            )
+            if not inmuebles:
+                estado, cursor = "completa", 0
+                break
+            if not informe._sincronizar_lote(inmuebles, peticiones_por_segundo):
+                estado = "interrumpida"
+                break
+            cursor = inmuebles[-1].id
+            lotes += 1
+            informe.ultimo_id = cursor
+            if auto_commit:
+                self.env.cr.commit()
+
+        informe.write(
+            {"estado": estado, "fecha_fin": fields.Datetime.now(), "ultimo_id": cursor}
+        )
+        _logger.info(
+            "Resincronización con Catastro %s: %s revisados, %s actualizados",
+            estado,
+            informe.revisados,
+            informe.actualizados,
+        )
+        if auto_commit:
+            self.env.cr.commit()
+        return informe
+
+    def _sincronizar_lote(self, inmuebles, peticiones_por_segundo):
+        """Consulta y aplica un lote. Devuelve False, sin tocar nada, si
+        Catastro no respondió a ninguna consulta."""
+        self.ensure_one()
+        referencias = {
+            inmueble.id: catastro_service.normalizar_referencia(
+                inmueble.referencia_catastral
+            )
+            for inmueble in inmuebles
+        }
+        respuestas = catastro_service.consulta_lote(
+            self.env,
+            referencias.values(),
+            peticiones_por_segundo=peticiones_por_segundo,
+            usar_cache=False,
+        )
+        if respuestas and all(
+            isinstance(respuesta, catastro_service.CatastroNoDisponibleError)
+            for respuesta in respuestas.values()
+        ):
+            return False
+
+        huellas = {
+            refcat: catastro_service.huella(respuesta)
+            for refcat, respuesta in respuestas.items()
+            if not isinstance(respuesta, UserError)
+        }
+        # Solo se mapean las respuestas que cambiaron respecto a lo guardado.
+        cambiadas = {
+            referencias[inmueble.id]
+            for inmueble in inmuebles
+            if referencias[inmueble.id] in huellas
+            and inmueble.catastro_hash != huellas[referencias[inmueble.id]]
+        }
+        valores_por_ref = dict(
+            zip(
+                cambiadas,
+                catastro_service.mapear_campos_inmuebles(
+                    self.env, [respuestas[refcat] for refcat in cambiadas]
+                ),
+                strict=True,
+            )
+        )
+
+        totales = Counter()
+        por_campo = Counter(self.campos_cambiados or {})
+        grupos = defaultdict(lambda: self.env["inmo.inmueble"])
+        nuevas_huellas = {}
+        for inmueble in inmuebles:
+            refcat = referencias[inmueble.id]
+            respuesta = respuestas.get(refcat)
+            totales["revisados"] += 1
+            if isinstance(respuesta, catastro_service.CatastroNoEncontradoError):
+                totales["no_encontrados"] += 1
+            elif respuesta is None or isinstance(respuesta, UserError):
+                totales["errores"] += 1
+            elif refcat not in cambiadas:
+                totales["sin_cambios"] += 1
+            else:
+                valores = {
+                    campo: valor
+                    for campo, valor in valores_por_ref[refcat].items()
+                    if campo not in CAMPOS_EXCLUIDOS
+                }
+                cambios = inmueble._cambios(valores)
+                por_campo.update(cambios)
+                nuevas_huellas[inmueble.id] = huellas[refcat]
+                if cambios:
+                    totales["actualizados"] += 1
+                    grupos[tuple(sorted(cambios.items()))] |= inmueble
+                else:
+                    totales["sin_cambios"] += 1
+
+        for valores, registros in grupos.items():
+            try:
+                with (
+                    self.env.cr.savepoint(),
+                    metricas.medir("catastro.escritura", self.env),
+                ):
+                    registros.write(dict(valores))
+            except (UserError, ValueError) as err:
+                _logger.warning("No se pudo resincronizar %s: %s", registros, err)
+                totales["errores"] += len(registros)
+                totales["actualizados"] -= len(registros)
+                for inmueble_id in registros.ids:
+                    del nuevas_huellas[inmueble_id]
+        self.env["inmo.inmueble"]._guardar_huellas(nuevas_huellas)
+
+        self.write(
+            {
+                campo: self[campo] + total
+                for campo, total in totales.items()
+                if campo in self._fields
+            }
+            | {"campos_cambiados": dict(por_campo)}
+        )
+        return True
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from dateutil.relativedelta import relativedelta
+from odoo import api, fields, models
+
+from .parametros import leer_parametro
+
+# Tiempo que se guardan las bajas: un portal que consulte con menos
+# frecuencia debe volver a pedir el feed completo.
+PARAM_BAJAS_DIAS = "inmo_odoo.feed_bajas_dias"
+BAJAS_DIAS = 90
+
+
+class FeedBaja(models.Model):
+    """Inmueble eliminado, para que el feed incremental lo retire de los
+    portales: un inmueble borrado ya no aparece por su `write_date`."""
+
+    _name = "inmo.feed.baja"
+    _description = "Baja del feed de portales"
+    _order = "fecha, id"
+    _rec_name = "referencia_catastral"
+    _log_access = False
+
+    inmueble_id = fields.Integer(string="Inmueble", required=True, readonly=True)
+    referencia_catastral = fields.Char(string="Referencia catastral", readonly=True)
+    fecha = fields.Datetime(string="Fecha", required=True, index=True, readonly=True)
+
+    @api.model
+    def _registrar(self, inmuebles):
+        """Anota la baja de `inmuebles`, que se van a eliminar."""
+        fecha = self.env.cr.now()
+        self.sudo().create(
+            [
+                {
+                    "inmueble_id": inmueble.id,
+                    "referencia_catastral": inmueble.referencia_catastral,
+                    "fecha": fecha,
+                }
+                for inmueble in inmuebles
+            ]
+        )
+
+    @api.model
+    def _cron_purgar(self):
+        """Borra las bajas más antiguas que `inmo_odoo.feed_bajas_dias`."""
+        dias = leer_parametro(self.env, PARAM_BAJAS_DIAS, BAJAS_DIAS)
+        self.env.cr.execute(
+            f"DELETE FROM {self._table} WHERE fecha < %s",
+            (fields.Datetime.now() - relativedelta(days=dias),),
+        )
+        self.invalidate_model()
@@ -0,0 +1,276 @@
+"""Exportación del catálogo para portales inmobiliarios.
+
+El feed se genera a trozos: los inmuebles se leen en bloques del tamaño de
+la precarga del ORM, recorridos por (`write_date`, `id`), y cada bloque se
+convierte a XML o JSON y se descarta antes de leer el siguiente, así que la
+memoria no depende del tamaño del catálogo.
+
+Con `desde` solo se exportan los inmuebles modificados después de esa fecha,
+incluidos los que han pasado a borrador, y las bajas de los eliminados, para
+que el portal los retire. El resultado llega hasta `hasta`, la última
+modificación en el momento de la petición, que el portal usa como `desde` en
+la siguiente consulta.
+
+`write_date` es la hora de inicio de la transacción, así que una escritura
+que tarde en confirmarse puede quedar por detrás de otras ya visibles. Por
+eso `hasta` nunca pasa de `MARGEN_DELTA` antes de ahora: lo más reciente
+sale en la consulta siguiente, cuando esas transacciones ya han terminado.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import defaultdict
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+from lxml import etree
+from odoo import models
+from odoo.api import Environment
+
+PARAM_TOKEN = "inmo_odoo.feed_token"
+TAMANO_BLOQUE = models.PREFETCH_MAX
+FORMATOS = {
+    "xml": "application/xml; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
+# Estados que no se publican en el feed completo.
+ESTADOS_OCULTOS = ("borrador",)
+# Margen para las transacciones que aún no se han confirmado.
+MARGEN_DELTA = timedelta(minutes=5)
+
+_CAMPOS = [
+    "nombre",
+    "referencia_catastral",
+    "estado",
+    "tipo_inmueble",
+    "calle",
+    "calle2",
+    "codigo_postal",
+    "ciudad",
+    "provincia",
+    "id_pais",
+    "superficie_construida",
+    "habitaciones",
+    "banos",
+    "precio",
+    "latitud",
+    "longitud",
+    "write_date",
+]
+
+
+def _dominio(desde: datetime | None, hasta: datetime | None = None) -> list:
+    dominio = (
+        [("write_date", ">", desde)]
+        if desde
+        else [("estado", "not in", ESTADOS_OCULTOS)]
+    )
+    if hasta:
+        dominio.append(("write_date", "<=", hasta))
+    return dominio
+
+
+def _dominio_bajas(desde: datetime, hasta: datetime | None = None) -> list:
+    dominio = [("fecha", ">", desde)]
+    if hasta:
+        dominio.append(("fecha", "<=", hasta))
+    return dominio
+
+
+def marca(env: Environment, desde: datetime | None = None):
+    """Última modificación y número de inmuebles (y bajas) del feed, con
+    consultas agregadas: basta para responder 304 sin generar nada."""
+    corte = env.cr.now() - MARGEN_DELTA
+    [(hasta, total)] = env["inmo.inmueble"]._read_group(
+        _dominio(desde, corte), [], ["write_date:max", "__count"]
+    )
+    if desde:
+        [(ultima_baja, bajas)] = env["inmo.feed.baja"]._read_group(
+            _dominio_bajas(desde, corte), [], ["fecha:max", "__count"]
+        )
+        hasta = max(filter(None, (hasta, ultima_baja)), default=None)
+        total += bajas
+    return hasta or desde, total
+
+
+def etag(formato: str, desde: datetime | None, hasta: datetime | None, total: int):
+    clave = f"{formato}|{desde}|{hasta}|{total}"
+    return hashlib.sha1(clave.encode()).hexdigest()
+
+
+def recorrer(
+    env: Environment,
+    desde: datetime | None,
+    hasta: datetime | None,
+    base_url: str,
+) -> Iterator[dict]:
+    """Devuelve los inmuebles del feed uno a uno, leídos por bloques."""
+    Inmueble = env["inmo.inmueble"]
+    dominio = _dominio(desde, hasta)
+    ultimo = None
+    while True:
+        clave = (
+            [
+                "|",
+                ("write_date", ">", ultimo.write_date),
+                "&",
+                ("write_date", "=", ultimo.write_date),
+                ("id", ">", ultimo.id),
+            ]
+            if ultimo
+            else []
+        )
+        bloque = Inmueble.search_fetch(
+            dominio + clave, _CAMPOS, order="write_date, id", limit=TAMANO_BLOQUE
+        )
+        if not bloque:
+            return
+        fotos = _fotos(env, bloque.ids, base_url)
+        for inmueble in bloque:
+            yield _fila(inmueble, fotos[inmueble.id])
+        ultimo = bloque[-1]
+        # Lo ya escrito no se vuelve a necesitar.
+        env.invalidate_all()
+
+
+def recorrer_bajas(
+    env: Environment, desde: datetime | None, hasta: datetime | None
+) -> Iterator[dict]:
+    """Devuelve las bajas del feed incremental, leídas por bloques."""
+    if not desde:
+        return
+    Baja = env["inmo.feed.baja"]
+    dominio = _dominio_bajas(desde, hasta)
+    ultimo = 0
+    while True:
+        bloque = Baja.search_fetch(
+            dominio + [("id", ">", ultimo)],
+            ["inmueble_id", "referencia_catastral", "fecha"],
+            order="id",
+            limit=TAMANO_BLOQUE,
+        )
+        if not bloque:
+            return
+        for baja in bloque:
+            yield {
+                "id": baja.inmueble_id,
+                "referencia_catastral": baja.referencia_catastral or "",
+                "fecha": baja.fecha.isoformat(),
+            }
+        ultimo = bloque[-1].id
+        env.invalidate_all()
+
+
+def _fotos(env: Environment, ids: list[int], base_url: str) -> dict[int, list[str]]:
+    """URL pública de las fotos de cada inmueble, en su orden."""
+    Foto = env["inmo.inmueble.foto"]
+    Foto.flush_model(["inmueble_id", "contenido_id", "secuencia"])
+    env.cr.execute(
+        f"""
+        SELECT f.inmueble_id, c.checksum
+          FROM {Foto._table} f
+          JOIN {env["inmo.foto.contenido"]._table} c ON c.id = f.contenido_id
+         WHERE f.inmueble_id IN %s
+         ORDER BY f.inmueble_id, f.secuencia, f.id
+        """,
+        [tuple(ids)],
+    )
+    fotos = defaultdict(list)
+    for inmueble_id, checksum in env.cr.fetchall():
+        fotos[inmueble_id].append(f"{base_url}/inmo/feed/foto/{checksum}")
+    return fotos
+
+
+def foto_publicada(env: Environment, checksum: str):
+    """Contenido con huella `checksum` si es foto de algún inmueble que se
+    publica en el feed; si no, un conjunto vacío."""
+    return env["inmo.foto.contenido"].search(
+        [
+            ("checksum", "=", checksum),
+            ("foto_ids.inmueble_id.estado", "not in", ESTADOS_OCULTOS),
+        ],
+        limit=1,
+    )
+
+
+def _fila(inmueble, fotos: list[str]) -> dict:
+    return {
+        "id": inmueble.id,
+        "nombre": inmueble.nombre or "",
+        "referencia_catastral": inmueble.referencia_catastral or "",
+        "estado": inmueble.estado,
+        "tipo": inmueble.tipo_inmueble or "",
+        "calle": inmueble.calle or "",
+        "calle2": inmueble.calle2 or "",
+        "codigo_postal": inmueble.codigo_postal or "",
+        "ciudad": inmueble.ciudad or "",
+        "provincia": inmueble.provincia.name or "",
+        "pais": inmueble.id_pais.code or "",
+        "superficie_construida": inmueble.superficie_construida,
+        "habitaciones": inmueble.habitaciones,
+        "banos": inmueble.banos,
+        "precio": inmueble.precio,
+        "latitud": inmueble.latitud or None,
+        "longitud": inmueble.longitud or None,
+        "modificado": inmueble.write_date.isoformat(),
+        "fotos": fotos,
+    }
+
+
+def exportar(
+    env: Environment,
+    formato: str,
+    desde: datetime | None,
+    hasta: datetime | None,
+    base_url: str,
+) -> Iterator[bytes]:
+    """Genera el feed en el formato pedido, trozo a trozo."""
+    filas = recorrer(env, desde, hasta, base_url)
+    bajas = recorrer_bajas(env, desde, hasta)
+    cabecera = {
+        "desde": desde.isoformat() if desde else "",
+        "hasta": hasta.isoformat() if hasta else "",
+    }
+    if formato == "json":
+        return _json(filas, bajas, cabecera)
+    return _xml(filas, bajas, cabecera)
+
+
+def _json(
+    filas: Iterator[dict], bajas: Iterator[dict], cabecera: dict
+) -> Iterator[bytes]:
+    yield json.dumps(cabecera)[:-1].encode() + b', "inmuebles": ['
+    separador = b""
+    for fila in filas:
+        yield separador + json.dumps(fila, ensure_ascii=False).encode()
+        separador = b","
+    yield b'], "bajas": ['
+    separador = b""
+    for baja in bajas:
+        yield separador + json.dumps(baja, ensure_ascii=False).encode()
+        separador = b","
+    yield b"]}"
+
+
+def _xml(
+    filas: Iterator[dict], bajas: Iterator[dict], cabecera: dict
+) -> Iterator[bytes]:
+    raiz = etree.tostring(etree.Element("inmuebles", cabecera))
+    yield b'<?xml version="1.0" encoding="UTF-8"?>\n' + raiz[:-2] + b">"
+    for fila in filas:
+        elemento = etree.Element("inmueble", id=str(fila.pop("id")))
+        fotos = fila.pop("fotos")
+        for campo, valor in fila.items():
+            etree.SubElement(elemento, campo).text = "" if valor is None else str(valor)
+        nodo_fotos = etree.SubElement(elemento, "fotos")
+        for url in fotos:
+            etree.SubElement(nodo_fotos, "foto").text = url
+        yield etree.tostring(elemento, encoding="utf-8")
+    for baja in bajas:
+        elemento = etree.Element("baja", id=str(baja.pop("id")))
+        for campo, valor in baja.items():
+            etree.SubElement(elemento, campo).text = valor
+        yield etree.tostring(elemento, encoding="utf-8")
+    yield b"</inmuebles>"
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import logging
+
+from odoo import _, api, fields, models, tools
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools.image import IMAGE_MAX_RESOLUTION
+from PIL import Image
+
+from .parametros import leer_parametro
+
+_logger = logging.getLogger(__name__)
+
+# Límites de las fotos subidas, ajustables como parámetros del sistema.
+PARAM_MAX_MB = "inmo_odoo.foto_max_mb"
+PARAM_RECOMPRIMIR_KB = "inmo_odoo.foto_recomprimir_kb"
+PARAM_CALIDAD = "inmo_odoo.foto_calidad"
+FOTO_MAX_MB = 15
+FOTO_RECOMPRIMIR_KB = 500
+FOTO_CALIDAD = 80
+RECOMPRIMIR_LOTE = 20
+FOTO_LADO_MAXIMO = 1920
+
+
+def comprobar_imagen(datos):
+    """Lee solo la cabecera de una imagen subida y devuelve el error si no
+    se puede abrir o tiene demasiados píxeles; si no, None."""
+    try:
+        with Image.open(io.BytesIO(datos)) as imagen:
+            if imagen.width * imagen.height > IMAGE_MAX_RESOLUTION:
+                raise ValueError(_("La imagen tiene demasiados píxeles."))
+    except (OSError, ValueError, Image.DecompressionBombError) as err:
+        return err
+    return None
+
+
+def procesar_imagen(datos, calidad=FOTO_CALIDAD):
+    """Endereza, reduce y recomprime en JPEG una imagen subida, o devuelve
+    el error. `image_process` da UserError si la imagen no se puede leer."""
+    try:
+        return tools.image_process(
+            datos,
+            size=(FOTO_LADO_MAXIMO, FOTO_LADO_MAXIMO),
+            quality=calidad,
+            output_format="JPEG",
+        )
+    except (OSError, ValueError, UserWarning, UserError) as err:
+        return err
+
+
+class FotoContenido(models.Model):
+    """Imagen compartida por todas las fotos con el mismo contenido.
+
+    Las fotos se identifican por el SHA-1 del archivo subido: si varias fichas
+    suben la misma imagen (p. ej. la fachada del edificio) se procesa y guarda
+    una sola vez.
+    """
+
+    _name = "inmo.foto.contenido"
+    _description = "Contenido de foto"
+    _rec_name = "checksum"
+
+    checksum = fields.Char(string="SHA-1", required=True, readonly=True)
+    imagen = fields.Image(max_width=1920, max_height=1920, string="Imagen")
+    imagen_512 = fields.Image(
+        related="imagen", max_width=512, max_height=512, store=True, string="Imagen 512"
+    )
+    imagen_256 = fields.Image(
+        related="imagen", max_width=256, max_height=256, store=True, string="Imagen 256"
+    )
+    imagen_128 = fields.Image(
+        related="imagen", max_width=128, max_height=128, store=True, string="Imagen 128"
+    )
+    tamano = fields.Integer(string="Tamaño (bytes)", readonly=True)
+    recomprimir = fields.Boolean(
+        string="Pendiente de recomprimir", readonly=True, index=True
+    )
+    original = fields.Binary(
+        string="Original pendiente",
+        attachment=True,
+        readonly=True,
+        help="Archivo subido en una subida masiva, a la espera de que el cron "
+        "lo prepare.",
+    )
+    foto_ids = fields.One2many(
+        comodel_name="inmo.inmueble.foto",
+        inverse_name="contenido_id",
+        string="Fotos",
+    )
+
+    _sql_constraints = [
+        (
+            "checksum_unico",
+            "unique(checksum)",
+            "Ya existe un contenido con la misma huella.",
+        ),
+    ]
+
+    @api.model
+    def _obtener_o_crear(self, imagenes, diferir=False):
+        """Devuelve, en el mismo orden, el contenido de cada imagen en base64,
+        reutilizando los existentes y creando el resto en una sola llamada.
+
+        Con `diferir` los contenidos nuevos guardan el archivo tal cual y el
+        cron de recompresión lo reduce después, fuera de la petición.
+        """
+        max_bytes = leer_parametro(self.env, PARAM_MAX_MB, FOTO_MAX_MB) * 1024 * 1024
+        huellas = []
+        nuevas = {}
+        for imagen in imagenes:
+            datos = base64.b64decode(imagen)
+            if len(datos) > max_bytes:
+                raise ValidationError(
+                    _("La foto ocupa %(mb).1f MB; el máximo es %(max)s MB.")
+                    % {"mb": len(datos) / 1024 / 1024, "max": max_bytes // 1048576}
+                )
+            huella = hashlib.sha1(datos).hexdigest()
+            huellas.append(huella)
+            nuevas.setdefault(huella, imagen)
+
+        existentes = {
+            contenido.checksum: contenido
+            for contenido in self.sudo().search([("checksum", "in", list(nuevas))])
+        }
+        campo = "original" if diferir else "imagen"
+        creados = self.sudo().create(
+            [
+                {"checksum": huella, campo: imagen, "recomprimir": diferir}
+                for huella, imagen in nuevas.items()
+                if huella not in existentes
+            ]
+        )
+        existentes.update((contenido.checksum, contenido) for contenido in creados)
+        if diferir:
+            creados._programar_recompresion()
+        else:
+            creados._marcar_para_recomprimir()
+        return [existentes[huella] for huella in huellas]
+
+    def _marcar_para_recomprimir(self):
+        """Anota el tamaño y deja para el cron las imágenes demasiado pesadas,
+        para no recomprimir durante la subida."""
+        umbral = (
+            leer_parametro(self.env, PARAM_RECOMPRIMIR_KB, FOTO_RECOMPRIMIR_KB) * 1024
+        )
+        pesadas = self.browse()
+        for contenido in self.with_context(bin_size=False):
+            tamano = len(base64.b64decode(contenido.imagen or b""))
+            contenido.tamano = tamano
+            if tamano > umbral:
+                pesadas |= contenido
+        if pesadas:
+            pesadas.recomprimir = True
+            pesadas._programar_recompresion()
+
+    def _programar_recompresion(self):
+        if not self:
+            return
+        cron = self.env.ref(
+            "inmo_odoo.ir_cron_recomprimir_fotos", raise_if_not_found=False
+        )
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_recomprimir(self, limite=RECOMPRIMIR_LOTE):
+        """Recomprime en JPEG las imágenes marcadas, por lotes, y prepara los
+        originales pendientes de las subidas masivas."""
+        calidad = leer_parametro(self.env, PARAM_CALIDAD, FOTO_CALIDAD)
+        contenidos = self.search([("recomprimir", "=", True)], limit=limite)
+        for contenido in contenidos.with_context(bin_size=False):
+            if contenido.original:
+                contenido._preparar_original(calidad)
+                continue
+            original = base64.b64decode(contenido.imagen or b"")
+            try:
+                comprimida = tools.image_process(
+                    original, quality=calidad, output_format="JPEG"
+                )
+            except (OSError, ValueError, UserWarning, UserError) as err:
+                _logger.warning("No se pudo recomprimir %s: %s", contenido, err)
+                contenido.recomprimir = False
+                continue
+            valores = {"recomprimir": False}
+            if len(comprimida) < len(original):
+                valores.update(
+                    imagen=base64.b64encode(comprimida), tamano=len(comprimida)
+                )
+            contenido.write(valores)
+        if len(contenidos) == limite:
+            self.env.ref("inmo_odoo.ir_cron_recomprimir_fotos")._trigger()
+        return len(contenidos)
+
+    def _preparar_original(self, calidad):
+        """Reduce y recomprime el original pendiente y lo pasa a `imagen`."""
+        self.ensure_one()
+        jpeg = procesar_imagen(base64.b64decode(self.original), calidad=calidad)
+        valores = {"recomprimir": False, "original": False}
+        if isinstance(jpeg, Exception):
+            _logger.warning("No se pudo preparar %s: %s", self, jpeg)
+        else:
+            valores.update(imagen=base64.b64encode(jpeg), tamano=len(jpeg))
+        self.write(valores)
+
+    @api.model
+    def _purgar_huerfanos(self, contenidos):
+        """Elimina los contenidos que ya no usa ninguna foto."""
+        huerfanos = contenidos.exists().filtered(
+            lambda contenido: not contenido.foto_ids
+        )
+        huerfanos.sudo().unlink()
@@ -1,17 +1,76 @@
-from odoo import fields, models
+from collections import defaultdict
+
+from odoo import api, fields, models
 
 
 class FotoInmueble(models.Model):
-    """Foto asociadas a un inmueble."""
+    """Foto asociadas a un inmueble.
+
+    La imagen vive en `inmo.foto.contenido`, compartida entre todas las
+    fotos con el mismo archivo.
+    """
 
     _name = "inmo.inmueble.foto"
     _description = "Foto del inmueble"
-    _order = "id"
+    _order = "secuencia, id"
 
     inmueble_id = fields.Many2one(
         comodel_name="inmo.inmueble",
         string="Inmueble",
         ondelete="cascade",
     )
+    secuencia = fields.Integer(string="Secuencia", default=10)
     descripcion = fields.Char(string="Descripción")
-    foto = fields.Image(max_width=1920, max_height=1920, string="Foto")
+    contenido_id = fields.Many2one(
+        comodel_name="inmo.foto.contenido",
+        string="Contenido",
+        ondelete="restrict",
+        index=True,
+        readonly=True,
+    )
+    foto = fields.Image(string="Foto", compute="_compute_foto", inverse="_inverse_foto")
+    # Derivadas guardadas al subir la foto, para listas y kanban.
+    foto_512 = fields.Image(related="contenido_id.imagen_512", string="Foto 512")
+    foto_256 = fields.Image(related="contenido_id.imagen_256", string="Foto 256")
+    foto_128 = fields.Image(related="contenido_id.imagen_128", string="Foto 128")
+
+    @api.depends("contenido_id.imagen")
+    def _compute_foto(self):
+        for record in self:
+            record.foto = record.contenido_id.imagen
+
+    def _inverse_foto(self):
+        con_foto = self.filtered("foto")
+        contenidos = self.env["inmo.foto.contenido"]._obtener_o_crear(
+            con_foto.mapped("foto")
+        )
+        anteriores = self.contenido_id
+        por_contenido = defaultdict(lambda: self.browse())
+        for record, contenido in zip(con_foto, contenidos, strict=True):
+            por_contenido[contenido] |= record
+        for contenido, records in por_contenido.items():
+            records.contenido_id = contenido
+        (self - con_foto).contenido_id = False
+        self.env["inmo.foto.contenido"]._purgar_huerfanos(
+            anteriores - self.contenido_id
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        fotos = super().create(vals_list)
+        fotos.inmueble_id._marcar_modificado()
+        return fotos
+
+    def write(self, vals):
+        inmuebles = self.inmueble_id
+        resultado = super().write(vals)
+        (inmuebles | self.inmueble_id)._marcar_modificado()
+        return resultado
+
+    def unlink(self):
+        contenidos = self.contenido_id
+        inmuebles = self.inmueble_id
+        resultado = super().unlink()
+        self.env["inmo.foto.contenido"]._purgar_huerfanos(contenidos)
+        inmuebles._marcar_modificado()
+        return resultado
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import csv
+import math
+import os
+from functools import lru_cache
+
+RADIO_TIERRA_KM = 6371.0088
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precisión del geohash guardado (~5 m) y máximo de celdas por búsqueda.
+GEOHASH_PRECISION = 9
+MAX_CELDAS = 9
+
+_CENTROIDES = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "data",
+    "centroides_codigo_postal.csv",
+)
+
+
+def geohash(latitud: float, longitud: float, precision=GEOHASH_PRECISION) -> str:
+    """Codifica unas coordenadas como geohash: celdas vecinas comparten
+    prefijo, así que un índice de prefijos sirve de índice espacial."""
+    lat = [-90.0, 90.0]
+    lon = [-180.0, 180.0]
+    caracteres = []
+    bit = valor = 0
+    par = True
+    while len(caracteres) < precision:
+        intervalo, coordenada = (lon, longitud) if par else (lat, latitud)
+        medio = (intervalo[0] + intervalo[1]) / 2
+        valor <<= 1
+        if coordenada >= medio:
+            valor |= 1
+            intervalo[0] = medio
+        else:
+            intervalo[1] = medio
+        par = not par
+        bit += 1
+        if bit == 5:
+            caracteres.append(_BASE32[valor])
+            bit = valor = 0
+    return "".join(caracteres)
+
+
+def _tamano_celda(precision: int) -> tuple[float, float]:
+    """Alto y ancho, en grados, de una celda de geohash."""
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def caja_alrededor(latitud: float, longitud: float, radio_km: float):
+    """Caja (sur, oeste, norte, este) que contiene el círculo del radio."""
+    dlat = math.degrees(radio_km / RADIO_TIERRA_KM)
+    coseno = max(math.cos(math.radians(latitud)), 1e-6)
+    dlon = min(180.0, dlat / coseno)
+    return (
+        max(-90.0, latitud - dlat),
+        max(-180.0, longitud - dlon),
+        min(90.0, latitud + dlat),
+        min(180.0, longitud + dlon),
+    )
+
+
+def celdas_caja(sur: float, oeste: float, norte: float, este: float) -> list[str]:
+    """Prefijos de geohash que cubren la caja, con la mayor precisión que
+    no supere `MAX_CELDAS` celdas."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        alto, ancho = _tamano_celda(precision)
+        filas = math.floor(norte / alto) - math.floor(sur / alto) + 1
+        columnas = math.floor(este / ancho) - math.floor(oeste / ancho) + 1
+        if filas * columnas <= MAX_CELDAS:
+            break
+    else:
+        return [""]
+    celdas = set()
+    for fila in range(filas):
+        lat = min(norte, sur + fila * alto)
+        for columna in range(columnas):
+            lon = min(este, oeste + columna * ancho)
+            celdas.add(geohash(lat, lon, precision))
+    return sorted(celdas)
+
+
+def distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia por la fórmula del semiverseno."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+@lru_cache(maxsize=1)
+def _centroides() -> dict[str, tuple[float, float]]:
+    with open(_CENTROIDES, encoding="utf-8") as archivo:
+        return {
+            fila["prefijo"]: (float(fila["latitud"]), float(fila["longitud"]))
+            for fila in csv.DictReader(archivo)
+        }
+
+
+def centroide_codigo_postal(codigo_postal: str | None) -> tuple[float, float] | None:
+    """Coordenadas aproximadas de un código postal según la tabla local,
+    buscando el prefijo más largo conocido (código completo o provincia)."""
+    codigo = (codigo_postal or "").strip()
+    if not codigo.isdigit():
+        return None
+    centroides = _centroides()
+    for longitud in range(len(codigo), 1, -1):
+        coordenadas = centroides.get(codigo[:longitud])
+        if coordenadas:
+            return coordenadas
+    return None
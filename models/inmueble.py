@@ -1,6 +1,33 @@
 from __future__ import annotations
 
-from odoo import api, fields, models
+import logging
+import re
+
+from odoo import _, api, fields, models, tools
+from odoo.exceptions import UserError, ValidationError
+from odoo.osv import expression
+
+from . import catastro_config as cfg
+from . import catastro_service, geo
+from . import inmueble_duplicado as duplicado
+from .busqueda import CAMPOS_INMUEBLE as CAMPOS_BUSQUEDA
+from .catastro_service import CatastroNoEncontradoError, normalizar_referencia
+from .normalizacion import normalizar_texto
+
+_logger = logging.getLogger(__name__)
+
+# Campos del inmueble que cambian alguna cifra de las estadísticas.
+CAMPOS_ESTADISTICA = frozenset(
+    {
+        "provincia",
+        "ciudad",
+        "estado",
+        "tipo_inmueble",
+        "superficie_construida",
+        "habitaciones",
+        "banos",
+    }
+)
 
 
 class Inmueble(models.Model):
@@ -15,10 +42,11 @@ class Inmueble(models.Model):
     _rec_name = "nombre"
     _description = "Inmueble"
 
-    nombre = fields.Char(string="Nombre comercial")
+    nombre = fields.Char(string="Nombre comercial", index="trigram")
     referencia_catastral = fields.Char(string="Referencia catastral")
     estado = fields.Selection(
         selection=[
+            ("borrador", "Borrador"),
             ("disponible", "Disponible"),
             ("reservado", "Reservado"),
             ("vendido", "Vendido"),
@@ -27,6 +55,7 @@ class Inmueble(models.Model):
         string="Estado",
         default="disponible",
         required=True,
+        index=True,
     )
     tipo_inmueble = fields.Selection(
         selection=[
@@ -36,15 +65,17 @@ class Inmueble(models.Model):
             ("terreno", "Terreno"),
         ],
         string="Tipo de inmueble",
+        index=True,
     )
-    calle = fields.Char(string="Calle")
+    calle = fields.Char(string="Calle", index="trigram")
     calle2 = fields.Char(string="Complemento dirección")
-    codigo_postal = fields.Char(string="Código postal")
-    ciudad = fields.Char(string="Ciudad")
+    codigo_postal = fields.Char(string="Código postal", index=True)
+    ciudad = fields.Char(string="Ciudad", index=True)
     provincia = fields.Many2one(
         comodel_name="res.country.state",
         string="Provincia",
         help="Provincia o estado donde se ubica el inmueble.",
+        index=True,
     )
     id_pais = fields.Many2one(
         comodel_name="res.country",
@@ -54,19 +85,672 @@ class Inmueble(models.Model):
     superficie_construida = fields.Float(string="Superficie construida (m2)")
     habitaciones = fields.Integer(string="Habitaciones")
     banos = fields.Integer(string="Baños")
+    precio = fields.Float(string="Precio (€)")
+    catastro_hash = fields.Char(
+        string="Huella de Catastro",
+        readonly=True,
+        copy=False,
+        help="Huella de la última respuesta de Catastro aplicada.",
+    )
     fotos_ids = fields.One2many(
         comodel_name="inmo.inmueble.foto",
         inverse_name="inmueble_id",
         string="Fotos",
     )
+    foto_portada_id = fields.Many2one(
+        comodel_name="inmo.inmueble.foto",
+        string="Foto de portada",
+        compute="_compute_foto_portada",
+        store=True,
+    )
     miniatura_kanban = fields.Image(
         string="Miniatura kanban",
-        compute="_compute_miniatura_kanban",
-        store=False,
+        related="foto_portada_id.foto_256",
+    )
+    texto_busqueda = fields.Text(
+        string="Texto de búsqueda",
+        compute="_compute_texto_busqueda",
+        store=True,
+        help="Nombre, referencia y dirección normalizados para la búsqueda "
+        "de texto completo.",
+    )
+    busqueda = fields.Char(
+        string="Búsqueda",
+        compute="_compute_busqueda",
+        search="_search_busqueda",
+    )
+    latitud = fields.Float(string="Latitud", digits=(10, 7))
+    longitud = fields.Float(string="Longitud", digits=(10, 7))
+    origen_coordenadas = fields.Selection(
+        selection=[
+            ("catastro", "Catastro"),
+            ("codigo_postal", "Código postal (aproximadas)"),
+            ("manual", "Manual"),
+        ],
+        string="Origen de las coordenadas",
+        readonly=True,
+    )
+    geohash = fields.Char(
+        string="Geohash",
+        compute="_compute_geohash",
+        store=True,
+        help="Celda de las coordenadas; su índice de prefijos sirve para las "
+        "búsquedas por proximidad.",
+    )
+    geo_pendiente = fields.Boolean(
+        string="Pendiente de geolocalizar", default=True, index=True, copy=False
+    )
+    url_mapa = fields.Char(string="Mapa", compute="_compute_url_mapa")
+    referencia_busqueda = fields.Char(
+        string="Referencia catastral (búsqueda)",
+        compute="_compute_busqueda",
+        search="_search_referencia",
+        help="Busca por el principio de la referencia, sin importar espacios "
+        "ni mayúsculas.",
+    )
+    cerca_de = fields.Char(
+        string="Cerca de",
+        compute="_compute_busqueda",
+        search="_search_cerca_de",
+        help="Latitud, longitud y radio en km, p. ej. «40.4168, -3.7038, 2».",
+    )
+    visitas_archivadas = fields.Integer(
+        string="Visitas archivadas",
+        default=0,
+        readonly=True,
+        copy=False,
+        help="Visitas pasadas al histórico; las mantiene el archivado.",
+    )
+    total_visitas = fields.Integer(string="Visitas", compute="_compute_total_visitas")
+    clave_bloqueo = fields.Char(
+        string="Clave de duplicados",
+        compute="_compute_clave_bloqueo",
+        store=True,
+        index=True,
+        help="Zona y portal normalizados: solo se comparan como posibles "
+        "duplicados los inmuebles con la misma clave o la misma parcela.",
+    )
+    parcela_catastral = fields.Char(
+        string="Parcela catastral",
+        compute="_compute_clave_bloqueo",
+        store=True,
+        index=True,
+    )
+
+    _sql_constraints = [
+        (
+            "referencia_catastral_unica",
+            "unique(referencia_catastral)",
+            "Ya hay un inmueble con esa referencia catastral.",
+        ),
+    ]
+
+    def _auto_init(self):
+        # Las referencias antiguas se normalizan antes de añadir la
+        # restricción única, que sustituye a los índices de versiones previas.
+        cr = self.env.cr
+        if tools.column_exists(cr, self._table, "referencia_catastral"):
+            cr.execute(
+                """
+                DROP INDEX IF EXISTS inmo_inmueble_referencia_catastral_unique,
+                                     inmo_inmueble_referencia_catastral_index
+                """
+            )
+            cr.execute(
+                f"""
+                UPDATE {self._table}
+                   SET referencia_catastral = NULLIF(
+                           upper(regexp_replace(referencia_catastral, '\\s+', '', 'g')),
+                           ''
+                       )
+                 WHERE referencia_catastral ~ '[[:space:][:lower:]]|^$'
+                """
+            )
+        return super()._auto_init()
+
+    def init(self):
+        """Índices que no se pueden declarar en los campos: texto completo,
+        prefijos de la referencia y trigramas sobre la ciudad."""
+        super().init()
+        cr = self.env.cr
+        tools.create_index(
+            cr,
+            "inmo_inmueble_texto_busqueda_fts_index",
+            self._table,
+            ["to_tsvector('simple', coalesce(texto_busqueda, ''))"],
+            method="gin",
+        )
+        if self.env.registry.has_trigram:
+            tools.create_index(
+                cr,
+                "inmo_inmueble_ciudad_trgm_index",
+                self._table,
+                ["ciudad gin_trgm_ops"],
+                method="gin",
+            )
+        tools.create_index(
+            cr,
+            "inmo_inmueble_referencia_catastral_prefijo_index",
+            self._table,
+            ["referencia_catastral varchar_pattern_ops"],
+        )
+        tools.create_index(
+            cr,
+            "inmo_inmueble_geohash_index",
+            self._table,
+            ["geohash varchar_pattern_ops"],
+        )
+        # Recorrido del feed de portales por fecha de modificación.
+        tools.create_index(
+            cr,
+            "inmo_inmueble_write_date_id_index",
+            self._table,
+            ["write_date", "id"],
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if "referencia_catastral" in vals:
+                vals["referencia_catastral"] = (
+                    normalizar_referencia(vals["referencia_catastral"]) or False
+                )
+        vals_list = [self._valores_geo(vals, alta=True) for vals in vals_list]
+        inmuebles = super().create(vals_list)
+        self.env["inmo.inmueble.estadistica"]._programar_refresco()
+        self.env["inmo.busqueda"]._sincronizar_inmuebles(inmuebles)
+        if inmuebles.filtered("geo_pendiente"):
+            self._programar_geolocalizacion()
+        return inmuebles
+
+    def write(self, vals):
+        if "referencia_catastral" in vals:
+            vals = dict(
+                vals,
+                referencia_catastral=normalizar_referencia(vals["referencia_catastral"])
+                or False,
+            )
+        if CAMPOS_ESTADISTICA & vals.keys():
+            self.env["inmo.inmueble.estadistica"]._programar_refresco()
+        vals = self._valores_geo(vals)
+        resultado = super().write(vals)
+        if CAMPOS_BUSQUEDA & vals.keys():
+            self.env["inmo.busqueda"]._sincronizar_inmuebles(self)
+        if {"referencia_catastral", "codigo_postal"} & vals.keys() and not (
+            {"latitud", "longitud", "geo_pendiente"} & vals.keys()
+        ):
+            # Cambia la dirección: las coordenadas manuales se respetan.
+            pendientes = self.filtered(lambda i: i.origen_coordenadas != "manual")
+            if pendientes:
+                pendientes.geo_pendiente = True
+                self._programar_geolocalizacion()
+        return resultado
+
+    def unlink(self):
+        self.env["inmo.inmueble.estadistica"]._programar_refresco()
+        # Las fotos se borran por el ORM y no en cascada, para que se purguen
+        # los contenidos que se queden sin usar.
+        self.fotos_ids.unlink()
+        self.env["inmo.feed.baja"]._registrar(self)
+        return super().unlink()
+
+    def _marcar_modificado(self):
+        """Pone al día `write_date` sin pasar por `write`, para que el feed de
+        portales recoja los cambios en las fotos."""
+        inmuebles = self.exists()
+        if not inmuebles:
+            return
+        self.env.cr.execute(
+            f"""
+            UPDATE {self._table}
+               SET write_date = %s, write_uid = %s
+             WHERE id IN %s
+            """,
+            [self.env.cr.now(), self.env.uid, tuple(inmuebles.ids)],
+        )
+        inmuebles.invalidate_recordset(["write_date", "write_uid"])
+
+    @api.model
+    def _guardar_huellas(self, huellas):
+        """Guarda en una sola sentencia la huella de Catastro de varios
+        inmuebles (`{id: huella}`); por `write` serían una por inmueble."""
+        if not huellas:
+            return
+        self.flush_model(["catastro_hash"])
+        self.env.cr.execute(
+            f"""
+            UPDATE {self._table} inmueble
+               SET catastro_hash = nueva.huella
+              FROM unnest(%s::int[], %s::varchar[]) AS nueva(id, huella)
+             WHERE inmueble.id = nueva.id
+            """,
+            [list(huellas), list(huellas.values())],
+        )
+        self.browse(huellas).invalidate_recordset(["catastro_hash"])
+
+    @api.model
+    def _valores_geo(self, vals, alta=False):
+        """Coordenadas escritas a mano quedan como manuales; en las altas sin
+        coordenadas se usa de entrada el centroide del código postal."""
+        if {"latitud", "longitud"} & vals.keys() and "origen_coordenadas" not in vals:
+            return dict(vals, origen_coordenadas="manual", geo_pendiente=False)
+        if alta and "origen_coordenadas" not in vals:
+            centroide = geo.centroide_codigo_postal(vals.get("codigo_postal"))
+            if centroide:
+                return dict(
+                    vals,
+                    latitud=centroide[0],
+                    longitud=centroide[1],
+                    origen_coordenadas="codigo_postal",
+                )
+        return vals
+
+    def _programar_geolocalizacion(self):
+        cron = self.env.ref(
+            "inmo_odoo.ir_cron_geolocalizar_inmuebles", raise_if_not_found=False
+        )
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_geolocalizar(self, limite=cfg.GEO_TAMANO_LOTE):
+        """Obtiene las coordenadas de los inmuebles pendientes: de Catastro si
+        tienen referencia y, si no, del centroide de su código postal.
+
+        Si Catastro no responde se deja el resto para la siguiente ejecución.
+        """
+        inmuebles = self.search([("geo_pendiente", "=", True)], limit=limite)
+        if inmuebles.filtered("referencia_catastral"):
+            catastro_service.configurar_cliente(self.env)
+        procesados = 0
+        for inmueble in inmuebles:
+            coordenadas, origen = None, "catastro"
+            if inmueble.referencia_catastral:
+                try:
+                    coordenadas = catastro_service.coordenadas_por_referencia(
+                        inmueble.referencia_catastral
+                    )
+                except CatastroNoEncontradoError:
+                    pass
+                except UserError as err:
+                    _logger.warning("Geolocalización aplazada: %s", err)
+                    break
+            if not coordenadas:
+                coordenadas = geo.centroide_codigo_postal(inmueble.codigo_postal)
+                origen = "codigo_postal"
+            vals = {"geo_pendiente": False}
+            if coordenadas:
+                vals.update(
+                    latitud=coordenadas[0],
+                    longitud=coordenadas[1],
+                    origen_coordenadas=origen,
+                )
+            inmueble.write(vals)
+            procesados += 1
+        else:
+            if len(inmuebles) == limite:
+                self._programar_geolocalizacion()
+        return procesados
+
+    @api.model
+    def buscar_en_radio(self, latitud, longitud, radio_km, limit=None):
+        """Inmuebles a menos de `radio_km` del punto, del más cercano al más
+        lejano."""
+        inmuebles = self.search(
+            [("cerca_de", "=", f"{latitud}, {longitud}, {radio_km}")]
+        )
+        inmuebles = inmuebles.sorted(
+            lambda i: geo.distancia_km(latitud, longitud, i.latitud, i.longitud)
+        )
+        return inmuebles[:limit] if limit else inmuebles
+
+    @api.model
+    def buscar_en_caja(self, sur, oeste, norte, este):
+        """Inmuebles dentro del rectángulo dado por sus esquinas."""
+        self.flush_model(["latitud", "longitud", "geohash"])
+        consulta = self._search([])
+        consulta.add_where(*self._condicion_caja(sur, oeste, norte, este))
+        return self.search([("id", "in", consulta)])
+
+    def _search_cerca_de(self, operator, value):
+        """Filtra por radio con las celdas de geohash que cubren el círculo
+        (índice de prefijos) y descarta después las esquinas fuera del radio."""
+        if operator not in ("ilike", "like", "="):
+            raise ValidationError(_("Operador de búsqueda no soportado: %s") % operator)
+        try:
+            latitud, longitud, radio_km = (
+                float(parte) for parte in str(value).replace(";", ",").split(",")
+            )
+        except ValueError as err:
+            raise ValidationError(
+                _("Indique latitud, longitud y radio en km, p. ej. 40.4168, -3.7038, 2")
+            ) from err
+        self.flush_model(["latitud", "longitud", "geohash"])
+        consulta = self._search([])
+        condicion, parametros = self._condicion_caja(
+            *geo.caja_alrededor(latitud, longitud, radio_km)
+        )
+        t = self._table
+        consulta.add_where(
+            f"""{condicion}
+            AND 2 * {geo.RADIO_TIERRA_KM} * asin(sqrt(least(1,
+                    power(sin(radians({t}.latitud - %s) / 2), 2)
+                    + cos(radians(%s)) * cos(radians({t}.latitud))
+                    * power(sin(radians({t}.longitud - %s) / 2), 2)
+                ))) <= %s""",
+            parametros + [latitud, latitud, longitud, radio_km],
+        )
+        return [("id", "in", consulta)]
+
+    def _condicion_caja(self, sur, oeste, norte, este):
+        t = self._table
+        celdas = geo.celdas_caja(sur, oeste, norte, este)
+        prefijos = " OR ".join(f"{t}.geohash LIKE %s" for _celda in celdas)
+        return (
+            f"({prefijos}) AND {t}.latitud BETWEEN %s AND %s "
+            f"AND {t}.longitud BETWEEN %s AND %s",
+            [f"{celda}%" for celda in celdas] + [sur, norte, oeste, este],
+        )
+
+    @api.depends("latitud", "longitud", "origen_coordenadas")
+    def _compute_geohash(self):
+        for inmueble in self:
+            inmueble.geohash = inmueble.origen_coordenadas and geo.geohash(
+                inmueble.latitud, inmueble.longitud
+            )
+
+    @api.depends("geohash")
+    def _compute_url_mapa(self):
+        for inmueble in self:
+            inmueble.url_mapa = inmueble.geohash and (
+                "https://www.openstreetmap.org/"
+                f"?mlat={inmueble.latitud}&mlon={inmueble.longitud}"
+                f"#map=18/{inmueble.latitud}/{inmueble.longitud}"
+            )
+
+    def _cambios(self, valores):
+        """Los `valores` que difieren de lo guardado, para no escribir (ni
+        recalcular) lo que no cambia."""
+        self.ensure_one()
+        cambios = {}
+        for nombre, valor in valores.items():
+            campo = self._fields[nombre]
+            actual = self[nombre]
+            if campo.type == "many2one":
+                actual = actual.id
+            if campo.type == "float":
+                distinto = tools.float_compare(
+                    actual or 0.0, valor or 0.0, precision_digits=2
+                )
+            else:
+                distinto = (actual or False) != (valor or False)
+            if distinto:
+                cambios[nombre] = valor
+        return cambios
+
+    @api.depends("visitas_archivadas")
+    def _compute_total_visitas(self):
+        vigentes = {
+            inmueble.id: total
+            for inmueble, total in self.env["calendar.event"]._read_group(
+                [("inmueble_id", "in", self.ids)], ["inmueble_id"], ["__count"]
+            )
+        }
+        for inmueble in self:
+            inmueble.total_visitas = (
+                vigentes.get(inmueble.id, 0) + inmueble.visitas_archivadas
+            )
+
+    def action_ver_visitas(self):
+        """Todas las visitas del inmueble, del calendario y del histórico."""
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Visitas",
+            "res_model": "inmo.visita.informe",
+            "view_mode": "tree,pivot,graph",
+            "domain": [("inmueble_id", "=", self.id)],
+        }
+
+    @api.depends("calle", "calle2", "codigo_postal", "ciudad", "referencia_catastral")
+    def _compute_clave_bloqueo(self):
+        for inmueble in self:
+            inmueble.clave_bloqueo = duplicado.clave_bloqueo(
+                inmueble.calle,
+                inmueble.calle2,
+                inmueble.codigo_postal,
+                inmueble.ciudad,
+            )
+            refcat = inmueble.referencia_catastral or ""
+            inmueble.parcela_catastral = refcat[:14] or False
+
+    @api.onchange("calle", "calle2", "codigo_postal", "ciudad", "referencia_catastral")
+    def _onchange_posibles_duplicados(self):
+        duplicados = self._posibles_duplicados()
+        if duplicados:
+            return {
+                "warning": {
+                    "title": _("Posible inmueble duplicado"),
+                    "message": _("Parece el mismo inmueble que:\n%s")
+                    % "\n".join(
+                        f"- {inmueble.display_name} ({puntos:.0%})"
+                        for inmueble, puntos in duplicados[:3]
+                    ),
+                }
+            }
+
+    @api.onchange("referencia_catastral")
+    def _onchange_precargar_catastro(self):
+        """Adelanta la consulta a Catastro mientras se termina la ficha, para
+        que el asistente la encuentre ya en caché."""
+        refcat = normalizar_referencia(self.referencia_catastral)
+        if refcat and not catastro_service.precargar(self.env, refcat):
+            return {
+                "warning": {
+                    "title": _("Referencia catastral no válida"),
+                    "message": _(
+                        "%s no es una referencia catastral: debe tener 20 "
+                        "caracteres y los dos últimos deben ser sus dígitos "
+                        "de control."
+                    )
+                    % refcat,
+                }
+            }
+
+    def _posibles_duplicados(self, umbral=duplicado.UMBRAL_DUPLICADO):
+        """Inmuebles del catálogo que puntúan como duplicados de este, del
+        más al menos parecido; busca solo en su bloque."""
+        self.ensure_one()
+        dominio = []
+        if self.clave_bloqueo:
+            dominio.append([("clave_bloqueo", "=", self.clave_bloqueo)])
+        if self.parcela_catastral:
+            dominio.append([("parcela_catastral", "=", self.parcela_catastral)])
+        if not dominio:
+            return []
+        candidatos = self.search(
+            expression.AND(
+                [expression.OR(dominio), [("id", "!=", self._origin.id or 0)]]
+            ),
+            limit=duplicado.MAX_BLOQUE,
+        )
+        propia = duplicado.firma(self)
+        duplicados = []
+        for candidato in candidatos:
+            puntos, _motivo = duplicado.puntuar(propia, duplicado.firma(candidato))
+            if puntos >= umbral:
+                duplicados.append((candidato, puntos))
+        return sorted(duplicados, key=lambda d: -d[1])
+
+    @api.model
+    def _parejas_candidatas(self):
+        """Parejas (id menor, id mayor) que comparten bloque, con una
+        autounión sobre los índices de las claves."""
+        self.flush_model(["clave_bloqueo", "parcela_catastral"])
+        consultas = []
+        for columna in ("clave_bloqueo", "parcela_catastral"):
+            consultas.append(
+                f"""
+                SELECT a.id, b.id
+                  FROM {self._table} a
+                  JOIN {self._table} b
+                    ON b.{columna} = a.{columna} AND b.id > a.id
+                 WHERE a.{columna} IN (
+                           SELECT {columna}
+                             FROM {self._table}
+                            WHERE {columna} IS NOT NULL
+                            GROUP BY {columna}
+                           HAVING count(*) BETWEEN 2 AND %(max_bloque)s
+                       )
+                """
+            )
+        self.env.cr.execute(
+            " UNION ".join(consultas) + " ORDER BY 1, 2",
+            {"max_bloque": duplicado.MAX_BLOQUE},
+        )
+        return self.env.cr.fetchall()
+
+    def _fusionar(self, otro):
+        """Pasa a este inmueble las fotos, visitas y demás registros del
+        otro, completa con sus datos lo que falte y lo elimina."""
+        self.ensure_one()
+        if otro == self:
+            raise UserError(_("No se puede fusionar un inmueble consigo mismo."))
+        solapes = self._visitas_solapadas(otro)
+        if solapes:
+            raise UserError(
+                _(
+                    "Los dos inmuebles tienen visitas a la misma hora. Archive "
+                    "una de cada pareja antes de fusionarlos:\n%s"
+                )
+                % "\n".join(
+                    f"- {visita.name} / {otra.name} ({visita.start})"
+                    for visita, otra in solapes
+                )
+            )
+        valores = {
+            campo: (
+                otro[campo].id
+                if self._fields[campo].type == "many2one"
+                else otro[campo]
+            )
+            for campo in duplicado.CAMPOS_FUSION
+            if otro[campo] and not self[campo]
+        }
+        if otro.visitas_archivadas:
+            # Su histórico pasa a este inmueble con el resto de registros.
+            valores["visitas_archivadas"] = (
+                self.visitas_archivadas + otro.visitas_archivadas
+            )
+        for modelo in self.env.registry.values():
+            if (
+                modelo._name in duplicado.MODELOS_SIN_MOVER
+                or modelo._abstract
+                or modelo._transient
+                or not modelo._auto
+            ):
+                continue
+            for campo in modelo._fields.values():
+                if (
+                    campo.type == "many2one"
+                    and campo.comodel_name == self._name
+                    and campo.store
+                ):
+                    self.env[modelo._name].sudo().with_context(
+                        active_test=False
+                    ).search([(campo.name, "=", otro.id)]).write({campo.name: self.id})
+        otro.unlink()
+        if valores:
+            self.write(valores)
+        self.env["inmo.busqueda"]._sincronizar_inmuebles(self)
+        _logger.info("Inmueble %s fusionado en %s", otro.id, self.id)
+
+    def _visitas_solapadas(self, otro):
+        """Parejas de visitas activas de este inmueble y del otro que se
+        solapan y que, una vez fusionados, chocarían entre sí."""
+        Evento = self.env["calendar.event"]
+        Evento.flush_model(["inmueble_id", "start", "stop", "active"])
+        self.env.cr.execute(
+            f"""
+            SELECT visita.id, otra.id
+              FROM {Evento._table} visita
+              JOIN {Evento._table} otra
+                ON otra.inmueble_id = %s
+               AND otra.active
+               AND otra.start < visita.stop
+               AND otra.stop > visita.start
+             WHERE visita.inmueble_id = %s
+               AND visita.active
+          ORDER BY visita.start
+            """,
+            (otro.id, self.id),
+        )
+        return [
+            (Evento.browse(visita), Evento.browse(otra))
+            for visita, otra in self.env.cr.fetchall()
+        ]
+
+    def action_ver_mapa(self):
+        self.ensure_one()
+        if not self.url_mapa:
+            raise UserError(_("El inmueble aún no tiene coordenadas."))
+        return {"type": "ir.actions.act_url", "url": self.url_mapa, "target": "new"}
+
+    @api.depends(
+        "nombre",
+        "referencia_catastral",
+        "calle",
+        "calle2",
+        "codigo_postal",
+        "ciudad",
+        "provincia.name",
     )
+    def _compute_texto_busqueda(self):
+        for inmueble in self:
+            partes = [
+                inmueble.nombre,
+                inmueble.referencia_catastral,
+                inmueble.calle,
+                inmueble.calle2,
+                inmueble.codigo_postal,
+                inmueble.ciudad,
+                inmueble.provincia.name,
+            ]
+            inmueble.texto_busqueda = normalizar_texto(" ".join(filter(None, partes)))
+
+    def _compute_busqueda(self):
+        self.busqueda = False
+        self.referencia_busqueda = False
+        self.cerca_de = False
+
+    def _search_referencia(self, operator, value):
+        """Prefijo de la referencia normalizada, que usa el índice de patrones."""
+        if operator not in ("ilike", "like", "=", "=like", "=ilike"):
+            raise ValidationError(_("Operador de búsqueda no soportado: %s") % operator)
+        refcat = re.sub(r"[^0-9A-ZÑ]", "", normalizar_referencia(str(value or "")))
+        if not refcat:
+            return []
+        return [("referencia_catastral", "=like", f"{refcat}%")]
+
+    def _search_busqueda(self, operator, value):
+        """Busca todas las palabras (como prefijo) en el texto normalizado,
+        usando el índice de texto completo."""
+        if operator not in ("ilike", "like", "=", "not ilike", "not like", "!="):
+            raise ValidationError(_("Operador de búsqueda no soportado: %s") % operator)
+        terminos = normalizar_texto(value if isinstance(value, str) else "").split()
+        if not terminos:
+            return []
+        self.flush_model(["texto_busqueda"])
+        consulta = self._search([])
+        consulta.add_where(
+            f"to_tsvector('simple', coalesce({self._table}.texto_busqueda, '')) "
+            "@@ to_tsquery('simple', %s)",
+            [" & ".join(f"{termino}:*" for termino in terminos)],
+        )
+        negativo = operator in ("not ilike", "not like", "!=")
+        return [("id", "not in" if negativo else "in", consulta)]
 
-    @api.depends("fotos_ids.foto")
-    def _compute_miniatura_kanban(self):
+    @api.depends("fotos_ids", "fotos_ids.secuencia")
+    def _compute_foto_portada(self):
         for inmueble in self:
-            foto = inmueble.fotos_ids[:1].foto
-            inmueble.miniatura_kanban = foto or False
+            inmueble.foto_portada_id = inmueble.fotos_ids[:1]
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import logging
+from difflib import SequenceMatcher
+
+from odoo import api, fields, models
+
+from .normalizacion import normalizar_calle, normalizar_texto, partes_complemento
+
+_logger = logging.getLogger(__name__)
+
+# Puntuación a partir de la cual dos inmuebles se consideran duplicados.
+UMBRAL_DUPLICADO = 0.8
+# Bloques más grandes que esto (p. ej. una parcela con cientos de viviendas)
+# no se comparan par a par en el análisis del catálogo.
+MAX_BLOQUE = 200
+# Campos que se copian del duplicado al fusionar si el que queda no los tiene.
+CAMPOS_FUSION = (
+    "referencia_catastral",
+    "tipo_inmueble",
+    "calle",
+    "calle2",
+    "codigo_postal",
+    "ciudad",
+    "provincia",
+    "id_pais",
+    "superficie_construida",
+    "habitaciones",
+    "banos",
+    "precio",
+)
+# Modelos que no se mueven al fusionar: se regeneran o caen en cascada.
+MODELOS_SIN_MOVER = frozenset(
+    {"inmo.inmueble", "inmo.inmueble.duplicado", "inmo.busqueda.candidato"}
+)
+
+
+def firma(inmueble) -> dict:
+    """Datos normalizados de un inmueble que se comparan entre candidatos."""
+    via, numero = normalizar_calle(inmueble.calle)
+    complemento = partes_complemento(inmueble.calle2)
+    return {
+        "via": via,
+        "numero": complemento.pop("numero", "") or numero,
+        "complemento": complemento,
+        "nombre": normalizar_texto(inmueble.nombre),
+        "referencia": inmueble.referencia_catastral or "",
+        "superficie": inmueble.superficie_construida or 0.0,
+    }
+
+
+def clave_bloqueo(calle, calle2, codigo_postal, ciudad) -> str | bool:
+    """Zona (código postal o ciudad) y portal (o primera palabra de la vía):
+    solo se comparan entre sí los inmuebles con la misma clave."""
+    zona = (codigo_postal or "").strip() or normalizar_texto(ciudad)
+    via, numero = normalizar_calle(calle)
+    numero = partes_complemento(calle2).get("numero") or numero
+    portal = numero or via.split(" ", 1)[0]
+    if not zona or not portal:
+        return False
+    return f"{zona}|{portal}"
+
+
+def _similitud(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def puntuar(a: dict, b: dict) -> tuple[float, str]:
+    """Puntuación de 0 a 1 de que dos firmas sean el mismo inmueble, con
+    el motivo principal."""
+    if a["referencia"] and a["referencia"] == b["referencia"]:
+        return 1.0, "Misma referencia catastral"
+    via = _similitud(a["via"], b["via"])
+    if a["complemento"] and b["complemento"]:
+        complemento = float(a["complemento"] == b["complemento"])
+    else:
+        complemento = 0.5 if a["complemento"] or b["complemento"] else 1.0
+    puntos = (
+        0.45 * via
+        + 0.15 * (a["numero"] == b["numero"])
+        + 0.25 * complemento
+        + 0.15 * _similitud(a["nombre"], b["nombre"])
+    )
+    motivo = "Misma dirección" if via > 0.9 else "Dirección parecida"
+    # Catastro o el piso y la puerta los distinguen: como mucho, sospechosos.
+    if a["referencia"] and b["referencia"]:
+        puntos = min(puntos, 0.5)
+    if not complemento:
+        puntos = min(puntos, 0.5)
+    if a["superficie"] and b["superficie"]:
+        diferencia = abs(a["superficie"] - b["superficie"]) / max(
+            a["superficie"], b["superficie"]
+        )
+        if diferencia > 0.1:
+            puntos -= 0.1
+    return max(0.0, round(puntos, 2)), motivo
+
+
+class InmuebleDuplicado(models.Model):
+    """Pareja de inmuebles que parecen el mismo.
+
+    El análisis del catálogo solo compara los inmuebles que comparten clave
+    de bloqueo (zona y portal) o parcela catastral, así que el coste depende
+    del tamaño de los bloques y no del catálogo entero al cuadrado.
+    """
+
+    _name = "inmo.inmueble.duplicado"
+    _description = "Posible inmueble duplicado"
+    _order = "puntuacion desc, id"
+
+    inmueble_id = fields.Many2one(
+        comodel_name="inmo.inmueble",
+        string="Inmueble",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    duplicado_id = fields.Many2one(
+        comodel_name="inmo.inmueble",
+        string="Posible duplicado",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    puntuacion = fields.Float(string="Parecido", digits=(3, 2), readonly=True)
+    motivo = fields.Char(string="Motivo", readonly=True)
+    estado = fields.Selection(
+        selection=[("pendiente", "Pendiente"), ("descartado", "No es duplicado")],
+        string="Estado",
+        default="pendiente",
+        required=True,
+        index=True,
+    )
+
+    _sql_constraints = [
+        (
+            "pareja_unica",
+            "unique(inmueble_id, duplicado_id)",
+            "La pareja de inmuebles ya está en el informe.",
+        ),
+        (
+            "pareja_ordenada",
+            "check(inmueble_id < duplicado_id)",
+            "El inmueble de la pareja debe ser el más antiguo.",
+        ),
+    ]
+
+    @api.model
+    def _analizar_catalogo(self, umbral=UMBRAL_DUPLICADO):
+        """Rehace el informe: añade las parejas nuevas, actualiza las
+        existentes sin tocar las descartadas y quita las que ya no lo son."""
+        Inmueble = self.env["inmo.inmueble"]
+        parejas = Inmueble._parejas_candidatas()
+        resultados = {}
+        for inicio in range(0, len(parejas), models.PREFETCH_MAX):
+            bloque = parejas[inicio : inicio + models.PREFETCH_MAX]
+            inmuebles = Inmueble.browse(
+                sorted({i for pareja in bloque for i in pareja})
+            )
+            firmas = {inmueble.id: firma(inmueble) for inmueble in inmuebles}
+            for a, b in bloque:
+                puntos, motivo = puntuar(firmas[a], firmas[b])
+                if puntos >= umbral:
+                    resultados[(a, b)] = (puntos, motivo)
+            self.env.invalidate_all()
+
+        existentes = {
+            (pareja.inmueble_id.id, pareja.duplicado_id.id): pareja
+            for pareja in self.search([])
+        }
+        obsoletas = self.browse(
+            [
+                pareja.id
+                for clave, pareja in existentes.items()
+                if clave not in resultados and pareja.estado == "pendiente"
+            ]
+        )
+        obsoletas.unlink()
+        for clave, (puntos, motivo) in resultados.items():
+            if clave in existentes:
+                existentes[clave].write({"puntuacion": puntos, "motivo": motivo})
+        self.create(
+            [
+                {
+                    "inmueble_id": a,
+                    "duplicado_id": b,
+                    "puntuacion": puntos,
+                    "motivo": motivo,
+                }
+                for (a, b), (puntos, motivo) in resultados.items()
+                if (a, b) not in existentes
+            ]
+        )
+        _logger.info(
+            "Duplicados: %s parejas comparadas, %s posibles duplicados",
+            len(parejas),
+            len(resultados),
+        )
+        return len(resultados)
+
+    @api.model
+    def action_analizar(self):
+        self._analizar_catalogo()
+        return self.env["ir.actions.actions"]._for_xml_id(
+            "inmo_odoo.action_inmueble_duplicado"
+        )
+
+    def action_descartar(self):
+        self.estado = "descartado"
+
+    def action_fusionar(self):
+        """Fusiona el posible duplicado en el inmueble más antiguo."""
+        self.ensure_one()
+        conservado = self.inmueble_id
+        conservado._fusionar(self.duplicado_id)
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": "inmo.inmueble",
+            "res_id": conservado.id,
+            "view_mode": "form",
+        }
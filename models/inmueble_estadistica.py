@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+# La vista lee las columnas que añaden estos modelos: se importan antes para
+# que se inicialicen primero al instalar.
+from . import inmueble, visita_inmueble  # noqa: F401
+
+_logger = logging.getLogger(__name__)
+
+# Segundos que se espera tras un cambio antes de refrescar, para agrupar
+# en un solo refresco las altas y ediciones seguidas.
+REFRESCO_ESPERA = 60
+
+
+class InmuebleEstadistica(models.Model):
+    """Resumen de la cartera por zona, estado y tipo de inmueble.
+
+    Se guarda en una vista materializada que refresca un cron poco después de
+    cada cambio, así que el cuadro de mando lee unas pocas filas ya calculadas
+    sea cual sea el tamaño del catálogo.
+
+    Cada fila es un nivel de agregación (detalle, provincia, estado, tipo o
+    total): las medias salen exactas de cada nivel en lugar de promediar
+    medias al agrupar.
+    """
+
+    _name = "inmo.inmueble.estadistica"
+    _description = "Estadísticas de inmuebles"
+    _auto = False
+    _order = "nivel, total desc"
+
+    nivel = fields.Selection(
+        selection=[
+            ("detalle", "Detalle"),
+            ("provincia", "Por provincia"),
+            ("estado", "Por estado"),
+            ("tipo", "Por tipo"),
+            ("total", "Total"),
+        ],
+        string="Nivel",
+        readonly=True,
+    )
+    provincia = fields.Many2one(
+        comodel_name="res.country.state", string="Provincia", readonly=True
+    )
+    ciudad = fields.Char(string="Ciudad", readonly=True)
+    estado = fields.Selection(
+        selection=lambda self: self.env["inmo.inmueble"]._fields["estado"].selection,
+        string="Estado",
+        readonly=True,
+    )
+    tipo_inmueble = fields.Selection(
+        selection=lambda self: self.env["inmo.inmueble"]
+        ._fields["tipo_inmueble"]
+        .selection,
+        string="Tipo de inmueble",
+        readonly=True,
+    )
+    total = fields.Integer(string="Inmuebles", readonly=True)
+    superficie_total = fields.Float(string="Superficie total (m2)", readonly=True)
+    superficie_media = fields.Float(
+        string="Superficie media (m2)", readonly=True, group_operator=False
+    )
+    habitaciones_media = fields.Float(
+        string="Habitaciones (media)", readonly=True, group_operator=False
+    )
+    banos_media = fields.Float(
+        string="Baños (media)", readonly=True, group_operator=False
+    )
+    habitaciones_0_1 = fields.Integer(string="0-1 habitaciones", readonly=True)
+    habitaciones_2 = fields.Integer(string="2 habitaciones", readonly=True)
+    habitaciones_3 = fields.Integer(string="3 habitaciones", readonly=True)
+    habitaciones_4_mas = fields.Integer(string="4+ habitaciones", readonly=True)
+    banos_0_1 = fields.Integer(string="0-1 baños", readonly=True)
+    banos_2 = fields.Integer(string="2 baños", readonly=True)
+    banos_3_mas = fields.Integer(string="3+ baños", readonly=True)
+    visitas = fields.Integer(string="Visitas", readonly=True)
+
+    def init(self):
+        """Crea la vista materializada con un índice único, necesario para
+        refrescarla sin bloquear las lecturas."""
+        cr = self.env.cr
+        cr.execute(f"DROP MATERIALIZED VIEW IF EXISTS {self._table}")
+        cr.execute(f"CREATE MATERIALIZED VIEW {self._table} AS ({self._consulta()})")
+        cr.execute(f"CREATE UNIQUE INDEX {self._table}_id_index ON {self._table} (id)")
+
+    def _consulta(self):
+        """Agrega la cartera en todos los niveles con una sola pasada."""
+        return """
+            WITH visitas AS (
+                SELECT inmueble_id, count(*) AS visitas
+                  FROM calendar_event
+                 WHERE inmueble_id IS NOT NULL AND active
+                 GROUP BY inmueble_id
+            ),
+            agregado AS (
+                SELECT CASE GROUPING(i.provincia, i.ciudad, i.estado, i.tipo_inmueble)
+                           WHEN 0 THEN 'detalle'
+                           WHEN 7 THEN 'provincia'
+                           WHEN 13 THEN 'estado'
+                           WHEN 14 THEN 'tipo'
+                           ELSE 'total'
+                       END AS nivel,
+                       i.provincia,
+                       i.ciudad,
+                       i.estado,
+                       i.tipo_inmueble,
+                       count(*) AS total,
+                       coalesce(sum(i.superficie_construida), 0) AS superficie_total,
+                       coalesce(avg(nullif(i.superficie_construida, 0)), 0)
+                           AS superficie_media,
+                       coalesce(avg(i.habitaciones), 0) AS habitaciones_media,
+                       coalesce(avg(i.banos), 0) AS banos_media,
+                       count(*) FILTER (WHERE coalesce(i.habitaciones, 0) <= 1)
+                           AS habitaciones_0_1,
+                       count(*) FILTER (WHERE i.habitaciones = 2) AS habitaciones_2,
+                       count(*) FILTER (WHERE i.habitaciones = 3) AS habitaciones_3,
+                       count(*) FILTER (WHERE i.habitaciones >= 4)
+                           AS habitaciones_4_mas,
+                       count(*) FILTER (WHERE coalesce(i.banos, 0) <= 1) AS banos_0_1,
+                       count(*) FILTER (WHERE i.banos = 2) AS banos_2,
+                       count(*) FILTER (WHERE i.banos >= 3) AS banos_3_mas,
+                       coalesce(sum(coalesce(v.visitas, 0)
+                                    + coalesce(i.visitas_archivadas, 0)), 0)
+                           AS visitas
+                  FROM inmo_inmueble i
+                  LEFT JOIN visitas v ON v.inmueble_id = i.id
+                 GROUP BY GROUPING SETS (
+                       (i.provincia, i.ciudad, i.estado, i.tipo_inmueble),
+                       (i.provincia),
+                       (i.estado),
+                       (i.tipo_inmueble),
+                       ()
+                 )
+            )
+            SELECT row_number() OVER (
+                       ORDER BY nivel, provincia, ciudad, estado, tipo_inmueble
+                   ) AS id,
+                   agregado.*
+              FROM agregado
+        """
+
+    @api.model
+    def _programar_refresco(self):
+        """Pide al cron un refresco en breve, una sola vez por transacción."""
+        datos = self.env.cr.precommit.data
+        if datos.get("inmo_odoo.estadisticas_pendientes"):
+            return
+        datos["inmo_odoo.estadisticas_pendientes"] = True
+        cron = self.env.ref(
+            "inmo_odoo.ir_cron_refrescar_estadisticas", raise_if_not_found=False
+        )
+        if cron:
+            cron.sudo()._trigger(
+                fields.Datetime.now() + timedelta(seconds=REFRESCO_ESPERA)
+            )
+
+    @api.model
+    def _cron_refrescar(self):
+        """Recalcula la vista materializada sin bloquear a quien la consulta."""
+        self.env.flush_all()
+        self.env.cr.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {self._table}")
+        self.invalidate_model()
+        _logger.info("Estadísticas de inmuebles refrescadas")
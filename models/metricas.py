@@ -0,0 +1,180 @@
+"""Métricas en memoria de las operaciones más costosas del módulo.
+
+Cada proceso acumula sus propias cifras: duración y consultas SQL por tramo
+(`medir`), errores por tipo y contadores de eventos (`contar`). Con las
+métricas desactivadas `medir` devuelve un contexto vacío y `contar` no hace
+nada, así que el coste es el de una comprobación de un booleano.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from odoo import tools
+from odoo.api import Environment
+
+PARAM_ACTIVAS = "inmo_odoo.metricas_activas"
+PARAM_TOKEN = "inmo_odoo.metricas_token"
+
+_NULO = contextlib.nullcontext()
+
+
+@dataclass
+class Tramo:
+    """Acumulado de una operación medida."""
+
+    llamadas: int = 0
+    segundos: float = 0.0
+    maximo: float = 0.0
+    consultas_sql: int = 0
+    errores: int = 0
+
+
+_activas = False
+_tramos: defaultdict[str, Tramo] = defaultdict(Tramo)
+_contadores: defaultdict[tuple[str, tuple[tuple[str, str], ...]], int] = defaultdict(
+    int
+)
+_lock = threading.Lock()
+
+
+def sincronizar(env: Environment) -> bool:
+    """Lee del parámetro del sistema si las métricas están activas."""
+    global _activas
+    _activas = bool(
+        tools.str2bool(
+            env["ir.config_parameter"].sudo().get_param(PARAM_ACTIVAS, "False")
+        )
+    )
+    return _activas
+
+
+def activas() -> bool:
+    return _activas
+
+
+class _Medicion:
+    def __init__(self, nombre: str, cr):
+        self.nombre = nombre
+        self.cr = cr
+
+    def __enter__(self):
+        self._sql = getattr(self.cr, "sql_log_count", 0)
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, error, traza):
+        duracion = time.perf_counter() - self._inicio
+        consultas = getattr(self.cr, "sql_log_count", 0) - self._sql
+        with _lock:
+            tramo = _tramos[self.nombre]
+            tramo.llamadas += 1
+            tramo.segundos += duracion
+            tramo.maximo = max(tramo.maximo, duracion)
+            tramo.consultas_sql += consultas
+            if tipo is not None:
+                tramo.errores += 1
+                _contadores[
+                    ("errores", (("operacion", self.nombre), ("tipo", tipo.__name__)))
+                ] += 1
+        return False
+
+
+def medir(nombre: str, env: Environment | None = None):
+    """Contexto que mide la duración y las consultas SQL de `nombre`.
+
+    Con `env` se actualiza el interruptor y se cuentan las consultas de su
+    cursor; sin él (p. ej. en hilos sin entorno) sólo se mide el tiempo.
+    """
+    if env is not None:
+        sincronizar(env)
+    if not _activas:
+        return _NULO
+    return _Medicion(nombre, env.cr if env is not None else None)
+
+
+def contar(nombre: str, cantidad: int = 1, **etiquetas: str) -> None:
+    """Suma `cantidad` al contador `nombre` con las etiquetas indicadas."""
+    if not _activas:
+        return
+    clave = (nombre, tuple(sorted(etiquetas.items())))
+    with _lock:
+        _contadores[clave] += cantidad
+
+
+def instantanea() -> dict[str, dict]:
+    """Copia de las métricas acumuladas en este proceso."""
+    with _lock:
+        return {
+            "tramos": {
+                nombre: Tramo(**vars(tramo)) for nombre, tramo in _tramos.items()
+            },
+            "contadores": dict(_contadores),
+        }
+
+
+def reiniciar() -> None:
+    with _lock:
+        _tramos.clear()
+        _contadores.clear()
+
+
+def exportar_prometheus() -> str:
+    """Métricas en el formato de texto de Prometheus."""
+    datos = instantanea()
+    lineas = [
+        "# HELP inmo_operacion_segundos Duración de las operaciones medidas.",
+        "# TYPE inmo_operacion_segundos summary",
+    ]
+    for nombre, tramo in sorted(datos["tramos"].items()):
+        etiqueta = _etiquetas({"operacion": nombre})
+        lineas += [
+            f"inmo_operacion_segundos_count{etiqueta} {tramo.llamadas}",
+            f"inmo_operacion_segundos_sum{etiqueta} {tramo.segundos:.6f}",
+        ]
+    for metrica, tipo, ayuda, atributo in (
+        ("inmo_operacion_segundos_max", "gauge", "Duración máxima.", "maximo"),
+        (
+            "inmo_operacion_consultas_sql_total",
+            "counter",
+            "Consultas SQL lanzadas dentro de la operación.",
+            "consultas_sql",
+        ),
+        (
+            "inmo_operacion_errores_total",
+            "counter",
+            "Operaciones terminadas con excepción.",
+            "errores",
+        ),
+    ):
+        lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} {tipo}"]
+        for nombre, tramo in sorted(datos["tramos"].items()):
+            etiqueta = _etiquetas({"operacion": nombre})
+            lineas.append(f"{metrica}{etiqueta} {getattr(tramo, atributo)}")
+
+    por_nombre = defaultdict(list)
+    for (nombre, etiquetas), valor in datos["contadores"].items():
+        por_nombre[nombre].append((etiquetas, valor))
+    for nombre, valores in sorted(por_nombre.items()):
+        metrica = f"inmo_{nombre}_total"
+        lineas.append(f"# TYPE {metrica} counter")
+        for etiquetas, valor in sorted(valores):
+            lineas.append(f"{metrica}{_etiquetas(dict(etiquetas))} {valor}")
+    return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(etiquetas: dict[str, str]) -> str:
+    if not etiquetas:
+        return ""
+    texto = ",".join(
+        f'{clave}="{_escapar(str(valor))}"' for clave, valor in etiquetas.items()
+    )
+    return "{" + texto + "}"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
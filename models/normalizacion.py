@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar_texto(valor: str | None) -> str:
+    """Pasa el texto a minúsculas sin tildes ni signos, con un único espacio
+    entre palabras, para comparar nombres escritos de distintas formas."""
+    if not valor:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", valor)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_tildes.lower()).strip()
+
+
+# Tipos de vía y artículos que no distinguen una calle de otra.
+_TIPOS_VIA = frozenset(
+    {
+        "c",
+        "cl",
+        "calle",
+        "av",
+        "avd",
+        "avda",
+        "avenida",
+        "pz",
+        "pza",
+        "plaza",
+        "ps",
+        "paseo",
+        "ctra",
+        "carretera",
+        "cm",
+        "camino",
+        "rd",
+        "ronda",
+        "tr",
+        "trv",
+        "travesia",
+        "gl",
+        "glorieta",
+        "pj",
+        "pasaje",
+        "urb",
+        "urbanizacion",
+    }
+)
+_ARTICULOS = frozenset({"de", "del", "la", "las", "el", "los", "y"})
+_MARCAS_NUMERO = frozenset({"n", "no", "num", "numero"})
+
+# Etiquetas del complemento, tal como lo escribe Catastro (`Nº 5 Esc. 1
+# Pl. 03 Pu. B`) o a mano.
+_ETIQUETAS_COMPLEMENTO = {
+    "n": "numero",
+    "no": "numero",
+    "num": "numero",
+    "numero": "numero",
+    "portal": "numero",
+    "esc": "escalera",
+    "escalera": "escalera",
+    "pl": "planta",
+    "planta": "planta",
+    "piso": "planta",
+    "pu": "puerta",
+    "pta": "puerta",
+    "puerta": "puerta",
+}
+_PLANTAS = {"bajo": "0", "bj": "0", "atico": "at", "entresuelo": "en"}
+
+
+def _valor_complemento(valor: str) -> str:
+    valor = _PLANTAS.get(valor, valor)
+    # `3o` (3º) es la planta 3; `03` también.
+    if valor[:-1].isdigit() and valor[-1] in "oa":
+        valor = valor[:-1]
+    return (valor.lstrip("0") or "0") if valor.isdigit() else valor
+
+
+def normalizar_calle(calle: str | None) -> tuple[str, str]:
+    """Separa el nombre de la vía, sin tipo de vía ni artículos, del número
+    de portal que la acompañe: `C/ de la Paz, 5` da `("paz", "5")`."""
+    palabras = normalizar_texto(calle).split()
+    numero = ""
+    if palabras and palabras[-1].isdigit():
+        numero = palabras.pop().lstrip("0") or "0"
+        if palabras and palabras[-1] in _MARCAS_NUMERO:
+            palabras.pop()
+    while palabras and palabras[0] in _TIPOS_VIA:
+        palabras.pop(0)
+    return " ".join(p for p in palabras if p not in _ARTICULOS), numero
+
+
+def partes_complemento(complemento: str | None) -> dict[str, str]:
+    """Número, escalera, planta y puerta del complemento de la dirección.
+    Lo que no lleva etiqueta se toma, por orden, como planta y puerta."""
+    palabras = normalizar_texto(complemento).split()
+    partes: dict[str, str] = {}
+    sueltas = []
+    indice = 0
+    while indice < len(palabras):
+        etiqueta = _ETIQUETAS_COMPLEMENTO.get(palabras[indice])
+        if etiqueta and indice + 1 < len(palabras):
+            partes[etiqueta] = _valor_complemento(palabras[indice + 1])
+            indice += 2
+        else:
+            sueltas.append(_valor_complemento(palabras[indice]))
+            indice += 1
+    for etiqueta in ("planta", "puerta"):
+        if sueltas and etiqueta not in partes:
+            partes[etiqueta] = sueltas.pop(0)
+    return partes
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import logging
+
+from odoo.api import Environment
+
+_logger = logging.getLogger(__name__)
+
+
+def leer_parametro(env: Environment, clave: str, defecto):
+    """Lee un parámetro del sistema con el tipo de `defecto`, que también se
+    usa cuando el valor guardado no es válido."""
+    valor = env["ir.config_parameter"].sudo().get_param(clave, defecto)
+    try:
+        return type(defecto)(valor)
+    except (TypeError, ValueError):
+        _logger.warning("Valor no válido para %s: %r", clave, valor)
+        return defecto
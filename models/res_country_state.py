@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import re
+
+from odoo import api, models, tools
+
+from .normalizacion import normalizar_texto
+
+_ARTICULO_INICIAL = re.compile(r"^(?:a|el|la|las|los|l|les|o|as|os)\s+")
+
+# Nombres que usa Catastro y no coinciden con ninguna variante del nombre de
+# la provincia en Odoo. Las claves y los valores ya están normalizados.
+_ALIAS_PROVINCIAS = {
+    "baleares": "illes balears",
+    "islas baleares": "illes balears",
+    "tenerife": "santa cruz de tenerife",
+}
+
+
+class ResCountryState(models.Model):
+    _inherit = "res.country.state"
+
+    @api.model
+    @tools.ormcache()
+    def _inmo_indice_provincias(self):
+        """Índice nombre normalizado -> id de las provincias de España.
+
+        Se construye una vez por registro y se invalida al modificar
+        cualquier provincia. Devuelve también el id de España.
+        """
+        espana = self.env["res.country"].sudo().search([("code", "=", "ES")], limit=1)
+        indice = {}
+        if not espana:
+            return indice, False
+
+        provincias = self.sudo().search_read([("country_id", "=", espana.id)], ["name"])
+        for provincia in provincias:
+            for variante in _variantes_nombre(provincia["name"]):
+                indice.setdefault(variante, provincia["id"])
+        for alias, nombre in _ALIAS_PROVINCIAS.items():
+            if nombre in indice:
+                indice.setdefault(alias, indice[nombre])
+        return indice, espana.id
+
+    @api.model
+    def _inmo_resolver_provincia(self, nombre, indice=None):
+        """Devuelve el id de la provincia española llamada `nombre` (o False).
+
+        La comparación es exacta sobre el nombre normalizado y sus variantes,
+        así que "Ávila" no puede acabar en otra provincia que lo contenga.
+        """
+        if indice is None:
+            indice, _espana_id = self._inmo_indice_provincias()
+        for candidato in _variantes_nombre(nombre):
+            if candidato in indice:
+                return indice[candidato]
+        return False
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env.registry.clear_cache()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if {"name", "country_id"} & vals.keys():
+            self.env.registry.clear_cache()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()
+        return super().unlink()
+
+
+def _variantes_nombre(nombre):
+    """Variantes normalizadas de un nombre de provincia: completo, cada una de
+    sus formas bilingües ("Alacant (Alicante)", "Araba/Álava") y sin artículo.
+    """
+    if not nombre:
+        return []
+    partes = [nombre, *re.split(r"[()/]", nombre)]
+    variantes = []
+    for parte in partes:
+        normalizado = normalizar_texto(parte)
+        for variante in (normalizado, _ARTICULO_INICIAL.sub("", normalizado)):
+            if variante and variante not in variantes:
+                variantes.append(variante)
+    return variantes
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import logging
+
+from dateutil.relativedelta import relativedelta
+from odoo import api, fields, models
+
+from .parametros import leer_parametro
+from .visita_inmueble import RESULTADOS_VISITA
+
+_logger = logging.getLogger(__name__)
+
+# Antigüedad a partir de la cual una visita pasa al histórico.
+PARAM_ARCHIVO_MESES = "inmo_odoo.visita_archivo_meses"
+ARCHIVO_MESES = 24
+ARCHIVO_TAMANO_LOTE = 1000
+
+
+class VisitaHistorico(models.Model):
+    """Visita antigua guardada en forma compacta.
+
+    Las visitas terminadas hace más de `inmo_odoo.visita_archivo_meses` meses
+    se copian aquí con lo imprescindible y se borran del calendario, que deja
+    de cargar con asistentes, alarmas y actividades de años atrás.
+    """
+
+    _name = "inmo.visita.historico"
+    _description = "Histórico de visitas"
+    _order = "fecha desc, id desc"
+    _rec_name = "fecha"
+    _log_access = False
+
+    evento_id = fields.Integer(string="Evento original", readonly=True)
+    inmueble_id = fields.Many2one(
+        comodel_name="inmo.inmueble",
+        string="Inmueble",
+        required=True,
+        ondelete="cascade",
+        index=True,
+        readonly=True,
+    )
+    cliente_id = fields.Many2one(
+        comodel_name="res.partner",
+        string="Cliente",
+        ondelete="set null",
+        index=True,
+        readonly=True,
+    )
+    user_id = fields.Many2one(
+        comodel_name="res.users", string="Agente", ondelete="set null", readonly=True
+    )
+    fecha = fields.Datetime(string="Fecha", required=True, readonly=True)
+    duracion = fields.Float(string="Duración (h)", readonly=True)
+    resultado = fields.Selection(
+        selection=RESULTADOS_VISITA, string="Resultado", readonly=True
+    )
+
+    _sql_constraints = [
+        (
+            "evento_unico",
+            "unique(evento_id)",
+            "La visita ya está en el histórico.",
+        ),
+    ]
+
+    @api.model
+    def _cron_archivar(self):
+        return self._archivar(auto_commit=True)
+
+    @api.model
+    def _archivar(self, limite=None, auto_commit=False):
+        """Pasa al histórico, por lotes, las visitas terminadas antes de
+        `limite` y devuelve cuántas se han archivado."""
+        if limite is None:
+            meses = leer_parametro(self.env, PARAM_ARCHIVO_MESES, ARCHIVO_MESES)
+            limite = fields.Datetime.now() - relativedelta(months=meses)
+        Evento = self.env["calendar.event"]
+        total = 0
+        while True:
+            ids = self._archivar_lote(limite)
+            if not ids:
+                break
+            Evento.browse(ids).with_context(
+                no_mail_to_attendees=True, active_test=False
+            ).unlink()
+            total += len(ids)
+            _logger.info("Histórico de visitas: %s archivadas", total)
+            if auto_commit:
+                self.env.cr.commit()
+        return total
+
+    def _archivar_lote(self, limite):
+        """Copia un lote al histórico y suma las visitas archivadas de cada
+        inmueble, todo en una sentencia. Devuelve los eventos copiados."""
+        Evento = self.env["calendar.event"]
+        Inmueble = self.env["inmo.inmueble"]
+        self.env.flush_all()
+        self.env.cr.execute(
+            f"""
+            WITH lote AS (
+                SELECT id
+                  FROM {Evento._table}
+                 WHERE inmueble_id IS NOT NULL
+                   AND active
+                   AND stop < %(limite)s
+                 ORDER BY id
+                 LIMIT %(tamano)s
+                   FOR UPDATE SKIP LOCKED
+            ),
+            copiadas AS (
+                INSERT INTO {self._table}
+                       (evento_id, inmueble_id, cliente_id, user_id, fecha,
+                        duracion, resultado)
+                SELECT e.id, e.inmueble_id, e.cliente_id, e.user_id, e.start,
+                       e.duration, e.resultado
+                  FROM {Evento._table} e
+                  JOIN lote ON lote.id = e.id
+                    ON CONFLICT (evento_id) DO NOTHING
+                RETURNING inmueble_id
+            ),
+            contadores AS (
+                UPDATE {Inmueble._table} i
+                   SET visitas_archivadas = coalesce(i.visitas_archivadas, 0) + c.n
+                  FROM (
+                        SELECT inmueble_id, count(*) AS n
+                          FROM copiadas
+                         GROUP BY inmueble_id
+                       ) c
+                 WHERE i.id = c.inmueble_id
+            )
+            SELECT id FROM lote
+            """,
+            {"limite": limite, "tamano": ARCHIVO_TAMANO_LOTE},
+        )
+        ids = [fila[0] for fila in self.env.cr.fetchall()]
+        if ids:
+            self.invalidate_model()
+            Inmueble.invalidate_model(["visitas_archivadas", "total_visitas"])
+        return ids
+
+
+class VisitaInforme(models.Model):
+    """Visitas vigentes y archivadas juntas, para informes que abarcan
+    cualquier periodo sin saber dónde está cada visita."""
+
+    _name = "inmo.visita.informe"
+    _description = "Informe de visitas"
+    _auto = False
+    _order = "fecha desc"
+    _rec_name = "fecha"
+
+    origen = fields.Selection(
+        selection=[("calendario", "Calendario"), ("historico", "Histórico")],
+        string="Origen",
+        readonly=True,
+    )
+    inmueble_id = fields.Many2one(
+        comodel_name="inmo.inmueble", string="Inmueble", readonly=True
+    )
+    cliente_id = fields.Many2one(
+        comodel_name="res.partner", string="Cliente", readonly=True
+    )
+    user_id = fields.Many2one(comodel_name="res.users", string="Agente", readonly=True)
+    fecha = fields.Datetime(string="Fecha", readonly=True)
+    duracion = fields.Float(string="Duración (h)", readonly=True)
+    resultado = fields.Selection(
+        selection=RESULTADOS_VISITA, string="Resultado", readonly=True
+    )
+    visitas = fields.Integer(string="Visitas", readonly=True)
+
+    def init(self):
+        # Ids pares para el calendario e impares para el histórico.
+        self.env.cr.execute(
+            f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT e.id * 2 AS id,
+                       'calendario' AS origen,
+                       e.inmueble_id,
+                       e.cliente_id,
+                       e.user_id,
+                       e.start AS fecha,
+                       e.duration AS duracion,
+                       e.resultado,
+                       1 AS visitas
+                  FROM calendar_event e
+                 WHERE e.inmueble_id IS NOT NULL AND e.active
+                UNION ALL
+                SELECT h.id * 2 + 1,
+                       'historico',
+                       h.inmueble_id,
+                       h.cliente_id,
+                       h.user_id,
+                       h.fecha,
+                       h.duracion,
+                       h.resultado,
+                       1
+                  FROM inmo_visita_historico h
+            )
+            """
+        )
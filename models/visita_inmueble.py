@@ -1,6 +1,21 @@
-from odoo import _, api, fields, models
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import ValidationError
 
+from . import metricas
+
+PARAM_CONFLICTO_AGENTE = "inmo_odoo.visita_conflicto_agente"
+# Campos de la visita que cambian alguna cifra de las estadísticas.
+CAMPOS_ESTADISTICA = frozenset({"inmueble_id", "active"})
+RESULTADOS_VISITA = [
+    ("interesado", "Interesado"),
+    ("sin_interes", "Sin interés"),
+    ("oferta", "Hizo una oferta"),
+    ("no_presentado", "No se presentó"),
+]
+
 
 class VisitaInmueble(models.Model):
     """Visitas de clientes a un inmueble usando el calendario estándar."""
@@ -16,6 +31,30 @@ class VisitaInmueble(models.Model):
         comodel_name="res.partner",
         string="Cliente",
     )
+    resultado = fields.Selection(
+        selection=RESULTADOS_VISITA,
+        string="Resultado",
+        help="Se conserva al pasar la visita al histórico.",
+    )
+
+    def init(self):
+        """Índices para que la comprobación de solapes y la búsqueda de huecos
+        sean un recorrido por rango aunque haya mucho histórico."""
+        super().init()
+        tools.create_index(
+            self._cr,
+            "calendar_event_inmueble_start_stop_index",
+            self._table,
+            ["inmueble_id", "start", "stop"],
+            where="inmueble_id IS NOT NULL AND active",
+        )
+        tools.create_index(
+            self._cr,
+            "calendar_event_visita_user_start_stop_index",
+            self._table,
+            ["user_id", "start", "stop"],
+            where="inmueble_id IS NOT NULL AND active",
+        )
 
     def _build_visita_name(self, cliente, inmueble):
         """Construye el nombre del evento de
@@ -25,71 +64,134 @@ class VisitaInmueble(models.Model):
         inmueble_name = inmueble.display_name if inmueble else _("Inmueble")
         return _("Visita de %s a %s") % (cliente_name, inmueble_name)
 
-    def _ensure_visita_fields(self, vals, cliente_id=None, inmueble_id=None):
+    def _visita_categoria(self):
+        """Categoría de agenda que identifica las visitas inmobiliarias."""
+        return self.env.ref(
+            "inmo_odoo.calendar_event_type_visita", raise_if_not_found=False
+        )
+
+    def _prefetch_visita_partes(self, cliente_ids, inmueble_ids):
+        """Carga de una vez los clientes e inmuebles existentes, por id."""
+        clientes = self.env["res.partner"].browse(set(filter(None, cliente_ids)))
+        inmuebles = self.env["inmo.inmueble"].browse(set(filter(None, inmueble_ids)))
+        return (
+            {cliente.id: cliente for cliente in clientes.exists()},
+            {inmueble.id: inmueble for inmueble in inmuebles.exists()},
+        )
+
+    def _ensure_visita_fields(
+        self, vals, cliente=None, inmueble=None, categ=None, categ_actuales=()
+    ):
         """Completa `name` y `categ_ids` sólo cuando la cita es una visita."""
         vals = vals.copy()
-        if not (cliente_id and inmueble_id):
+        if not (cliente and inmueble):
             return vals
 
-        cliente = self.env["res.partner"].browse(cliente_id)
-        inmueble = self.env["inmo.inmueble"].browse(inmueble_id)
-
-        if cliente.exists() and inmueble.exists():
-            vals["name"] = self._build_visita_name(cliente, inmueble)
-
-            categ = self.env.ref(
-                "inmo_odoo.calendar_event_type_visita", raise_if_not_found=False
-            )
-            if categ:
-                existing = set()
-                if self:
-                    existing = set(self.categ_ids.ids)
-                vals_categ = vals.get("categ_ids")
-                if vals_categ:
-                    for command in vals_categ:
-                        if command[0] == 6:
-                            existing = set(command[2])
-                        elif command[0] == 4:
-                            existing.add(command[1])
-                        elif command[0] == 5:
-                            existing.clear()
-                existing.add(categ.id)
-                vals["categ_ids"] = [(6, 0, list(existing))]
+        vals["name"] = self._build_visita_name(cliente, inmueble)
+        if categ:
+            existing = set(categ_actuales)
+            vals_categ = vals.get("categ_ids")
+            if vals_categ:
+                for command in vals_categ:
+                    if command[0] == 6:
+                        existing = set(command[2])
+                    elif command[0] == 4:
+                        existing.add(command[1])
+                    elif command[0] == 5:
+                        existing.clear()
+            existing.add(categ.id)
+            vals["categ_ids"] = [(6, 0, sorted(existing))]
         return vals
 
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """Antes de crear, ajusta los valores
-        para que la visita quede bien identificada."""
+        para que las visitas queden bien identificadas."""
+        with metricas.medir("visita.crear", self.env):
+            visitas = self._crear_visitas(vals_list)
+        if visitas.filtered("inmueble_id"):
+            self.env["inmo.inmueble.estadistica"]._programar_refresco()
+        return visitas
 
-        if vals.get("cliente_id") and vals.get("inmueble_id"):
-            vals = self._ensure_visita_fields(
-                vals,
-                cliente_id=vals.get("cliente_id"),
-                inmueble_id=vals.get("inmueble_id"),
+    def _crear_visitas(self, vals_list):
+        visitas = [
+            vals
+            for vals in vals_list
+            if vals.get("cliente_id") and vals.get("inmueble_id")
+        ]
+        if visitas:
+            clientes, inmuebles = self._prefetch_visita_partes(
+                [vals["cliente_id"] for vals in visitas],
+                [vals["inmueble_id"] for vals in visitas],
             )
-        return super().create(vals)
+            categ = self._visita_categoria()
+            vals_list = [
+                self._ensure_visita_fields(
+                    vals,
+                    cliente=clientes.get(vals.get("cliente_id")),
+                    inmueble=inmuebles.get(vals.get("inmueble_id")),
+                    categ=categ,
+                )
+                for vals in vals_list
+            ]
+        return super().create(vals_list)
 
     def write(self, vals):
-        """Si cambian cliente o inmueble, actualiza el título y la categoría."""
+        """Si cambian cliente o inmueble, actualiza el título y la categoría.
+
+        Los registros que acaban con los mismos valores se escriben juntos.
+        """
+        if CAMPOS_ESTADISTICA & vals.keys():
+            self.env["inmo.inmueble.estadistica"]._programar_refresco()
+        with metricas.medir("visita.escribir", self.env):
+            return self._escribir_visitas(vals)
 
+    def _escribir_visitas(self, vals):
         if {"cliente_id", "inmueble_id"} & vals.keys() and not self.env.context.get(
             "skip_visita_autofill"
         ):
+            pares = {
+                record.id: (
+                    vals.get("cliente_id", record.cliente_id.id),
+                    vals.get("inmueble_id", record.inmueble_id.id),
+                )
+                for record in self
+            }
+            clientes, inmuebles = self._prefetch_visita_partes(
+                [cliente_id for cliente_id, _inmueble_id in pares.values()],
+                [inmueble_id for _cliente_id, inmueble_id in pares.values()],
+            )
+            categ = self._visita_categoria()
+
+            grupos = defaultdict(list)
             for record in self:
-                cliente_id = vals.get("cliente_id", record.cliente_id.id)
-                inmueble_id = vals.get("inmueble_id", record.inmueble_id.id)
-                updated_vals = record._ensure_visita_fields(
+                cliente_id, inmueble_id = pares[record.id]
+                es_visita = cliente_id in clientes and inmueble_id in inmuebles
+                categ_actuales = (
+                    frozenset(record.categ_ids.ids) if es_visita and categ else None
+                )
+                grupos[(cliente_id, inmueble_id, categ_actuales)].append(record.id)
+
+            for (cliente_id, inmueble_id, categ_actuales), ids in grupos.items():
+                updated_vals = self._ensure_visita_fields(
                     vals,
-                    cliente_id=cliente_id,
-                    inmueble_id=inmueble_id,
+                    cliente=clientes.get(cliente_id),
+                    inmueble=inmuebles.get(inmueble_id),
+                    categ=categ,
+                    categ_actuales=categ_actuales or (),
                 )
                 super(
-                    VisitaInmueble, record.with_context(skip_visita_autofill=True)
+                    VisitaInmueble,
+                    self.browse(ids).with_context(skip_visita_autofill=True),
                 ).write(updated_vals)
             return True
         return super().write(vals)
 
+    def unlink(self):
+        if self.filtered("inmueble_id"):
+            self.env["inmo.inmueble.estadistica"]._programar_refresco()
+        return super().unlink()
+
     @api.model
     def default_get(self, fields_list):
         """Autorellena un asunto genérico en el evento de calendario
@@ -113,3 +215,132 @@ class VisitaInmueble(models.Model):
                 raise ValidationError(
                     _("Debe indicar cliente e inmueble a la vez para una visita.")
                 )
+
+    @api.constrains("inmueble_id", "start", "stop", "user_id", "active")
+    def _check_visita_solapada(self):
+        """Impide reservar dos visitas a la vez en el mismo inmueble y,
+        si así se configura, para el mismo agente."""
+        visitas = self.filtered(lambda v: v.inmueble_id and v.active)
+        if not visitas:
+            return
+        with metricas.medir("visita.solapes", self.env):
+            self._comprobar_solapes(visitas)
+
+    def _comprobar_solapes(self, visitas):
+        self.flush_model(["inmueble_id", "start", "stop", "user_id", "active"])
+
+        condiciones = ["otra.inmueble_id = visita.inmueble_id"]
+        if self._inmo_conflicto_agente():
+            condiciones.append("otra.user_id = visita.user_id")
+        self.env.cr.execute(
+            f"""
+            SELECT visita.id, otra.id
+              FROM {self._table} visita
+              JOIN {self._table} otra
+                ON ({" OR ".join(condiciones)})
+               AND otra.id != visita.id
+               AND otra.inmueble_id IS NOT NULL
+               AND otra.active
+               AND otra.start < visita.stop
+               AND otra.stop > visita.start
+             WHERE visita.id IN %s
+             LIMIT 1
+            """,
+            (tuple(visitas.ids),),
+        )
+        solape = self.env.cr.fetchone()
+        if solape:
+            visita, otra = self.browse(solape)
+            raise ValidationError(
+                _("La visita «%s» se solapa con «%s» (%s - %s).")
+                % (visita.name, otra.name, otra.start, otra.stop)
+            )
+
+    @api.model
+    def _inmo_conflicto_agente(self):
+        return bool(
+            tools.str2bool(
+                self.env["ir.config_parameter"]
+                .sudo()
+                .get_param(PARAM_CONFLICTO_AGENTE, "False")
+            )
+        )
+
+    @api.model
+    def _inmo_intervalos_ocupados(
+        self, desde, hasta, inmueble_ids=(), user_ids=(), cliente_ids=()
+    ):
+        """Intervalos ocupados entre `desde` y `hasta`, en una sola consulta.
+
+        Devuelve un diccionario con claves ("inmueble", id), ("agente", id) y
+        ("cliente", id) y, como valor, la lista ordenada de tuplas (inicio, fin).
+        """
+        ocupados = defaultdict(list)
+        if not (inmueble_ids or user_ids or cliente_ids):
+            return ocupados
+        self.flush_model(
+            ["inmueble_id", "cliente_id", "start", "stop", "user_id", "active"]
+        )
+        self.env.cr.execute(
+            f"""
+            SELECT inmueble_id, user_id, cliente_id, start, stop
+              FROM {self._table}
+             WHERE inmueble_id IS NOT NULL
+               AND active
+               AND start < %s
+               AND stop > %s
+               AND (inmueble_id IN %s OR user_id IN %s OR cliente_id IN %s)
+          ORDER BY start
+            """,
+            (
+                hasta,
+                desde,
+                tuple(inmueble_ids) or (None,),
+                tuple(user_ids) or (None,),
+                tuple(cliente_ids) or (None,),
+            ),
+        )
+        for inmueble_id, user_id, cliente_id, inicio, fin in self.env.cr.fetchall():
+            if inmueble_id in inmueble_ids:
+                ocupados[("inmueble", inmueble_id)].append((inicio, fin))
+            if user_id and user_id in user_ids:
+                ocupados[("agente", user_id)].append((inicio, fin))
+            if cliente_id and cliente_id in cliente_ids:
+                ocupados[("cliente", cliente_id)].append((inicio, fin))
+        return ocupados
+
+    @api.model
+    def buscar_huecos_libres(
+        self, inmueble_id, desde, hasta, duracion=60, user_id=False, limite=None
+    ):
+        """Huecos de `duracion` minutos sin visitas al inmueble (ni al agente,
+        si se indica) entre `desde` y `hasta`, como lista de (inicio, fin)."""
+        with metricas.medir("visita.huecos", self.env):
+            return self._calcular_huecos(
+                inmueble_id, desde, hasta, duracion, user_id, limite
+            )
+
+    def _calcular_huecos(self, inmueble_id, desde, hasta, duracion, user_id, limite):
+        desde = fields.Datetime.to_datetime(desde)
+        hasta = fields.Datetime.to_datetime(hasta)
+        paso = timedelta(minutes=duracion)
+        ocupados = self._inmo_intervalos_ocupados(
+            desde,
+            hasta,
+            inmueble_ids=[inmueble_id],
+            user_ids=[user_id] if user_id else [],
+        )
+        intervalos = sorted(
+            ocupados[("inmueble", inmueble_id)] + ocupados[("agente", user_id)]
+        )
+
+        huecos = []
+        cursor = desde
+        for inicio, fin in [*intervalos, (hasta, hasta)]:
+            while cursor + paso <= min(inicio, hasta):
+                huecos.append((cursor, cursor + paso))
+                if limite and len(huecos) >= limite:
+                    return huecos
+                cursor += paso
+            cursor = max(cursor, fin)
+        return huecos
@@ -1 +1,22 @@
-from . import test_inmueble_catastro_wizard, test_visita_inmueble
+from . import (
+    test_busqueda,
+    test_catastro_benchmark,
+    test_catastro_cache,
+    test_catastro_job,
+    test_catastro_service,
+    test_catastro_sincronizacion,
+    test_feed_portales,
+    test_foto_inmueble,
+    test_foto_lote_wizard,
+    test_inmueble_catastro_callejero_wizard,
+    test_inmueble_catastro_lote_wizard,
+    test_inmueble_catastro_wizard,
+    test_inmueble_duplicado,
+    test_inmueble_estadistica,
+    test_inmueble_geo,
+    test_inmueble_import_wizard,
+    test_metricas,
+    test_visita_historico,
+    test_visita_inmueble,
+    test_visita_lote_wizard,
+)
@@ -0,0 +1,30 @@
+from odoo.addons.inmo_odoo.models import catastro_config as cfg
+from odoo.addons.inmo_odoo.models import catastro_service
+from odoo.addons.inmo_odoo.tests.fake_catastro import ServidorCatastroFalso
+
+
+class CatastroFalsoMixin:
+    """Arranca un Catastro falso y apunta el cliente HTTP hacia él."""
+
+    servidor_kwargs = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ServidorCatastroFalso(**cls.servidor_kwargs).iniciar()
+        cls.addClassCleanup(cls.servidor.detener)
+        cls.addClassCleanup(cls._restaurar_cliente)
+        parametros = cls.env["ir.config_parameter"].sudo()
+        parametros.set_param(cfg.PARAM_URL, cls.servidor.url)
+        parametros.set_param(cfg.PARAM_REINTENTOS, 0)
+        parametros.set_param(cfg.PARAM_CIRCUITO_FALLOS, 1000)
+
+    @classmethod
+    def _restaurar_cliente(cls):
+        catastro_service._cliente.configurar(catastro_service.AjustesCatastro())
+        catastro_service._cliente.circuito.exito()
+        catastro_service.limpiar_cache_memoria()
+
+    def setUp(self):
+        super().setUp()
+        catastro_service.limpiar_cache_memoria()
@@ -0,0 +1,385 @@
+"""Servidor local que imita `Consulta_DNPRC`, `Consulta_DNPLOC` y
+`Consulta_CPMRC` de la OVC.
+
+Sirve para medir el flujo real de consulta (HTTP, JSON, normalización, caché
+y escritura) sin depender de la red. Se puede usar desde las pruebas o
+arrancarse a mano para pruebas de carga::
+
+    python tests/fake_catastro.py --puerto 8099 --latencia 0.2 --tasa-error 0.05
+
+y apuntar `inmo_odoo.catastro_url` a la URL que muestra.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_PESOS_CONTROL = (13, 15, 12, 5, 4, 17, 9, 21, 3, 7, 1)
+_LETRAS_CONTROL = "MQWERTYUIOPASDFGHJKLBZX"
+
+# Formas de respuesta que devuelve el servidor, elegidas según el cargo de la
+# referencia: vivienda con `loint`, local sin `loint` y referencia inexistente.
+VARIANTES = ("vivienda", "local", "no_encontrada")
+
+
+def digitos_control(referencia: str) -> str:
+    """Dígitos de control de los 18 primeros caracteres de una referencia."""
+
+    def valor(caracter):
+        if caracter.isdigit():
+            return int(caracter)
+        if caracter == "Ñ":
+            return 15
+        return ord(caracter) - (64 if caracter <= "N" else 63)
+
+    cargo = referencia[14:18]
+    digitos = ""
+    for parte in (referencia[0:7] + cargo, referencia[7:14] + cargo):
+        suma = sum(
+            valor(c) * peso for c, peso in zip(parte, _PESOS_CONTROL, strict=True)
+        )
+        digitos += _LETRAS_CONTROL[suma % 23]
+    return digitos
+
+
+def generar_referencias(cantidad: int, parcela="8124906VK6882S", desde=1000):
+    """Referencias válidas y distintas de una misma parcela."""
+    referencias = []
+    for cargo in range(desde, desde + cantidad):
+        base = f"{parcela}{cargo:04d}"
+        referencias.append(base + digitos_control(base))
+    return referencias
+
+
+def variante_de(referencia: str, variantes=VARIANTES) -> str:
+    cargo = referencia[14:18]
+    return variantes[int(cargo) % len(variantes) if cargo.isdigit() else 0]
+
+
+def referencias_parcela(parcela: str, unidades: int) -> list[str]:
+    """Referencias válidas de las `unidades` primeras de una parcela."""
+    return generar_referencias(unidades, parcela=parcela, desde=1)
+
+
+def parcela_de_portal(numero: int) -> str:
+    """Parcela ficticia (14 caracteres) asignada a un número de portal."""
+    return f"{8124000 + numero:07d}VK6882S"
+
+
+def respuesta_dnprc(referencia: str, variante: str, unidades: int = 3) -> dict:
+    """Cuerpo JSON con la misma estructura que devuelve la OVC.
+
+    Con una referencia de parcela (14 caracteres) devuelve la lista de
+    inmuebles de la parcela, como hace Catastro.
+    """
+    if len(referencia) == 14:
+        return {
+            "consulta_dnprcResult": {
+                "control": {"cudnp": unidades},
+                "lrcdnp": {
+                    "rcdnp": [
+                        _rcdnp(refcat, "ANTONIO CABEZON", "12", planta)
+                        for planta, refcat in enumerate(
+                            referencias_parcela(referencia, unidades), start=1
+                        )
+                    ]
+                },
+            }
+        }
+    if variante == "no_encontrada":
+        return {
+            "consulta_dnprcResult": {
+                "control": {"cuerr": 1},
+                "lerr": [{"cod": "43", "des": "LA REFERENCIA CATASTRAL NO EXISTE"}],
+            }
+        }
+
+    lourb = {
+        "dir": {"cv": "1234", "tv": "CL", "nv": "ANTONIO CABEZON", "pnp": "12"},
+        "dp": "28806",
+        "dm": "4",
+    }
+    debi = {"luso": "Residencial", "sfc": "89", "cpt": "0,500000", "ant": "1975"}
+    if variante == "vivienda":
+        lourb["loint"] = {"es": "1", "pt": "01", "pu": "-B"}
+    else:
+        debi.update(luso="Comercial", sfc="145")
+
+    return {
+        "consulta_dnprcResult": {
+            "control": {"cudnp": 1, "cucons": 1, "cucul": 0},
+            "bico": {
+                "bi": {
+                    "idbi": {
+                        "cn": "UR",
+                        "rc": {
+                            "pc1": referencia[0:7],
+                            "pc2": referencia[7:14],
+                            "car": referencia[14:18],
+                            "cc1": referencia[18:19],
+                            "cc2": referencia[19:20],
+                        },
+                    },
+                    "dt": {
+                        "loine": {"cp": "28", "cm": "5"},
+                        "cmc": "5",
+                        "np": "MADRID",
+                        "nm": "ALCALA DE HENARES",
+                        "locs": {"lous": {"lourb": lourb}},
+                    },
+                    "debi": debi,
+                }
+            },
+        }
+    }
+
+
+def respuesta_dnploc(calle: str, numero: int, unidades: int = 3) -> dict:
+    """Respuesta de `Consulta_DNPLOC` para un portal.
+
+    Los múltiplos de 5 no existen: Catastro sugiere números cercanos
+    (`numerero`) sin devolver inmuebles. Con una sola unidad la respuesta usa
+    `bico.bi`, como en la OVC; con varias, la lista `lrcdnp.rcdnp`.
+    """
+    if numero % 5 == 0:
+        return {
+            "consulta_dnplocResult": {
+                "control": {"cunum": 2},
+                "numerero": {
+                    "nump": [
+                        {"num": {"pnp": str(numero - 1)}},
+                        {"num": {"pnp": str(numero + 1)}},
+                    ]
+                },
+            }
+        }
+    referencias = referencias_parcela(parcela_de_portal(numero), unidades)
+    elementos = [
+        _rcdnp(refcat, calle, str(numero), planta)
+        for planta, refcat in enumerate(referencias, start=1)
+    ]
+    if unidades == 1:
+        bi = dict(elementos[0])
+        bi["idbi"] = {"cn": "UR", "rc": bi.pop("rc")}
+        bi["debi"] = {"luso": "Residencial", "sfc": "89"}
+        return {"consulta_dnplocResult": {"control": {"cudnp": 1}, "bico": {"bi": bi}}}
+    return {
+        "consulta_dnplocResult": {
+            "control": {"cudnp": unidades},
+            "lrcdnp": {"rcdnp": elementos},
+        }
+    }
+
+
+def coordenadas_parcela(parcela: str) -> tuple[float, float]:
+    """Coordenadas ficticias, estables para cada parcela, en torno a
+    Alcalá de Henares: 0,0001 grados (unos 10 m) por número de parcela."""
+    desplazamiento = int(parcela[:7]) % 10000 if parcela[:7].isdigit() else 0
+    return 40.48 + desplazamiento * 0.0001, -3.37 + desplazamiento * 0.0001
+
+
+def respuesta_cpmrc(referencia: str, variante: str) -> dict:
+    """Respuesta de `Consulta_CPMRC`: el centroide de la parcela."""
+    if variante == "no_encontrada":
+        return {
+            "Consulta_CPMRCResult": {
+                "control": {"cucoor": 0, "cuerr": 1},
+                "lerr": [{"cod": "43", "des": "LA REFERENCIA CATASTRAL NO EXISTE"}],
+            }
+        }
+    latitud, longitud = coordenadas_parcela(referencia)
+    return {
+        "Consulta_CPMRCResult": {
+            "control": {"cucoor": 1, "cuerr": 0},
+            "coordenadas": {
+                "coord": [
+                    {
+                        "pc": {"pc1": referencia[0:7], "pc2": referencia[7:14]},
+                        "geo": {
+                            "xcen": f"{longitud:.7f}",
+                            "ycen": f"{latitud:.7f}",
+                            "srs": "EPSG:4326",
+                        },
+                        "ldt": "CL ANTONIO CABEZON 12 ALCALA DE HENARES (MADRID)",
+                    }
+                ]
+            },
+        }
+    }
+
+
+def _rcdnp(referencia: str, calle: str, numero: str, planta: int) -> dict:
+    return {
+        "rc": {
+            "pc1": referencia[0:7],
+            "pc2": referencia[7:14],
+            "car": referencia[14:18],
+            "cc1": referencia[18:19],
+            "cc2": referencia[19:20],
+        },
+        "dt": {
+            "np": "MADRID",
+            "nm": "ALCALA DE HENARES",
+            "locs": {
+                "lous": {
+                    "lourb": {
+                        "dir": {"tv": "CL", "nv": calle, "pnp": numero},
+                        "loint": {"es": "1", "pt": f"{planta:02d}", "pu": "A"},
+                        "dp": "28806",
+                    }
+                }
+            },
+        },
+    }
+
+
+class ServidorCatastroFalso:
+    """Servidor HTTP en un hilo aparte con latencia y errores configurables.
+
+    `latencia` y `variacion` están en segundos; `tasa_error` es la fracción de
+    peticiones que responden 503. `unidades` es el número de inmuebles por
+    parcela o portal. `peticiones` cuenta las recibidas.
+    """
+
+    def __init__(
+        self,
+        latencia=0.0,
+        variacion=0.0,
+        tasa_error=0.0,
+        variantes=VARIANTES,
+        unidades=3,
+        semilla=0,
+        host="127.0.0.1",
+        puerto=0,
+    ):
+        self.latencia = latencia
+        self.variacion = variacion
+        self.tasa_error = tasa_error
+        self.variantes = variantes
+        self.unidades = unidades
+        self.peticiones = 0
+        # Parcelas por las que `Consulta_CPMRC` responde que no existen.
+        self.parcelas_sin_coordenadas = set()
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer((host, puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}/json/Consulta_DNPRC"
+
+    def iniciar(self) -> ServidorCatastroFalso:
+        self._hilo = threading.Thread(
+            target=self._servidor.serve_forever, name="catastro-falso", daemon=True
+        )
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        if self._hilo:
+            self._hilo.join()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def _sorteo(self):
+        """Decide, bajo lock, la espera y si la petición falla."""
+        with self._lock:
+            self.peticiones += 1
+            espera = self.latencia + self._azar.uniform(0, self.variacion)
+            falla = self._azar.random() < self.tasa_error
+        return espera, falla
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                espera, falla = servidor._sorteo()
+                if espera:
+                    time.sleep(espera)
+                url = urlparse(self.path)
+                servicio = url.path.rsplit("/", 1)[-1]
+                if servicio not in (
+                    "Consulta_DNPRC",
+                    "Consulta_DNPLOC",
+                    "Consulta_CPMRC",
+                ):
+                    return self._responder(404, {"error": "no encontrado"})
+                if falla:
+                    return self._responder(503, {"error": "servicio no disponible"})
+                params = {
+                    clave: valores[0] for clave, valores in parse_qs(url.query).items()
+                }
+                if servicio == "Consulta_DNPLOC":
+                    cuerpo = respuesta_dnploc(
+                        params.get("Calle", ""),
+                        int(params.get("Numero") or 0),
+                        servidor.unidades,
+                    )
+                elif servicio == "Consulta_CPMRC":
+                    referencia = params.get("RefCat", "")
+                    variante = (
+                        "no_encontrada"
+                        if referencia in servidor.parcelas_sin_coordenadas
+                        else "vivienda"
+                    )
+                    cuerpo = respuesta_cpmrc(referencia, variante)
+                else:
+                    referencia = params.get("RefCat", "")
+                    variante = variante_de(referencia, servidor.variantes)
+                    cuerpo = respuesta_dnprc(referencia, variante, servidor.unidades)
+                self._responder(200, cuerpo)
+
+            def _responder(self, estado, cuerpo):
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8099)
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--variacion", type=float, default=0.0)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    parser.add_argument("--unidades", type=int, default=3)
+    args = parser.parse_args()
+    servidor = ServidorCatastroFalso(
+        latencia=args.latencia,
+        variacion=args.variacion,
+        tasa_error=args.tasa_error,
+        unidades=args.unidades,
+        host=args.host,
+        puerto=args.puerto,
+    )
+    print(f"Catastro falso escuchando en {servidor.url}")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor._servidor.server_close()
@@ -0,0 +1,82 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestBusqueda(TransactionCase):
+    """Mantenimiento incremental de las coincidencias de búsquedas."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cliente = cls.env["res.partner"].create({"name": "Cliente que busca"})
+        cls.busqueda = cls.env["inmo.busqueda"].create(
+            {
+                "nombre": "Piso familiar",
+                "cliente_id": cls.cliente.id,
+                "tipo_inmueble": "piso",
+                "ciudad": "Villaprueba",
+                "habitaciones_min": 3,
+                "presupuesto_max": 250000,
+            }
+        )
+
+    def _crear(self, **vals):
+        valores = {
+            "nombre": "Piso",
+            "tipo_inmueble": "piso",
+            "ciudad": "VILLAPRUEBA",
+            "habitaciones": 3,
+            "precio": 200000,
+        }
+        valores.update(vals)
+        return self.env["inmo.inmueble"].create(valores)
+
+    def test_alta_de_inmueble(self):
+        """Solo los inmuebles que cumplen todos los criterios son candidatos."""
+        encaja = self._crear()
+        self._crear(habitaciones=2)
+        self._crear(precio=300000)
+        self._crear(tipo_inmueble="casa")
+        self._crear(estado="reservado")
+
+        self.assertEqual(self.busqueda.candidato_ids.inmueble_id, encaja)
+        self.assertEqual(self.busqueda.candidato_ids.cliente_id, self.cliente)
+        self.assertEqual(self.busqueda.total_candidatos, 1)
+
+    def test_cambios_de_inmueble(self):
+        """Un cambio de estado o de atributos añade o quita el candidato."""
+        inmueble = self._crear(habitaciones=2)
+        self.assertFalse(self.busqueda.candidato_ids)
+
+        inmueble.habitaciones = 4
+        self.assertEqual(self.busqueda.candidato_ids.inmueble_id, inmueble)
+        candidato = self.busqueda.candidato_ids
+
+        inmueble.nombre = "Piso reformado"
+        self.assertEqual(self.busqueda.candidato_ids, candidato)
+
+        inmueble.estado = "vendido"
+        self.assertFalse(self.busqueda.candidato_ids)
+
+    def test_cambio_de_criterios(self):
+        """Al cambiar la búsqueda se cruza de nuevo con el catálogo."""
+        grande = self._crear(superficie_construida=120)
+        pequeno = self._crear(superficie_construida=70)
+        self.assertEqual(self.busqueda.candidato_ids.inmueble_id, grande | pequeno)
+
+        self.busqueda.superficie_min = 100
+        self.assertEqual(self.busqueda.candidato_ids.inmueble_id, grande)
+
+        self.busqueda.activa = False
+        self.assertFalse(self.busqueda.candidato_ids)
+
+    def test_aviso_al_agente(self):
+        """Las coincidencias nuevas se notifican una vez por agente."""
+        Bus = self.env["bus.bus"]
+        dominio = [("message", "like", "coincidencia(s) nueva(s)")]
+        antes = Bus.search_count(dominio)
+        self._crear(nombre="Primero")
+        self._crear(nombre="Segundo")
+        self.env["inmo.inmueble"].create(
+            [{"nombre": f"Lote {n}", "tipo_inmueble": "piso"} for n in range(3)]
+        )
+        self.assertEqual(Bus.search_count(dominio), antes + 2)
@@ -0,0 +1,149 @@
+import logging
+import time
+
+from odoo.addons.inmo_odoo.models import catastro_service
+from odoo.addons.inmo_odoo.tests.common import CatastroFalsoMixin
+from odoo.addons.inmo_odoo.tests.fake_catastro import generar_referencias
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+# Tamaño de cada escenario del benchmark y latencia simulada de Catastro.
+CONSULTAS = 200
+INMUEBLES_LOTE = 200
+LATENCIA = 0.02
+VARIACION = 0.01
+
+
+def _percentil(valores, percentil):
+    """Percentil por el método del rango más cercano."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    posicion = max(0, -(-percentil * len(ordenados) // 100) - 1)
+    return ordenados[int(posicion)]
+
+
+class TestCatastroServidorFalso(CatastroFalsoMixin, TransactionCase):
+    """Recorre el flujo completo contra el Catastro falso, HTTP incluido."""
+
+    def test_lote_completo_por_http(self):
+        """Cada variante de respuesta acaba en el resultado esperado."""
+        vivienda, local, no_existe = generar_referencias(3, desde=2001)
+        inmuebles = self.env["inmo.inmueble"].create(
+            [
+                {"nombre": "Vivienda", "referencia_catastral": vivienda},
+                {"nombre": "Local", "referencia_catastral": local},
+                {"nombre": "Inexistente", "referencia_catastral": no_existe},
+            ]
+        )
+        wizard = self.env["inmo.inmueble.catastro.lote.wizard"].create(
+            {"inmueble_ids": [(6, 0, inmuebles.ids)], "peticiones_por_segundo": 0}
+        )
+        wizard.action_confirm()
+
+        resultados = dict(
+            zip(
+                wizard.linea_ids.mapped("referencia_catastral"),
+                wizard.linea_ids.mapped("resultado"),
+                strict=True,
+            )
+        )
+        self.assertEqual(
+            resultados, {vivienda: "ok", local: "ok", no_existe: "no_encontrado"}
+        )
+        self.assertEqual(inmuebles[0].calle2, "Nº 12 Esc. 1 Pl. 01 Pu. -B")
+        self.assertEqual(inmuebles[0].tipo_inmueble, "piso")
+        self.assertEqual(inmuebles[1].calle2, "Nº 12")
+        self.assertEqual(inmuebles[1].tipo_inmueble, "local")
+        self.assertEqual(self.servidor.peticiones, 3)
+
+
+@tagged("-standard", "benchmark")
+class TestCatastroBenchmark(CatastroFalsoMixin, TransactionCase):
+    """Mide latencia, rendimiento y consultas SQL del flujo de Catastro.
+
+    No se ejecuta con la batería normal; lanzar con `--test-tags benchmark`.
+    """
+
+    servidor_kwargs = {
+        "latencia": LATENCIA,
+        "variacion": VARIACION,
+        "variantes": ("vivienda", "local"),
+    }
+
+    def _medir(self, nombre, funcion, elementos):
+        """Ejecuta `funcion` por cada elemento y registra las métricas."""
+        cr = self.env.cr
+        consultas_antes = cr.sql_log_count
+        peticiones_antes = self.servidor.peticiones
+        tiempos = []
+        inicio = time.perf_counter()
+        for elemento in elementos:
+            t0 = time.perf_counter()
+            funcion(elemento)
+            tiempos.append(time.perf_counter() - t0)
+        total = time.perf_counter() - inicio
+        metricas = {
+            "operaciones": len(tiempos),
+            "por_segundo": len(tiempos) / total if total else 0.0,
+            "p50_ms": _percentil(tiempos, 50) * 1000,
+            "p95_ms": _percentil(tiempos, 95) * 1000,
+            "p99_ms": _percentil(tiempos, 99) * 1000,
+            "consultas_sql": cr.sql_log_count - consultas_antes,
+            "peticiones_http": self.servidor.peticiones - peticiones_antes,
+        }
+        _logger.info(
+            "%-22s %5d ops %9.1f ops/s p50 %7.2f ms p95 %7.2f ms p99 %7.2f ms "
+            "%6d SQL %5d HTTP",
+            nombre,
+            *metricas.values(),
+        )
+        return metricas
+
+    def test_consultas_individuales_y_cacheadas(self):
+        """Consulta en frío, desde memoria y desde la caché en base de datos."""
+        referencias = generar_referencias(CONSULTAS, desde=3000)
+
+        def consultar(refcat):
+            return catastro_service.consulta_con_cache(self.env, refcat)
+
+        fria = self._medir("consulta sin caché", consultar, referencias)
+        memoria = self._medir("consulta caché memoria", consultar, referencias)
+        catastro_service.limpiar_cache_memoria()
+        bd = self._medir("consulta caché bd", consultar, referencias)
+
+        self.assertEqual(fria["peticiones_http"], CONSULTAS)
+        self.assertEqual(memoria["peticiones_http"], 0)
+        self.assertEqual(memoria["consultas_sql"], 0)
+        self.assertEqual(bd["peticiones_http"], 0)
+        self.assertLessEqual(bd["consultas_sql"], CONSULTAS * 2)
+
+    def test_enriquecimiento_por_lote(self):
+        """Enriquecimiento de muchos inmuebles con el asistente de lote."""
+        referencias = generar_referencias(INMUEBLES_LOTE, desde=5000)
+        inmuebles = self.env["inmo.inmueble"].create(
+            [
+                {"nombre": f"Inmueble {refcat}", "referencia_catastral": refcat}
+                for refcat in referencias
+            ]
+        )
+        wizard = self.env["inmo.inmueble.catastro.lote.wizard"].create(
+            {
+                "inmueble_ids": [(6, 0, inmuebles.ids)],
+                "max_hilos": 8,
+                "peticiones_por_segundo": 0,
+            }
+        )
+        metricas = self._medir(
+            "lote de enriquecimiento", lambda w: w.action_confirm(), wizard
+        )
+        _logger.info(
+            "%-22s %9.1f inmuebles/s",
+            "lote de enriquecimiento",
+            INMUEBLES_LOTE * metricas["por_segundo"],
+        )
+
+        self.assertEqual(wizard.total_ok, INMUEBLES_LOTE)
+        self.assertEqual(metricas["peticiones_http"], INMUEBLES_LOTE)
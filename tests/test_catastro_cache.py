@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+from odoo.addons.inmo_odoo.models import catastro_service
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+CONSULTA = "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+
+
+class TestCatastroCache(TransactionCase):
+    """Comprueba la caché de respuestas de Catastro."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepara una respuesta normalizada de ejemplo."""
+        super().setUpClass()
+        cls.Cache = cls.env["inmo.catastro.cache"]
+        cls.refcat = "8124906VK6882S0007UQ"
+        cls.respuesta = {
+            "referencia_catastral": cls.refcat,
+            "municipio": "ALCALA DE HENARES",
+            "provincia": "MADRID",
+            "codigo_postal": "28806",
+            "nombre_via": "CL ANTONIO CABEZON",
+            "superficie_m2": 89.0,
+            "complemento_via": "Nº 12 Esc. 1 Pl. 01 Pu. -B",
+            "uso": "Residencial",
+            "tipo_constructivo": None,
+        }
+
+    def setUp(self):
+        """Cada prueba empieza sin entradas en memoria."""
+        super().setUp()
+        catastro_service.limpiar_cache_memoria()
+
+    def test_segunda_consulta_no_llama_a_catastro(self):
+        """La segunda consulta de la misma referencia sale de la caché."""
+        with patch(CONSULTA, return_value=dict(self.respuesta)) as consulta_mock:
+            primera = catastro_service.consulta_con_cache(self.env, self.refcat)
+            segunda = catastro_service.consulta_con_cache(
+                self.env, " 8124906vk6882s0007uq "
+            )
+
+        consulta_mock.assert_called_once_with(self.refcat)
+        self.assertEqual(primera, segunda)
+        self.assertEqual(
+            catastro_service.estadisticas_cache(),
+            {"memoria": 1, "bd": 0, "fallos": 1},
+        )
+
+    def test_cache_persistente_entre_procesos(self):
+        """Sin caché en memoria, la respuesta se recupera de la base de datos."""
+        with patch(CONSULTA, return_value=dict(self.respuesta)):
+            catastro_service.consulta_con_cache(self.env, self.refcat)
+        catastro_service.limpiar_cache_memoria()
+
+        with patch(CONSULTA) as consulta_mock:
+            datos = catastro_service.consulta_con_cache(self.env, self.refcat)
+
+        consulta_mock.assert_not_called()
+        self.assertEqual(datos["codigo_postal"], "28806")
+        self.assertEqual(
+            catastro_service.estadisticas_cache(),
+            {"memoria": 0, "bd": 1, "fallos": 0},
+        )
+
+    def test_purga_elimina_caducadas_y_recorta(self):
+        """El cron borra lo caducado y respeta el número máximo de entradas."""
+        self.Cache._guardar("CADUCADA", self.respuesta, ttl=-10)
+        self.Cache._guardar("VIGENTE1", self.respuesta, ttl=3600)
+        self.Cache._guardar("VIGENTE2", self.respuesta, ttl=3600)
+        self.env["ir.config_parameter"].sudo().set_param(
+            "inmo_odoo.catastro_cache_max_registros", 1
+        )
+
+        self.Cache._cron_purgar()
+
+        restantes = self.Cache.search([]).mapped("referencia_catastral")
+        self.assertNotIn("CADUCADA", restantes)
+        self.assertEqual(len(restantes), 1)
+
+    def test_purga_con_parametro_no_valido(self):
+        """Un máximo mal escrito no rompe el cron: se usa el de por defecto."""
+        self.Cache._guardar("CADUCADA", self.respuesta, ttl=-10)
+        self.env["ir.config_parameter"].sudo().set_param(
+            "inmo_odoo.catastro_cache_max_registros", "mil"
+        )
+
+        self.Cache._cron_purgar()
+
+        self.assertFalse(self.Cache.search([("referencia_catastral", "=", "CADUCADA")]))
+
+    def test_validacion_local_de_referencias(self):
+        """Los dígitos de control se comprueban sin consultar Catastro."""
+        self.assertTrue(catastro_service.referencia_valida(" 8124906vk6882s0007uq"))
+        for referencia in ("8124906VK6882S0007UA", "8124906VK6882S", "", None):
+            self.assertFalse(catastro_service.referencia_valida(referencia))
+
+        with patch(CONSULTA) as consulta_mock:
+            resultados = catastro_service.consulta_lote(
+                self.env, ["8124906VK6882S0007UA"]
+            )
+        consulta_mock.assert_not_called()
+        self.assertIsInstance(resultados["8124906VK6882S0007UA"], UserError)
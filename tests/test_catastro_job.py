@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+from odoo.addons.inmo_odoo.models import catastro_service
+from odoo.tests.common import TransactionCase
+
+CONSULTA = "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+
+
+class TestCatastroJob(TransactionCase):
+    """Comprueba la cola de consultas a Catastro en segundo plano."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Crea un inmueble con referencia y su asistente."""
+        super().setUpClass()
+        cls.Job = cls.env["inmo.catastro.job"]
+        cls.refcat = "8124906VK6882S0002WL"
+        cls.inmueble = cls.env["inmo.inmueble"].create(
+            {"nombre": "Piso en cola", "referencia_catastral": cls.refcat}
+        )
+
+    def setUp(self):
+        """Parte de una caché en memoria vacía en cada prueba."""
+        super().setUp()
+        catastro_service.limpiar_cache_memoria()
+
+    def _respuesta(self, refcat):
+        return {
+            "referencia_catastral": refcat,
+            "municipio": "ALCALA DE HENARES",
+            "provincia": "",
+            "codigo_postal": "28806",
+            "nombre_via": "CL ANTONIO CABEZON",
+            "superficie_m2": 89.0,
+            "complemento_via": None,
+            "uso": "Residencial",
+            "tipo_constructivo": None,
+        }
+
+    def test_wizard_encola_sin_consultar(self):
+        """El asistente en segundo plano no llama a Catastro."""
+        wizard = self.env["inmo.inmueble.catastro.wizard"].create(
+            {"inmueble_id": self.inmueble.id, "referencia_catastral": self.refcat}
+        )
+        with patch(CONSULTA) as consulta_mock:
+            wizard.action_encolar()
+            wizard.action_encolar()
+
+        consulta_mock.assert_not_called()
+        jobs = self.Job.search([("inmueble_id", "=", self.inmueble.id)])
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs.estado, "pendiente")
+
+    def test_procesar_cola_actualiza_inmueble(self):
+        """Al vaciar la cola se escriben los datos en el inmueble."""
+        job = self.Job._encolar(self.inmueble)
+        with patch(CONSULTA, side_effect=self._respuesta):
+            procesados = self.Job._procesar_cola()
+
+        self.assertEqual(procesados, 1)
+        self.assertEqual(job.estado, "hecho")
+        self.assertEqual(self.inmueble.ciudad, "ALCALA DE HENARES")
+
+    def test_error_temporal_programa_reintento(self):
+        """Un fallo de red deja el trabajo pendiente para más tarde."""
+        job = self.Job._encolar(self.inmueble)
+        error = catastro_service.CatastroNoDisponibleError("Sin conexión")
+        with patch(CONSULTA, side_effect=error):
+            self.Job._procesar_cola()
+
+        self.assertEqual(job.estado, "pendiente")
+        self.assertEqual(job.intentos, 1)
+        self.assertGreater(job.fecha_siguiente_intento, job.fecha_inicio)
+        self.assertFalse(self.Job._procesar_cola())
+
+    def test_referencia_inexistente_no_se_reintenta(self):
+        """Si Catastro no conoce la referencia, el trabajo falla definitivamente."""
+        job = self.Job._encolar(self.inmueble)
+        error = catastro_service.CatastroNoEncontradoError("No existe")
+        with patch(CONSULTA, side_effect=error):
+            self.Job._procesar_cola()
+
+        self.assertEqual(job.estado, "fallido")
+
+    def test_referencia_no_valida(self):
+        """Una referencia no válida no se encola, y si ya estaba en la cola el
+        trabajo falla sin reintentos ni consultas."""
+        with self.assertRaises(catastro_service.CatastroReferenciaNoValidaError):
+            self.Job._encolar(self.inmueble, referencia="8124906VK6882S0002WA")
+
+        job = self.Job.create(
+            {
+                "inmueble_id": self.inmueble.id,
+                "referencia_catastral": "8124906VK6882S0002WA",
+                "usuario_id": self.env.uid,
+            }
+        )
+        with patch(CONSULTA) as consulta_mock:
+            self.Job._procesar_cola()
+
+        consulta_mock.assert_not_called()
+        self.assertEqual(job.estado, "fallido")
+        self.assertEqual(job.intentos, 1)
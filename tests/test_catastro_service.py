@@ -0,0 +1,149 @@
+from unittest.mock import MagicMock, patch
+
+import requests
+from odoo.addons.inmo_odoo.models import catastro_service
+from odoo.tests.common import TransactionCase
+
+RESPUESTA_DNPRC = {
+    "consulta_dnprcResult": {
+        "bico": {
+            "bi": {
+                "idbi": {"rc": {"pc1": "8124906", "pc2": "VK6882S"}},
+                "dt": {
+                    "np": "MADRID",
+                    "nm": "ALCALA DE HENARES",
+                    "locs": {
+                        "lous": {
+                            "lourb": {
+                                "dir": {
+                                    "tv": "CL",
+                                    "nv": "ANTONIO CABEZON",
+                                    "pnp": "12",
+                                },
+                                "loint": {"es": "1", "pt": "01", "pu": "-B"},
+                                "dp": "28806",
+                            }
+                        }
+                    },
+                },
+                "debi": {"luso": "Residencial", "sfc": "89"},
+            }
+        }
+    }
+}
+
+
+class TestCatastroService(TransactionCase):
+    """Comprueba el cliente HTTP de Catastro sin salir a la red."""
+
+    def _cliente(self, sesion, **ajustes):
+        """Devuelve un cliente aislado cuya sesión HTTP es `sesion`."""
+        ajustes.setdefault("reintentos", 0)
+        cliente = catastro_service._ClienteCatastro(
+            catastro_service.AjustesCatastro(**ajustes)
+        )
+        cliente._crear_sesion = lambda: sesion
+        return patch.object(catastro_service, "_cliente", cliente)
+
+    def _respuesta(self, payload):
+        respuesta = MagicMock()
+        respuesta.json.return_value = payload
+        return respuesta
+
+    def test_normaliza_respuesta(self):
+        """La respuesta del Catastro se reduce a la estructura normalizada."""
+        sesion = MagicMock()
+        sesion.get.return_value = self._respuesta(RESPUESTA_DNPRC)
+        with self._cliente(sesion):
+            datos = catastro_service.consulta_por_referencia("8124906vk6882s0007uq")
+
+        self.assertEqual(datos["referencia_catastral"], "8124906VK6882S0007UQ")
+        self.assertEqual(datos["nombre_via"], "CL ANTONIO CABEZON")
+        self.assertEqual(datos["complemento_via"], "Nº 12 Esc. 1 Pl. 01 Pu. -B")
+        self.assertEqual(datos["superficie_m2"], 89.0)
+
+    def test_referencia_inexistente(self):
+        """Una respuesta con `lerr` indica que la referencia no existe."""
+        sesion = MagicMock()
+        sesion.get.return_value = self._respuesta(
+            {"consulta_dnprcResult": {"lerr": [{"cod": "43", "des": "NO EXISTE"}]}}
+        )
+        with (
+            self._cliente(sesion),
+            self.assertRaises(catastro_service.CatastroNoEncontradoError),
+        ):
+            catastro_service.consulta_por_referencia("8124906VK6882S0007UQ")
+
+    def test_circuito_abierto_falla_sin_llamar(self):
+        """Tras los fallos configurados no se vuelve a llamar a Catastro."""
+        sesion = MagicMock()
+        sesion.get.side_effect = requests.ConnectionError("caído")
+        with self._cliente(sesion, circuito_fallos=2, circuito_enfriamiento=60):
+            for _intento in range(3):
+                with self.assertRaises(catastro_service.CatastroNoDisponibleError):
+                    catastro_service.consulta_por_referencia("8124906VK6882S0007UQ")
+
+        self.assertEqual(sesion.get.call_count, 2)
+
+    def test_no_reintenta_lecturas_agotadas(self):
+        """Solo se reintentan los errores de conexión y los 5xx, no las
+        lecturas que agotan el tiempo."""
+        cliente = catastro_service._ClienteCatastro(
+            catastro_service.AjustesCatastro(reintentos=2)
+        )
+        reintentos = cliente._crear_sesion().get_adapter("https://").max_retries
+        self.assertEqual(reintentos.total, 2)
+        self.assertEqual(reintentos.read, 0)
+
+    def test_resolucion_exacta_de_provincias(self):
+        """Las provincias se resuelven por nombre exacto, sin tildes ni
+        mayúsculas, aceptando la forma bilingüe y sin confundir subcadenas."""
+        Provincia = self.env["res.country.state"]
+        casos = {
+            "MADRID": "base.state_es_m",
+            "avila": "base.state_es_av",
+            "ÁVILA": "base.state_es_av",
+            "VALENCIA": "base.state_es_v",
+            "ALICANTE": "base.state_es_a",
+        }
+        for nombre, xmlid in casos.items():
+            with self.subTest(nombre=nombre):
+                self.assertEqual(
+                    Provincia._inmo_resolver_provincia(nombre),
+                    self.env.ref(xmlid).id,
+                )
+        self.assertFalse(Provincia._inmo_resolver_provincia("VALEN"))
+
+    def test_mapeo_por_lotes_sin_consultas(self):
+        """Con el índice ya cargado, mapear un lote no lanza consultas SQL."""
+        datos = {
+            "municipio": "ALCALA DE HENARES",
+            "provincia": "MADRID",
+            "codigo_postal": "28806",
+            "nombre_via": "CL ANTONIO CABEZON",
+            "superficie_m2": 89.0,
+            "complemento_via": None,
+            "uso": "Residencial",
+            "tipo_constructivo": None,
+        }
+        catastro_service.mapear_campos_inmuebles(self.env, [datos])
+        with self.assertQueryCount(0):
+            valores = catastro_service.mapear_campos_inmuebles(self.env, [datos] * 50)
+
+        self.assertEqual(valores[0]["provincia"], self.env.ref("base.state_es_m").id)
+        self.assertEqual(valores[0]["id_pais"], self.env.ref("base.es").id)
+
+    def test_indice_se_invalida_al_crear_provincia(self):
+        """Una provincia nueva se encuentra sin reiniciar el servidor."""
+        Provincia = self.env["res.country.state"]
+        self.assertFalse(Provincia._inmo_resolver_provincia("Provincia Nueva"))
+        nueva = Provincia.create(
+            {
+                "name": "Provincia Nueva",
+                "code": "PN",
+                "country_id": self.env.ref("base.es").id,
+            }
+        )
+        self.assertEqual(
+            Provincia._inmo_resolver_provincia("PROVINCIA NUEVA"), nueva.id
+        )
@@ -0,0 +1,118 @@
+from unittest.mock import patch
+
+from odoo.addons.inmo_odoo.models import catastro_config as cfg
+from odoo.addons.inmo_odoo.models import catastro_service
+from odoo.tests.common import TransactionCase
+
+from .fake_catastro import generar_referencias
+
+CONSULTA = "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+
+
+class TestCatastroSincronizacion(TransactionCase):
+    """Comprueba la resincronización nocturna con Catastro."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Crea unos inmuebles con referencia y parte del principio."""
+        super().setUpClass()
+        cls.Sincronizacion = cls.env["inmo.catastro.sincronizacion"]
+        cls.referencias = generar_referencias(3, desde=8000)
+        cls.inmuebles = cls.env["inmo.inmueble"].create(
+            [
+                {"nombre": f"Piso {n}", "referencia_catastral": refcat}
+                for n, refcat in enumerate(cls.referencias)
+            ]
+        )
+        cls.Sincronizacion.search([]).unlink()
+        cls.superficie = 89.0
+
+    def setUp(self):
+        super().setUp()
+        catastro_service.limpiar_cache_memoria()
+
+    def _respuesta(self, refcat):
+        return {
+            "referencia_catastral": refcat,
+            "municipio": "ALCALA DE HENARES",
+            "provincia": "",
+            "codigo_postal": "28806",
+            "nombre_via": "CL ANTONIO CABEZON",
+            "superficie_m2": self.superficie,
+            "complemento_via": None,
+            "uso": "Residencial",
+            "tipo_constructivo": None,
+        }
+
+    def test_segunda_pasada_no_escribe(self):
+        """Si Catastro no cambia, la segunda pasada no escribe nada."""
+        with patch(CONSULTA, side_effect=self._respuesta):
+            primera = self.Sincronizacion._resincronizar()
+        self.assertEqual(primera.estado, "completa")
+        self.assertEqual(self.inmuebles.mapped("ciudad"), ["ALCALA DE HENARES"] * 3)
+        self.assertTrue(all(self.inmuebles.mapped("catastro_hash")))
+
+        with (
+            patch(CONSULTA, side_effect=self._respuesta),
+            patch.object(type(self.inmuebles), "write") as write_mock,
+        ):
+            segunda = self.Sincronizacion._resincronizar()
+        write_mock.assert_not_called()
+        self.assertEqual(segunda.actualizados, 0)
+        self.assertEqual(segunda.sin_cambios, segunda.revisados)
+
+    def test_solo_escribe_campos_cambiados(self):
+        """Un cambio en Catastro solo escribe ese campo y respeta el nombre."""
+        with patch(CONSULTA, side_effect=self._respuesta):
+            self.Sincronizacion._resincronizar()
+        self.inmuebles[0].nombre = "Ático reformado"
+        huellas = self.inmuebles.mapped("catastro_hash")
+
+        self.superficie = 95.0
+        Inmueble = type(self.inmuebles)
+        with (
+            patch(CONSULTA, side_effect=self._respuesta),
+            patch.object(
+                Inmueble, "write", autospec=True, side_effect=Inmueble.write
+            ) as write_mock,
+        ):
+            informe = self.Sincronizacion._resincronizar()
+
+        # El mismo cambio se escribe de una vez; las huellas van aparte.
+        self.assertEqual(write_mock.call_count, 1)
+        for antes, ahora in zip(
+            huellas, self.inmuebles.mapped("catastro_hash"), strict=True
+        ):
+            self.assertNotEqual(antes, ahora)
+        self.assertEqual(self.inmuebles.mapped("superficie_construida"), [95.0] * 3)
+        self.assertEqual(self.inmuebles[0].nombre, "Ático reformado")
+        self.assertEqual(informe.campos_cambiados.get("superficie_construida"), 3)
+        self.assertNotIn("nombre", informe.campos_cambiados)
+
+    def test_catastro_caido_no_avanza(self):
+        """Si Catastro no responde, la pasada se corta y se retoma después."""
+        error = catastro_service.CatastroNoDisponibleError("Sin conexión")
+        with patch(CONSULTA, side_effect=error):
+            informe = self.Sincronizacion._resincronizar()
+
+        self.assertEqual(informe.estado, "interrumpida")
+        self.assertEqual(informe.revisados, 0)
+        self.assertEqual(informe.ultimo_id, 0)
+
+    def test_retoma_desde_el_ultimo_informe(self):
+        """Una pasada pausada deja en su informe dónde debe seguir la próxima."""
+        con_referencia = self.env["inmo.inmueble"].search(
+            [("referencia_catastral", "!=", False)], order="id"
+        )
+        with (
+            patch(CONSULTA, side_effect=self._respuesta),
+            patch.object(cfg, "RESYNC_TAMANO_LOTE", 2),
+        ):
+            primera = self.Sincronizacion._resincronizar(max_lotes=1)
+            segunda = self.Sincronizacion._resincronizar()
+
+        self.assertEqual(primera.estado, "pausada")
+        self.assertEqual(primera.ultimo_id, con_referencia[1].id)
+        self.assertEqual(segunda.estado, "completa")
+        self.assertEqual(segunda.revisados, len(con_referencia) - 2)
+        self.assertEqual(segunda.ultimo_id, 0)
@@ -0,0 +1,142 @@
+import json
+from datetime import datetime, timedelta
+
+from lxml import etree
+from odoo.addons.inmo_odoo.models import feed_portales
+from odoo.tests.common import TransactionCase
+
+from .test_foto_inmueble import imagen_base64
+
+BASE_URL = "https://inmo.example.com"
+
+
+class TestFeedPortales(TransactionCase):
+    """Comprueba el feed del catálogo para portales."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Crea tres inmuebles modificados en días distintos, después que
+        cualquier otro del catálogo."""
+        super().setUpClass()
+        cls.inmuebles = cls.env["inmo.inmueble"].create(
+            [
+                {"nombre": "Piso centro", "ciudad": "Madrid", "habitaciones": 3},
+                {"nombre": "Casa campo", "ciudad": "Toledo", "habitaciones": 4},
+                {"nombre": "Local", "ciudad": "Madrid", "estado": "borrador"},
+            ]
+        )
+        cls.env["inmo.inmueble.foto"].create(
+            {
+                "inmueble_id": cls.inmuebles[0].id,
+                "foto": imagen_base64(),
+            }
+        )
+        cls.base = cls.env.cr.now().replace(microsecond=0) - timedelta(days=10)
+        cls._fechar(cls.inmuebles, [cls.base + timedelta(days=n) for n in range(3)])
+        cls.env.cr.execute(
+            "UPDATE inmo_inmueble SET write_date = %s WHERE id NOT IN %s",
+            [cls.base - timedelta(days=30), tuple(cls.inmuebles.ids)],
+        )
+        cls.env.invalidate_all()
+
+    @classmethod
+    def _fechar(cls, inmuebles, fechas):
+        cls.env.flush_all()
+        for inmueble, fecha in zip(inmuebles, fechas, strict=True):
+            cls.env.cr.execute(
+                "UPDATE inmo_inmueble SET write_date = %s WHERE id = %s",
+                [fecha, inmueble.id],
+            )
+        inmuebles.invalidate_recordset(["write_date"])
+
+    def _nombres(self, datos):
+        ids = set(self.inmuebles.ids)
+        return [fila["nombre"] for fila in datos["inmuebles"] if fila["id"] in ids]
+
+    def _json(self, desde=None):
+        hasta, _total = feed_portales.marca(self.env, desde)
+        cuerpo = b"".join(
+            feed_portales.exportar(self.env, "json", desde, hasta, BASE_URL)
+        )
+        return json.loads(cuerpo)
+
+    def test_feed_completo_sin_borradores(self):
+        """El feed completo omite los borradores e incluye las fotos."""
+        datos = self._json()
+        self.assertEqual(self._nombres(datos), ["Piso centro", "Casa campo"])
+        [foto] = datos["inmuebles"][-2]["fotos"]
+        checksum = self.inmuebles[0].fotos_ids.contenido_id.checksum
+        self.assertEqual(foto, f"{BASE_URL}/inmo/feed/foto/{checksum}")
+
+    def test_feed_incremental(self):
+        """Con `desde` solo sale lo modificado después, borradores incluidos."""
+        datos = self._json(self.base)
+        self.assertEqual(self._nombres(datos), ["Casa campo", "Local"])
+        self.assertEqual(len(datos["inmuebles"]), 2)
+        self.assertEqual(datos["hasta"], (self.base + timedelta(days=2)).isoformat())
+
+    def test_recorre_por_bloques(self):
+        """El recorrido por bloques no salta ni repite inmuebles con la misma
+        fecha de modificación."""
+        self._fechar(self.inmuebles, [self.base] * 3)
+        self.patch(feed_portales, "TAMANO_BLOQUE", 1)
+        self.assertFalse(
+            list(feed_portales.recorrer(self.env, self.base, None, BASE_URL))
+        )
+        desde = self.base - timedelta(seconds=1)
+        filas = list(feed_portales.recorrer(self.env, desde, None, BASE_URL))
+        self.assertEqual([fila["id"] for fila in filas], self.inmuebles.ids)
+
+    def test_xml(self):
+        """El XML generado por trozos es un documento válido."""
+        hasta, total = feed_portales.marca(self.env)
+        cuerpo = b"".join(feed_portales.exportar(self.env, "xml", None, hasta, ""))
+        raiz = etree.fromstring(cuerpo)
+        self.assertEqual(len(raiz.findall("inmueble")), total)
+        piso = raiz.find(f"inmueble[@id='{self.inmuebles[0].id}']")
+        self.assertEqual(piso.find("habitaciones").text, "3")
+
+    def test_etag_cambia_con_las_fotos(self):
+        """Cambiar una foto cambia la versión del feed."""
+        self.patch(feed_portales, "MARGEN_DELTA", timedelta(0))
+        self._fechar(self.inmuebles, [datetime(2020, 1, 1)] * 3)
+        antes = feed_portales.etag("json", None, *feed_portales.marca(self.env))
+        self.inmuebles[1].fotos_ids = [(0, 0, {"foto": imagen_base64(color="red")})]
+        despues = feed_portales.etag("json", None, *feed_portales.marca(self.env))
+        self.assertNotEqual(antes, despues)
+
+    def test_delta_espera_a_lo_reciente(self):
+        """Lo modificado dentro del margen sale en la consulta siguiente, por
+        si quedan transacciones anteriores sin confirmar."""
+        self.inmuebles[1].habitaciones = 5
+        self.env.flush_all()
+        hasta, _total = feed_portales.marca(self.env, self.base)
+        self.assertEqual(hasta, self.base + timedelta(days=2))
+        self.assertEqual(self._nombres(self._json(self.base)), ["Local"])
+
+        self.patch(feed_portales, "MARGEN_DELTA", timedelta(0))
+        self.assertEqual(self._nombres(self._json(hasta)), ["Casa campo"])
+
+    def test_delta_con_bajas(self):
+        """Los inmuebles eliminados salen como bajas en el feed incremental."""
+        self.patch(feed_portales, "MARGEN_DELTA", timedelta(0))
+        casa_id = self.inmuebles[1].id
+        self.inmuebles[1].unlink()
+
+        datos = self._json(self.base)
+        self.assertEqual(self._nombres(datos), ["Local"])
+        self.assertEqual([baja["id"] for baja in datos["bajas"]], [casa_id])
+        self.assertEqual(self._json()["bajas"], [])
+
+        hasta, _total = feed_portales.marca(self.env, self.base)
+        cuerpo = b"".join(feed_portales.exportar(self.env, "xml", self.base, hasta, ""))
+        self.assertIsNotNone(etree.fromstring(cuerpo).find(f"baja[@id='{casa_id}']"))
+
+    def test_solo_se_sirven_fotos_publicadas(self):
+        """Las fotos de un borrador no se sirven aunque se conozca la huella."""
+        contenido = self.inmuebles[0].fotos_ids.contenido_id
+        self.assertEqual(
+            feed_portales.foto_publicada(self.env, contenido.checksum), contenido
+        )
+        self.inmuebles[0].estado = "borrador"
+        self.assertFalse(feed_portales.foto_publicada(self.env, contenido.checksum))
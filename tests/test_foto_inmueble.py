@@ -0,0 +1,124 @@
+import base64
+import io
+
+from odoo.addons.inmo_odoo.models import foto_contenido
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase
+from odoo.tools.image import base64_to_image
+from PIL import Image
+
+
+def imagen_base64(ancho=800, alto=600, color="navy"):
+    """Genera una imagen PNG en base64 para las pruebas."""
+    salida = io.BytesIO()
+    Image.new("RGB", (ancho, alto), color).save(salida, format="PNG")
+    return base64.b64encode(salida.getvalue())
+
+
+def imagen_ruido_base64(ancho=800, alto=600):
+    """PNG con ruido, que apenas se comprime y pesa bastante."""
+    salida = io.BytesIO()
+    Image.effect_noise((ancho, alto), 64).convert("RGB").save(salida, format="PNG")
+    return base64.b64encode(salida.getvalue())
+
+
+class TestFotoInmueble(TransactionCase):
+    """Comprueba las miniaturas de las fotos y la portada del inmueble."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Crea un inmueble sin fotos."""
+        super().setUpClass()
+        cls.Foto = cls.env["inmo.inmueble.foto"]
+        cls.inmueble = cls.env["inmo.inmueble"].create({"nombre": "Ático demo"})
+
+    def test_miniaturas_se_generan_al_subir(self):
+        """Al subir una foto se guardan sus versiones reducidas."""
+        foto = self.Foto.create(
+            {"inmueble_id": self.inmueble.id, "foto": imagen_base64()}
+        )
+
+        self.assertEqual(base64_to_image(foto.foto_256).size, (256, 192))
+        self.assertEqual(base64_to_image(foto.foto_128).size, (128, 96))
+
+    def test_portada_sigue_el_orden_de_las_fotos(self):
+        """La portada es la primera foto y cambia al reordenar o borrar."""
+        primera, segunda = self.Foto.create(
+            [
+                {
+                    "inmueble_id": self.inmueble.id,
+                    "secuencia": 1,
+                    "foto": imagen_base64(),
+                },
+                {
+                    "inmueble_id": self.inmueble.id,
+                    "secuencia": 2,
+                    "foto": imagen_base64(color="red"),
+                },
+            ]
+        )
+        self.assertEqual(self.inmueble.foto_portada_id, primera)
+
+        segunda.secuencia = 0
+        self.assertEqual(self.inmueble.foto_portada_id, segunda)
+
+        segunda.unlink()
+        self.assertEqual(self.inmueble.foto_portada_id, primera)
+        self.assertEqual(self.inmueble.miniatura_kanban, primera.foto_256)
+
+    def test_misma_imagen_se_guarda_una_vez(self):
+        """La misma imagen en dos inmuebles comparte contenido, que se borra
+        con la última foto que lo usa."""
+        otro = self.env["inmo.inmueble"].create({"nombre": "Bajo demo"})
+        imagen = imagen_base64(color="green")
+        foto_a, foto_b = self.Foto.create(
+            [
+                {"inmueble_id": self.inmueble.id, "foto": imagen},
+                {"inmueble_id": otro.id, "foto": imagen},
+            ]
+        )
+        contenido = foto_a.contenido_id
+        self.assertTrue(contenido)
+        self.assertEqual(foto_b.contenido_id, contenido)
+        self.assertEqual(foto_b.foto_256, foto_a.foto_256)
+
+        foto_a.unlink()
+        self.assertTrue(contenido.exists())
+        foto_b.unlink()
+        self.assertFalse(contenido.exists())
+
+    def test_borrar_inmueble_purga_contenidos(self):
+        """Al borrar el inmueble no quedan contenidos sin foto."""
+        otro = self.env["inmo.inmueble"].create({"nombre": "Estudio demo"})
+        foto = self.Foto.create(
+            {"inmueble_id": otro.id, "foto": imagen_base64(color="olive")}
+        )
+        contenido = foto.contenido_id
+
+        otro.unlink()
+
+        self.assertFalse(contenido.exists())
+
+    def test_limite_de_tamano(self):
+        """Las fotos que superan el tamaño máximo se rechazan al subirlas."""
+        self.env["ir.config_parameter"].sudo().set_param(foto_contenido.PARAM_MAX_MB, 0)
+        with self.assertRaises(ValidationError):
+            self.Foto.create({"inmueble_id": self.inmueble.id, "foto": imagen_base64()})
+
+    def test_recompresion_en_segundo_plano(self):
+        """Las fotos pesadas se marcan al subirlas y el cron las recomprime."""
+        self.env["ir.config_parameter"].sudo().set_param(
+            foto_contenido.PARAM_RECOMPRIMIR_KB, 100
+        )
+        foto = self.Foto.create(
+            {"inmueble_id": self.inmueble.id, "foto": imagen_ruido_base64()}
+        )
+        contenido = foto.contenido_id
+        tamano_original = contenido.tamano
+        self.assertTrue(contenido.recomprimir)
+
+        self.env["inmo.foto.contenido"]._cron_recomprimir()
+
+        self.assertFalse(contenido.recomprimir)
+        self.assertLess(contenido.tamano, tamano_original)
+        self.assertEqual(base64_to_image(foto.foto).format, "JPEG")
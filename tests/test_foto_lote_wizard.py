@@ -0,0 +1,168 @@
+import base64
+import io
+import zipfile
+from unittest.mock import patch
+
+from odoo.addons.inmo_odoo.wizard import foto_lote_wizard
+from odoo.addons.inmo_odoo.wizard.foto_lote_wizard import descripcion_de
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+from odoo.tools.image import base64_to_image
+
+from .fake_catastro import generar_referencias
+from .test_foto_inmueble import imagen_base64
+
+
+def zip_base64(archivos):
+    """Comprime {ruta: contenido} en un ZIP en base64."""
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, "w") as comprimido:
+        for ruta, contenido in archivos.items():
+            comprimido.writestr(ruta, contenido)
+    return base64.b64encode(salida.getvalue())
+
+
+class TestFotoLoteWizard(TransactionCase):
+    """Comprueba la subida masiva de fotos desde un ZIP."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Crea dos inmuebles con referencia catastral."""
+        super().setUpClass()
+        cls.refs = generar_referencias(2, desde=8100)
+        cls.inmuebles = cls.env["inmo.inmueble"].create(
+            [
+                {"nombre": f"Piso {n}", "referencia_catastral": refcat}
+                for n, refcat in enumerate(cls.refs)
+            ]
+        )
+        cls.Wizard = cls.env["inmo.foto.lote.wizard"]
+
+    def _imagen(self, color):
+        return base64.b64decode(imagen_base64(color=color))
+
+    def test_zip_por_referencia(self):
+        """Cada carpeta va a su inmueble, en orden natural y con descripción."""
+        archivo = zip_base64(
+            {
+                f"{self.refs[0]}/10_terraza.jpg": self._imagen("red"),
+                f"{self.refs[0]}/2_salon-comedor.png": self._imagen("blue"),
+                f"{self.refs[1].lower()}/fachada.png": self._imagen("green"),
+                "__MACOSX/._fachada.png": b"basura",
+                "notas.txt": b"sin foto",
+            }
+        )
+        wizard = self.Wizard.create({"archivo": archivo})
+        wizard.action_confirm()
+
+        self.assertEqual(wizard.estado, "hecho")
+        self.assertEqual(wizard.total_inmuebles, 2)
+        fotos = self.inmuebles[0].fotos_ids
+        self.assertEqual(fotos.mapped("descripcion"), ["Salon comedor", "Terraza"])
+        self.assertEqual(self.inmuebles[1].fotos_ids.descripcion, "Fachada")
+        self.assertIn("notas.txt", wizard.errores)
+
+    def test_fotos_sueltas_al_final(self):
+        """Las fotos sueltas se añaden detrás de las que ya tiene el inmueble."""
+        inmueble = self.inmuebles[0]
+        inmueble.fotos_ids = [(0, 0, {"foto": imagen_base64(), "secuencia": 50})]
+        adjuntos = self.env["ir.attachment"].create(
+            [
+                {"name": "cocina.jpg", "raw": self._imagen("white")},
+                {"name": "bano.jpg", "raw": self._imagen("black")},
+            ]
+        )
+        wizard = self.Wizard.with_context(
+            active_model="inmo.inmueble", active_id=inmueble.id
+        ).create({"adjunto_ids": [(6, 0, adjuntos.ids)]})
+        wizard.action_confirm()
+
+        self.assertEqual(
+            inmueble.fotos_ids.mapped("descripcion"), [False, "Bano", "Cocina"]
+        )
+        self.assertEqual(inmueble.fotos_ids.mapped("secuencia"), [50, 60, 70])
+        self.assertFalse(adjuntos.exists())
+
+    def test_imagen_corrupta(self):
+        """Una imagen que no se puede leer se informa y no impide el resto."""
+        archivo = zip_base64(
+            {
+                f"{self.refs[0]}/rota.jpg": b"\xff\xd8\xff no es un jpeg",
+                f"{self.refs[0]}/salon.png": self._imagen("red"),
+                f"{self.refs[1]}/fachada.png": self._imagen("blue"),
+            }
+        )
+        wizard = self.Wizard.create({"archivo": archivo})
+        wizard.action_confirm()
+
+        self.assertEqual(len(wizard.foto_ids), 2)
+        self.assertEqual(self.inmuebles[0].fotos_ids.descripcion, "Salon")
+        self.assertIn("rota.jpg", wizard.errores)
+
+    def test_referencia_desconocida(self):
+        """Una carpeta sin inmueble se informa y no impide el resto."""
+        archivo = zip_base64(
+            {
+                "9999999VK6882S0001AA/a.png": self._imagen("red"),
+                f"{self.refs[1]}/b.png": self._imagen("blue"),
+            }
+        )
+        wizard = self.Wizard.create({"archivo": archivo})
+        wizard.action_confirm()
+
+        self.assertEqual(len(wizard.foto_ids), 1)
+        self.assertIn("9999999VK6882S0001AA", wizard.errores)
+
+    def test_misma_foto_que_desde_la_ficha(self):
+        """La huella es la del archivo subido: la misma foto desde la ficha y
+        desde el ZIP comparte contenido."""
+        imagen = self._imagen("purple")
+        foto = self.env["inmo.inmueble.foto"].create(
+            {"inmueble_id": self.inmuebles[0].id, "foto": base64.b64encode(imagen)}
+        )
+        wizard = self.Wizard.create(
+            {"archivo": zip_base64({f"{self.refs[1]}/igual.png": imagen})}
+        )
+        wizard.action_confirm()
+
+        self.assertEqual(wizard.foto_ids.contenido_id, foto.contenido_id)
+
+    def test_imagenes_preparadas_por_el_cron(self):
+        """La subida guarda los originales y el cron los prepara después."""
+        wizard = self.Wizard.create(
+            {"archivo": zip_base64({f"{self.refs[1]}/nueva.png": self._imagen("teal")})}
+        )
+        wizard.action_confirm()
+        contenido = wizard.foto_ids.contenido_id
+        self.assertTrue(contenido.recomprimir)
+        self.assertTrue(contenido.original)
+        self.assertFalse(contenido.imagen)
+
+        self.env["inmo.foto.contenido"]._cron_recomprimir()
+
+        self.assertFalse(contenido.recomprimir)
+        self.assertFalse(contenido.original)
+        self.assertEqual(base64_to_image(wizard.foto_ids.foto).format, "JPEG")
+
+    def test_limite_de_fotos_antes_de_descomprimir(self):
+        """Con demasiadas fotos se rechaza la subida sin leer ninguna."""
+        self.patch(foto_lote_wizard, "MAX_FOTOS", 1)
+        archivo = zip_base64({"a.png": self._imagen("red"), "b.png": b"x"})
+        wizard = self.Wizard.create(
+            {"archivo": archivo, "inmueble_id": self.inmuebles[0].id}
+        )
+        with (
+            patch.object(zipfile.ZipFile, "read") as leer,
+            self.assertRaises(UserError),
+        ):
+            wizard.action_confirm()
+        leer.assert_not_called()
+
+    def test_zip_no_valido(self):
+        wizard = self.Wizard.create({"archivo": base64.b64encode(b"no es un zip")})
+        with self.assertRaises(UserError):
+            wizard.action_confirm()
+
+    def test_descripcion_de(self):
+        self.assertEqual(descripcion_de("fotos/03_salon-comedor.jpg"), "Salon comedor")
+        self.assertFalse(descripcion_de("01.jpg"))
@@ -0,0 +1,64 @@
+from odoo.addons.inmo_odoo.tests.common import CatastroFalsoMixin
+from odoo.addons.inmo_odoo.tests.fake_catastro import (
+    parcela_de_portal,
+    referencias_parcela,
+)
+from odoo.tests.common import TransactionCase
+
+
+class TestInmuebleCatastroCallejeroWizard(CatastroFalsoMixin, TransactionCase):
+    """Valida la prospección por calle y por parcela contra el Catastro falso."""
+
+    def setUp(self):
+        super().setUp()
+        self.Wizard = self.env["inmo.inmueble.catastro.callejero.wizard"]
+
+    def test_calle_crea_borradores_sin_duplicar(self):
+        """Recorre los portales, omite los inexistentes y las referencias ya
+        registradas y crea el resto como borradores."""
+        existente = self.env["inmo.inmueble"].create(
+            {
+                "nombre": "Ya registrado",
+                "referencia_catastral": referencias_parcela(parcela_de_portal(1), 1)[0],
+            }
+        )
+        wizard = self.Wizard.create(
+            {
+                "provincia": "Madrid",
+                "municipio": "Alcalá de Henares",
+                "calle": "Antonio Cabezón",
+                "numero_desde": 1,
+                "numero_hasta": 6,
+                "peticiones_por_segundo": 0,
+            }
+        )
+        wizard.action_confirm()
+
+        # El portal 5 no existe: 5 portales con 3 inmuebles cada uno.
+        self.assertEqual(wizard.total_encontrados, 15)
+        self.assertEqual(wizard.total_existentes, 1)
+        self.assertEqual(len(wizard.inmueble_ids), 14)
+        self.assertNotIn(existente, wizard.inmueble_ids)
+        self.assertEqual(set(wizard.inmueble_ids.mapped("estado")), {"borrador"})
+        self.assertEqual(self.servidor.peticiones, 6)
+
+        primero = wizard.inmueble_ids.filtered(
+            lambda i: i.referencia_catastral
+            == referencias_parcela(parcela_de_portal(1), 2)[1]
+        )
+        self.assertEqual(primero.calle, "CL ANTONIO CABEZÓN")
+        self.assertEqual(primero.calle2, "Nº 1 Esc. 1 Pl. 02 Pu. A")
+        self.assertEqual(primero.provincia, self.env.ref("base.state_es_m"))
+
+    def test_parcela_crea_todas_sus_unidades(self):
+        """Una referencia de parcela devuelve y crea todos sus inmuebles."""
+        parcela = parcela_de_portal(50)
+        wizard = self.Wizard.create(
+            {"modo": "parcela", "referencia_parcela": parcela.lower()}
+        )
+        wizard.action_confirm()
+
+        self.assertEqual(
+            sorted(wizard.inmueble_ids.mapped("referencia_catastral")),
+            referencias_parcela(parcela, 3),
+        )
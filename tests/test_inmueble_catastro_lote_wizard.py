@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+from odoo.addons.inmo_odoo.models import catastro_service
+from odoo.tests.common import TransactionCase
+
+CONSULTA = "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+
+
+class TestInmuebleCatastroLoteWizard(TransactionCase):
+    """Valida el asistente de Catastro para varios inmuebles."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Crea inmuebles con referencias válidas, inexistentes y vacías."""
+        super().setUpClass()
+        cls.Inmueble = cls.env["inmo.inmueble"]
+        cls.Wizard = cls.env["inmo.inmueble.catastro.lote.wizard"]
+
+        cls.ref_ok = "8124906VK6882S0003EB"
+        cls.ref_ok_2 = "8124906VK6882S0004RZ"
+        cls.ref_no_existe = "8320313VK6882S0002QL"
+        cls.piso_a = cls.Inmueble.create(
+            {"nombre": "Piso A", "referencia_catastral": cls.ref_ok}
+        )
+        cls.piso_b = cls.Inmueble.create(
+            {"nombre": "Piso B", "referencia_catastral": cls.ref_ok_2.lower()}
+        )
+        cls.solar = cls.Inmueble.create(
+            {"nombre": "Solar", "referencia_catastral": cls.ref_no_existe}
+        )
+        cls.sin_ref = cls.Inmueble.create({"nombre": "Sin referencia"})
+
+    def setUp(self):
+        """Parte de una caché en memoria vacía en cada prueba."""
+        super().setUp()
+        catastro_service.limpiar_cache_memoria()
+
+    def _consulta_falsa(self, refcat):
+        if refcat == self.ref_no_existe:
+            raise catastro_service.CatastroNoEncontradoError("No existe")
+        return {
+            "referencia_catastral": refcat,
+            "municipio": "ALCALA DE HENARES",
+            "provincia": "",
+            "codigo_postal": "28806",
+            "nombre_via": "CL ANTONIO CABEZON",
+            "superficie_m2": 89.0,
+            "complemento_via": None,
+            "uso": "Residencial",
+            "tipo_constructivo": None,
+        }
+
+    def test_lote_informa_por_inmueble_sin_abortar(self):
+        """Cada inmueble recibe su resultado sin que un fallo aborte el lote."""
+        inmuebles = self.piso_a | self.piso_b | self.solar | self.sin_ref
+        wizard = self.Wizard.with_context(
+            active_model="inmo.inmueble", active_ids=inmuebles.ids
+        ).create({"peticiones_por_segundo": 0})
+        self.assertEqual(wizard.inmueble_ids, inmuebles)
+
+        with patch(CONSULTA, side_effect=self._consulta_falsa) as consulta_mock:
+            wizard.action_confirm()
+
+        self.assertEqual(consulta_mock.call_count, 3)
+        resultados = {linea.inmueble_id: linea.resultado for linea in wizard.linea_ids}
+        self.assertEqual(resultados[self.piso_a], "ok")
+        self.assertEqual(resultados[self.piso_b], "ok")
+        self.assertEqual(resultados[self.solar], "no_encontrado")
+        self.assertEqual(resultados[self.sin_ref], "error")
+        self.assertEqual(wizard.total_ok, 2)
+        self.assertEqual(self.piso_b.ciudad, "ALCALA DE HENARES")
+        self.assertEqual(self.piso_b.tipo_inmueble, "piso")
+        self.assertFalse(self.solar.ciudad)
+
+    def test_consulta_lote_deduplica_referencias(self):
+        """Las referencias repetidas se consultan una sola vez."""
+        with patch(CONSULTA, side_effect=self._consulta_falsa) as consulta_mock:
+            respuestas = catastro_service.consulta_lote(
+                self.env,
+                [self.ref_ok, self.ref_ok.lower(), f" {self.ref_ok} ", ""],
+                peticiones_por_segundo=0,
+            )
+
+        consulta_mock.assert_called_once_with(self.ref_ok)
+        self.assertEqual(list(respuestas), [self.ref_ok])
@@ -1,7 +1,13 @@
 from unittest.mock import patch
 
+import psycopg2
+from odoo.addons.inmo_odoo.models import catastro_service
 from odoo.exceptions import UserError
+from odoo.tests import Form
 from odoo.tests.common import TransactionCase
+from odoo.tools import mute_logger
+
+from .fake_catastro import generar_referencias
 
 
 class TestInmuebleCatastroWizard(TransactionCase):
@@ -22,6 +28,11 @@ class TestInmuebleCatastroWizard(TransactionCase):
             }
         )
 
+    def setUp(self):
+        """Parte de una caché en memoria vacía en cada prueba."""
+        super().setUp()
+        catastro_service.limpiar_cache_memoria()
+
     def _new_wizard(self, referencia="8124906VK6882S0007UQ"):
         """Devuelve un asistente nuevo con el contexto esperado."""
         return self.Wizard.with_context(active_id=self.inmueble.id).create(
@@ -62,3 +73,92 @@ class TestInmuebleCatastroWizard(TransactionCase):
         wizard = self._new_wizard(referencia="  ")
         with self.assertRaises(UserError):
             wizard.action_confirm()
+
+    def test_action_confirm_referencia_invalida_sin_consultar(self):
+        """Una referencia con los dígitos de control mal no sale a Catastro."""
+        wizard = self._new_wizard(referencia="8124906VK6882S0007AA")
+        with (
+            patch(
+                "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+            ) as consulta_mock,
+            self.assertRaises(UserError),
+        ):
+            wizard.action_confirm()
+        consulta_mock.assert_not_called()
+
+    def test_precarga_desde_la_ficha(self):
+        """Teclear la referencia en la ficha deja la respuesta en caché y el
+        asistente ya no consulta Catastro."""
+        # Una referencia que no esté en los datos de demostración.
+        (refcat,) = generar_referencias(1, desde=8200)
+        with patch(
+            "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia",
+            return_value={"dummy": "value"},
+        ) as consulta_mock:
+            with Form(self.inmueble) as ficha:
+                ficha.referencia_catastral = refcat.lower()
+            consulta_mock.assert_called_once_with(refcat)
+
+        with (
+            patch(
+                "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+            ) as consulta_mock,
+            patch(
+                "odoo.addons.inmo_odoo.models.catastro_service.mapear_campos_inmueble",
+                return_value={"ciudad": "Madrid"},
+            ),
+        ):
+            self._new_wizard(referencia=refcat).action_confirm()
+        consulta_mock.assert_not_called()
+        self.assertEqual(self.inmueble.ciudad, "Madrid")
+
+    def test_precarga_rechaza_referencia_invalida(self):
+        """Con una referencia no válida la ficha avisa y no consulta nada."""
+        with patch(
+            "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+        ) as consulta_mock:
+            aviso = self.Inmueble.new(
+                {"referencia_catastral": "8124906VK6882S0007"}
+            )._onchange_precargar_catastro()
+        consulta_mock.assert_not_called()
+        self.assertIn("warning", aviso)
+
+    def test_referencia_normalizada_y_unica(self):
+        """La referencia se guarda normalizada y no puede repetirse."""
+        self.inmueble.referencia_catastral = " 8124906vk6882s0005tx "
+        self.assertEqual(self.inmueble.referencia_catastral, "8124906VK6882S0005TX")
+
+        with (
+            mute_logger("odoo.sql_db"),
+            self.assertRaises(psycopg2.IntegrityError),
+            self.env.cr.savepoint(),
+        ):
+            self.Inmueble.create(
+                {"nombre": "Copia", "referencia_catastral": "8124906VK6882S0005TX"}
+            )
+
+    def test_busqueda_por_prefijo_de_referencia(self):
+        """La referencia se encuentra escribiendo su principio, con espacios
+        o en minúsculas."""
+        self.inmueble.referencia_catastral = "8124906VK6882S0005TX"
+        for texto in ("8124906vk", "8124906 VK6882S 0005", "8124906VK6882S0005TX"):
+            with self.subTest(texto=texto):
+                self.assertIn(
+                    self.inmueble,
+                    self.Inmueble.search([("referencia_busqueda", "=", texto)]),
+                )
+        self.assertNotIn(
+            self.inmueble,
+            self.Inmueble.search([("referencia_busqueda", "=", "VK6882S")]),
+        )
+
+    def test_busqueda_texto_completo(self):
+        """La búsqueda encuentra palabras de la dirección sin tildes."""
+        self.inmueble.write({"calle": "CL Antonio Cabezón", "ciudad": "Alcalá"})
+
+        encontrados = self.Inmueble.search([("busqueda", "ilike", "cabezon alca")])
+        self.assertIn(self.inmueble, encontrados)
+        self.assertNotIn(
+            self.inmueble,
+            self.Inmueble.search([("busqueda", "ilike", "cabezon sevilla")]),
+        )
@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.addons.inmo_odoo.models.normalizacion import (
+    normalizar_calle,
+    partes_complemento,
+)
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+from .test_foto_inmueble import imagen_base64
+
+
+class TestInmuebleDuplicado(TransactionCase):
+    """Comprueba la detección y fusión de inmuebles duplicados."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Da de alta el mismo piso dos veces y el de la puerta de al lado."""
+        super().setUpClass()
+        Inmueble = cls.env["inmo.inmueble"]
+        cls.Duplicado = cls.env["inmo.inmueble.duplicado"]
+        cls.original = Inmueble.create(
+            {
+                "nombre": "Piso Calle Mayor",
+                "calle": "Calle Mayor, 5",
+                "calle2": "Pl. 3 Pu. B",
+                "codigo_postal": "28999",
+                "ciudad": "Villaprueba",
+            }
+        )
+        cls.repetido = Inmueble.create(
+            {
+                "nombre": "piso c/ mayor",
+                "calle": "CL MAYOR",
+                "calle2": "Nº 5 Pl. 03 Pu. B",
+                "codigo_postal": "28999",
+                "habitaciones": 3,
+                "precio": 250000,
+            }
+        )
+        cls.vecino = Inmueble.create(
+            {
+                "nombre": "Piso puerta A",
+                "calle": "Calle Mayor, 5",
+                "calle2": "Pl. 3 Pu. A",
+                "codigo_postal": "28999",
+            }
+        )
+
+    def test_normalizacion(self):
+        self.assertEqual(normalizar_calle("C/ de la Paz, 5"), ("paz", "5"))
+        self.assertEqual(normalizar_calle("Avda. Castilla nº 12"), ("castilla", "12"))
+        self.assertEqual(
+            partes_complemento("Nº 5 Esc. 1 Pl. 03 Pu. B"),
+            {"numero": "5", "escalera": "1", "planta": "3", "puerta": "b"},
+        )
+        self.assertEqual(partes_complemento("3º B"), {"planta": "3", "puerta": "b"})
+
+    def test_clave_bloqueo(self):
+        """Las tres altas caen en el mismo bloque."""
+        claves = (self.original | self.repetido | self.vecino).mapped("clave_bloqueo")
+        self.assertEqual(set(claves), {"28999|5"})
+
+    def test_analisis_del_catalogo(self):
+        """Solo el mismo piso sale como duplicado; la otra puerta no."""
+        self.Duplicado._analizar_catalogo()
+        parejas = self.Duplicado.search(
+            [("inmueble_id", "in", (self.original | self.vecino).ids)]
+        )
+        self.assertEqual(len(parejas), 1)
+        self.assertEqual(parejas.inmueble_id, self.original)
+        self.assertEqual(parejas.duplicado_id, self.repetido)
+        self.assertGreaterEqual(parejas.puntuacion, 0.8)
+
+    def test_descartados_se_conservan(self):
+        """Una pareja descartada no vuelve a quedar pendiente."""
+        self.Duplicado._analizar_catalogo()
+        pareja = self.Duplicado.search([("duplicado_id", "=", self.repetido.id)])
+        pareja.action_descartar()
+        self.Duplicado._analizar_catalogo()
+        self.assertEqual(pareja.estado, "descartado")
+
+    def test_aviso_al_dar_de_alta(self):
+        """El formulario avisa al escribir una dirección ya registrada."""
+        nuevo = self.env["inmo.inmueble"].new(
+            {
+                "calle": "C/ Mayor 5",
+                "calle2": "3º B",
+                "codigo_postal": "28999",
+            }
+        )
+        aviso = nuevo._onchange_posibles_duplicados()
+        self.assertIn(self.original.display_name, aviso["warning"]["message"])
+        self.assertNotIn(self.vecino.display_name, aviso["warning"]["message"])
+
+    def test_fusionar(self):
+        """Al fusionar, fotos y visitas pasan al original y se completan sus
+        datos vacíos."""
+        self.repetido.fotos_ids = [(0, 0, {"foto": imagen_base64()})]
+        inicio = fields.Datetime.now()
+        visita = self.env["calendar.event"].create(
+            {
+                "cliente_id": self.env["res.partner"].create({"name": "Eva"}).id,
+                "inmueble_id": self.repetido.id,
+                "start": inicio,
+                "stop": inicio + timedelta(hours=1),
+            }
+        )
+        self.Duplicado._analizar_catalogo()
+        pareja = self.Duplicado.search([("duplicado_id", "=", self.repetido.id)])
+
+        pareja.action_fusionar()
+
+        self.assertFalse(self.repetido.exists())
+        self.assertFalse(pareja.exists())
+        self.assertEqual(visita.inmueble_id, self.original)
+        self.assertEqual(len(self.original.fotos_ids), 1)
+        self.assertEqual(self.original.habitaciones, 3)
+        self.assertEqual(self.original.precio, 250000)
+        self.assertEqual(self.original.calle, "Calle Mayor, 5")
+
+    def test_fusionar_con_visitas_solapadas(self):
+        """Si los dos tienen visitas a la misma hora se pide archivar una, y
+        una vez archivada se fusionan."""
+        cliente = self.env["res.partner"].create({"name": "Leo"})
+        inicio = fields.Datetime.now() + timedelta(days=1)
+        visitas = self.env["calendar.event"].create(
+            [
+                {
+                    "cliente_id": cliente.id,
+                    "inmueble_id": inmueble.id,
+                    "start": inicio,
+                    "stop": inicio + timedelta(hours=1),
+                }
+                for inmueble in (self.original, self.repetido)
+            ]
+        )
+
+        with self.assertRaises(UserError):
+            self.original._fusionar(self.repetido)
+        self.assertTrue(self.repetido.exists())
+
+        visitas[1].active = False
+        self.original._fusionar(self.repetido)
+        self.assertFalse(self.repetido.exists())
+        self.assertEqual(visitas.inmueble_id, self.original)
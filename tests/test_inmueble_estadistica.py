@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+
+class TestInmuebleEstadistica(TransactionCase):
+    """Comprueba las cifras de la vista materializada tras refrescarla."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.provincia = cls.env["res.country.state"].create(
+            {
+                "name": "Provincia de pruebas",
+                "code": "ZZ",
+                "country_id": cls.env.ref("base.es").id,
+            }
+        )
+        cls.inmuebles = cls.env["inmo.inmueble"].create(
+            [
+                {
+                    "nombre": "Piso grande",
+                    "provincia": cls.provincia.id,
+                    "tipo_inmueble": "piso",
+                    "superficie_construida": 120,
+                    "habitaciones": 4,
+                    "banos": 2,
+                },
+                {
+                    "nombre": "Piso pequeño",
+                    "provincia": cls.provincia.id,
+                    "tipo_inmueble": "piso",
+                    "superficie_construida": 60,
+                    "habitaciones": 1,
+                    "banos": 1,
+                },
+                {
+                    "nombre": "Local vendido",
+                    "provincia": cls.provincia.id,
+                    "tipo_inmueble": "local",
+                    "estado": "vendido",
+                    "superficie_construida": 90,
+                },
+            ]
+        )
+        cliente = cls.env["res.partner"].create({"name": "Cliente estadísticas"})
+        inicio = fields.Datetime.now()
+        cls.env["calendar.event"].create(
+            [
+                {
+                    "cliente_id": cliente.id,
+                    "inmueble_id": cls.inmuebles[0].id,
+                    "start": inicio + timedelta(hours=horas),
+                    "stop": inicio + timedelta(hours=horas, minutes=30),
+                }
+                for horas in (1, 2)
+            ]
+        )
+
+    def _fila(self, nivel, **dominio):
+        Estadistica = self.env["inmo.inmueble.estadistica"]
+        return Estadistica.search(
+            [("nivel", "=", nivel)] + [(campo, "=", v) for campo, v in dominio.items()]
+        )
+
+    def test_cifras_por_nivel(self):
+        """Cada nivel agrega sus inmuebles con medias exactas."""
+        self.env["inmo.inmueble.estadistica"]._cron_refrescar()
+
+        provincia = self._fila("provincia", provincia=self.provincia.id)
+        self.assertEqual(len(provincia), 1)
+        self.assertEqual(provincia.total, 3)
+        self.assertEqual(provincia.superficie_total, 270)
+        self.assertAlmostEqual(provincia.superficie_media, 90)
+        self.assertEqual(provincia.habitaciones_0_1, 2)
+        self.assertEqual(provincia.habitaciones_4_mas, 1)
+        self.assertEqual(provincia.banos_2, 1)
+        self.assertEqual(provincia.visitas, 2)
+
+        pisos = self._fila(
+            "detalle",
+            provincia=self.provincia.id,
+            estado="disponible",
+            tipo_inmueble="piso",
+        )
+        self.assertEqual(pisos.total, 2)
+        self.assertAlmostEqual(pisos.habitaciones_media, 2.5)
+
+    def test_refresco_tras_cambios(self):
+        """Los cambios se ven al refrescar y dejan un aviso al cron."""
+        Estadistica = self.env["inmo.inmueble.estadistica"]
+        Estadistica._cron_refrescar()
+        self.env.cr.precommit.data.pop("inmo_odoo.estadisticas_pendientes", None)
+        cron = self.env.ref("inmo_odoo.ir_cron_refrescar_estadisticas")
+        avisos = self.env["ir.cron.trigger"].search_count([("cron_id", "=", cron.id)])
+
+        self.inmuebles[2].estado = "disponible"
+        self.inmuebles[1].unlink()
+
+        self.assertEqual(
+            self.env["ir.cron.trigger"].search_count([("cron_id", "=", cron.id)]),
+            avisos + 1,
+        )
+        Estadistica._cron_refrescar()
+        disponibles = self._fila(
+            "detalle",
+            provincia=self.provincia.id,
+            estado="disponible",
+        )
+        self.assertEqual(sum(disponibles.mapped("total")), 2)
+        self.assertFalse(
+            self._fila("detalle", estado="vendido", provincia=self.provincia.id)
+        )
@@ -0,0 +1,97 @@
+from odoo.addons.inmo_odoo.models import geo
+from odoo.addons.inmo_odoo.tests.common import CatastroFalsoMixin
+from odoo.addons.inmo_odoo.tests.fake_catastro import (
+    coordenadas_parcela,
+    generar_referencias,
+)
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase
+
+# Punto en el océano, lejos de cualquier inmueble de demostración.
+CENTRO = (30.0, -30.0)
+
+
+class TestInmuebleGeo(CatastroFalsoMixin, TransactionCase):
+    """Coordenadas, geolocalización en segundo plano y búsqueda por radio."""
+
+    def _crear_en(self, nombre, desplazamiento_km_norte, desplazamiento_km_este=0):
+        latitud = CENTRO[0] + desplazamiento_km_norte / 111.195
+        longitud = CENTRO[1] + desplazamiento_km_este / (111.195 * 0.866)
+        return self.env["inmo.inmueble"].create(
+            {"nombre": nombre, "latitud": latitud, "longitud": longitud}
+        )
+
+    def test_geohash_conocido(self):
+        self.assertEqual(geo.geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertAlmostEqual(
+            geo.distancia_km(40.4168, -3.7038, 41.3874, 2.1686), 505, delta=2
+        )
+
+    def test_centroide_en_el_alta(self):
+        """Sin coordenadas, el alta toma el centroide del código postal."""
+        inmueble = self.env["inmo.inmueble"].create(
+            {"nombre": "Centro", "codigo_postal": "28001"}
+        )
+        self.assertEqual(inmueble.origen_coordenadas, "codigo_postal")
+        self.assertAlmostEqual(inmueble.latitud, 40.4168)
+        self.assertTrue(inmueble.geohash.startswith("ezjm"))
+        self.assertTrue(inmueble.geo_pendiente)
+
+    def test_coordenadas_manuales(self):
+        inmueble = self._crear_en("Manual", 0)
+        self.assertEqual(inmueble.origen_coordenadas, "manual")
+        self.assertFalse(inmueble.geo_pendiente)
+        inmueble.codigo_postal = "28001"
+        self.assertFalse(inmueble.geo_pendiente)
+
+    def test_cron_geolocalizar(self):
+        """Catastro si hay referencia; si no la conoce, el código postal."""
+        (con_parcela,) = generar_referencias(1, desde=7000)
+        (inexistente,) = generar_referencias(1, parcela="9999999VK6882S", desde=1)
+        self.servidor.parcelas_sin_coordenadas.add(inexistente[:14])
+        inmuebles = self.env["inmo.inmueble"].create(
+            [
+                {"nombre": "Con parcela", "referencia_catastral": con_parcela},
+                {
+                    "nombre": "Sin coordenadas",
+                    "referencia_catastral": inexistente,
+                    "codigo_postal": "08001",
+                },
+                {"nombre": "Solo CP", "codigo_postal": "28806"},
+            ]
+        )
+        self.env["inmo.inmueble"].search(
+            [("geo_pendiente", "=", True), ("id", "not in", inmuebles.ids)]
+        ).geo_pendiente = False
+
+        self.env["inmo.inmueble"]._cron_geolocalizar()
+
+        self.assertFalse(any(inmuebles.mapped("geo_pendiente")))
+        self.assertEqual(
+            inmuebles.mapped("origen_coordenadas"),
+            ["catastro", "codigo_postal", "codigo_postal"],
+        )
+        latitud, longitud = coordenadas_parcela(con_parcela[:14])
+        self.assertAlmostEqual(inmuebles[0].latitud, latitud, places=6)
+        self.assertAlmostEqual(inmuebles[0].longitud, longitud, places=6)
+        self.assertAlmostEqual(inmuebles[1].latitud, 41.3874)
+        self.assertAlmostEqual(inmuebles[2].latitud, 40.49)
+
+    def test_busqueda_por_radio_y_caja(self):
+        cerca = self._crear_en("A 1 km", 1)
+        junto = self._crear_en("A 0,2 km", 0, 0.2)
+        esquina = self._crear_en("Esquina de la caja", 1.9, 1.9)
+        lejos = self._crear_en("A 5 km", 5)
+
+        encontrados = self.env["inmo.inmueble"].buscar_en_radio(*CENTRO, 2)
+        self.assertEqual(encontrados, junto | cerca)
+        self.assertEqual(encontrados[0], junto)
+
+        self.assertEqual(
+            self.env["inmo.inmueble"].search([("cerca_de", "=", "30, -30, 6")]),
+            junto | cerca | esquina | lejos,
+        )
+        caja = self.env["inmo.inmueble"].buscar_en_caja(*geo.caja_alrededor(*CENTRO, 2))
+        self.assertEqual(caja, junto | cerca | esquina)
+        with self.assertRaises(ValidationError):
+            self.env["inmo.inmueble"].search([("cerca_de", "=", "aquí")])
@@ -0,0 +1,125 @@
+import base64
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+from .fake_catastro import generar_referencias
+
+CSV = """Nombre;Referencia catastral;Estado;Código postal;Provincia;Superficie
+Piso actualizado;8124906vk6882s0006ym;reservado;8001;Barcelona;89,5
+Casa nueva;;Disponible;28806;MADRID;120
+Local erróneo;;disponible;28001;Atlántida;50
+"""
+
+
+class TestInmuebleImportWizard(TransactionCase):
+    """Valida la importación masiva de inmuebles desde CSV."""
+
+    def test_importa_actualiza_y_anota_errores(self):
+        """Crea las filas nuevas, actualiza por referencia y anota los errores
+        sin abortar la importación."""
+        Inmueble = self.env["inmo.inmueble"]
+        existente = Inmueble.create(
+            {"nombre": "Piso", "referencia_catastral": "8124906VK6882S0006YM"}
+        )
+        wizard = self.env["inmo.inmueble.import.wizard"].create(
+            {
+                "archivo": base64.b64encode(CSV.encode()),
+                "nombre_archivo": "cartera.csv",
+                "tamano_lote": 2,
+            }
+        )
+        Bus = self.env["bus.bus"]
+        avisos = [("message", "like", "filas procesadas")]
+        antes = Bus.search_count(avisos)
+        wizard.action_importar()
+
+        # Un aviso de progreso por lote de dos filas.
+        self.assertEqual(Bus.search_count(avisos), antes + 2)
+        self.assertEqual(wizard.total_filas, 3)
+        self.assertEqual(wizard.filas_creadas, 1)
+        self.assertEqual(wizard.filas_actualizadas, 1)
+        self.assertEqual(len(wizard.error_ids), 1)
+        self.assertEqual(wizard.error_ids.fila, 4)
+        self.assertIn("Atlántida", wizard.error_ids.mensaje)
+
+        self.assertEqual(existente.nombre, "Piso actualizado")
+        self.assertEqual(existente.estado, "reservado")
+        self.assertEqual(existente.codigo_postal, "08001")
+        self.assertEqual(existente.superficie_construida, 89.5)
+        self.assertEqual(existente.provincia, self.env.ref("base.state_es_b"))
+
+        casa = Inmueble.search([("nombre", "=", "Casa nueva")])
+        self.assertEqual(casa.estado, "disponible")
+        self.assertEqual(casa.provincia, self.env.ref("base.state_es_m"))
+
+    def test_agrupa_las_actualizaciones_iguales(self):
+        """Las filas que cambian lo mismo se escriben de una vez."""
+        Inmueble = self.env["inmo.inmueble"]
+        referencias = generar_referencias(3, desde=8300)
+        inmuebles = Inmueble.create(
+            [
+                {"nombre": f"Piso {n}", "referencia_catastral": refcat}
+                for n, refcat in enumerate(referencias)
+            ]
+        )
+        filas = [f"Piso {n};{refcat};Vendido" for n, refcat in enumerate(referencias)]
+        csv = "\n".join(["Nombre;Referencia;Estado", *filas])
+        wizard = self.env["inmo.inmueble.import.wizard"].create(
+            {"archivo": base64.b64encode(csv.encode()), "nombre_archivo": "a.csv"}
+        )
+
+        with patch.object(
+            type(Inmueble), "write", autospec=True, side_effect=type(Inmueble).write
+        ) as write_mock:
+            wizard.action_importar()
+
+        self.assertEqual(write_mock.call_count, 1)
+        self.assertEqual(wizard.filas_actualizadas, 3)
+        self.assertEqual(inmuebles.mapped("estado"), ["vendido"] * 3)
+
+    def test_miles_y_referencias_repetidas(self):
+        """Un punto de miles no se toma por decimal, y la fila sustituida por
+        otra con la misma referencia se anota como error."""
+        refcat = generar_referencias(1, desde=8310)[0]
+        csv = "\n".join(
+            [
+                "Nombre;Referencia;Superficie",
+                f"Nave;{refcat};1.200",
+                f"Nave grande;{refcat};1.200.000",
+                "Parcela;;2.500,5",
+            ]
+        )
+        wizard = self.env["inmo.inmueble.import.wizard"].create(
+            {"archivo": base64.b64encode(csv.encode()), "nombre_archivo": "a.csv"}
+        )
+        wizard.action_importar()
+
+        nave = self.env["inmo.inmueble"].search([("referencia_catastral", "=", refcat)])
+        self.assertEqual(nave.nombre, "Nave grande")
+        self.assertEqual(nave.superficie_construida, 1200000)
+        parcela = self.env["inmo.inmueble"].search([("nombre", "=", "Parcela")])
+        self.assertEqual(parcela.superficie_construida, 2500.5)
+        self.assertEqual(wizard.error_ids.fila, 2)
+        self.assertIn("fila 3", wizard.error_ids.mensaje)
+        self.assertEqual(wizard._numero("1.200", int, "superficie"), 1200)
+        self.assertEqual(wizard._numero("89.5", float, "superficie"), 89.5)
+
+    def test_referencia_no_valida(self):
+        """Una referencia con los dígitos de control mal es un error de fila."""
+        refcat = generar_referencias(1, desde=8320)[0]
+        csv = "\n".join(
+            [
+                "Nombre;Referencia",
+                f"Piso bueno;{refcat}",
+                f"Piso malo;{refcat[:-2]}AA",
+            ]
+        )
+        wizard = self.env["inmo.inmueble.import.wizard"].create(
+            {"archivo": base64.b64encode(csv.encode()), "nombre_archivo": "a.csv"}
+        )
+        wizard.action_importar()
+
+        self.assertEqual(wizard.filas_creadas, 1)
+        self.assertEqual(wizard.error_ids.fila, 3)
+        self.assertIn("no válida", wizard.error_ids.mensaje)
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+from odoo.addons.inmo_odoo.models import catastro_service, metricas
+from odoo.tests.common import TransactionCase
+
+CONSULTA = "odoo.addons.inmo_odoo.models.catastro_service.consulta_por_referencia"
+
+
+class TestMetricas(TransactionCase):
+    """Comprueba la instrumentación de Catastro y su exportación."""
+
+    def setUp(self):
+        super().setUp()
+        catastro_service.limpiar_cache_memoria()
+        metricas.reiniciar()
+        self.addCleanup(metricas.reiniciar)
+        self.addCleanup(self._activar, False)
+
+    def _activar(self, activas):
+        self.env["ir.config_parameter"].sudo().set_param(
+            metricas.PARAM_ACTIVAS, str(activas)
+        )
+        metricas.sincronizar(self.env)
+
+    def _respuesta(self, refcat):
+        return {
+            "referencia_catastral": refcat,
+            "municipio": "ALCALA DE HENARES",
+            "provincia": "MADRID",
+            "codigo_postal": "28806",
+            "nombre_via": "CL ANTONIO CABEZON",
+            "superficie_m2": 89.0,
+            "complemento_via": None,
+            "uso": "Residencial",
+            "tipo_constructivo": None,
+        }
+
+    def test_desactivadas_no_acumulan(self):
+        """Sin activar, las operaciones no dejan rastro."""
+        self._activar(False)
+        with patch(CONSULTA, side_effect=self._respuesta):
+            catastro_service.consulta_con_cache(self.env, "8124906VK6882S0007UQ")
+
+        self.assertEqual(metricas.instantanea(), {"tramos": {}, "contadores": {}})
+
+    def test_tramos_contadores_y_prometheus(self):
+        """Se miden las consultas, los aciertos de caché y los errores."""
+        self._activar(True)
+        refcat = "8124906VK6882S0007UQ"
+        with patch(CONSULTA, side_effect=self._respuesta):
+            catastro_service.consulta_con_cache(self.env, refcat)
+            catastro_service.consulta_con_cache(self.env, refcat)
+        with (
+            patch(
+                CONSULTA,
+                side_effect=catastro_service.CatastroNoEncontradoError("No existe"),
+            ),
+            self.assertRaises(catastro_service.CatastroNoEncontradoError),
+        ):
+            catastro_service.consulta_con_cache(self.env, "8320313VK6882S0002QL")
+
+        datos = metricas.instantanea()
+        tramo = datos["tramos"]["catastro.consulta_con_cache"]
+        self.assertEqual(tramo.llamadas, 3)
+        self.assertEqual(tramo.errores, 1)
+        self.assertGreater(tramo.consultas_sql, 0)
+        self.assertEqual(
+            datos["contadores"][("catastro_cache", (("resultado", "memoria"),))], 1
+        )
+
+        texto = metricas.exportar_prometheus()
+        self.assertIn(
+            'inmo_operacion_segundos_count{operacion="catastro.consulta_con_cache"} 3',
+            texto,
+        )
+        self.assertIn(
+            'inmo_errores_total{operacion="catastro.consulta_con_cache",'
+            'tipo="CatastroNoEncontradoError"} 1',
+            texto,
+        )
+
+        panel = self.env["inmo.metricas.panel"].create({})
+        self.assertTrue(panel.activas)
+        self.assertAlmostEqual(panel.ratio_cache, 100.0 / 3)
+        self.assertIn(
+            "catastro.consulta_con_cache", panel.operacion_ids.mapped("nombre")
+        )
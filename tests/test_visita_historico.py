@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+
+class TestVisitaHistorico(TransactionCase):
+    """Comprueba el paso de visitas antiguas al histórico."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.inmueble = cls.env["inmo.inmueble"].create({"nombre": "Ático con historia"})
+        cls.cliente = cls.env["res.partner"].create({"name": "Cliente antiguo"})
+        ahora = fields.Datetime.now()
+        cls.limite = ahora - timedelta(days=365)
+        cls.antiguas = cls.env["calendar.event"].create(
+            [
+                {
+                    "cliente_id": cls.cliente.id,
+                    "inmueble_id": cls.inmueble.id,
+                    "start": ahora - timedelta(days=dias),
+                    "stop": ahora - timedelta(days=dias, minutes=-30),
+                    "resultado": "interesado",
+                }
+                for dias in (800, 900, 1000)
+            ]
+        )
+        cls.reciente = cls.env["calendar.event"].create(
+            {
+                "cliente_id": cls.cliente.id,
+                "inmueble_id": cls.inmueble.id,
+                "start": ahora - timedelta(days=2),
+                "stop": ahora - timedelta(days=2, minutes=-30),
+            }
+        )
+
+    def test_archivar_visitas_antiguas(self):
+        """Las visitas antiguas salen del calendario sin perder la cuenta."""
+        self.assertEqual(self.inmueble.total_visitas, 4)
+        eventos = self.antiguas.ids
+
+        self.env["inmo.visita.historico"]._archivar(limite=self.limite)
+
+        self.assertFalse(self.env["calendar.event"].browse(eventos).exists())
+        self.assertTrue(self.reciente.exists())
+        historico = self.env["inmo.visita.historico"].search(
+            [("inmueble_id", "=", self.inmueble.id)]
+        )
+        self.assertEqual(sorted(historico.mapped("evento_id")), sorted(eventos))
+        self.assertEqual(set(historico.mapped("resultado")), {"interesado"})
+        self.assertEqual(historico.cliente_id, self.cliente)
+        self.assertAlmostEqual(historico[0].duracion, 0.5)
+        self.assertEqual(self.inmueble.visitas_archivadas, 3)
+        self.assertEqual(self.inmueble.total_visitas, 4)
+
+    def test_archivar_dos_veces_no_duplica(self):
+        """Repetir el archivado no copia ni cuenta dos veces."""
+        Historico = self.env["inmo.visita.historico"]
+        Historico._archivar(limite=self.limite)
+        self.assertEqual(Historico._archivar(limite=self.limite), 0)
+        self.assertEqual(self.inmueble.visitas_archivadas, 3)
+
+    def test_informe_une_calendario_e_historico(self):
+        """El informe muestra las visitas estén donde estén."""
+        self.env["inmo.visita.historico"]._archivar(limite=self.limite)
+        self.env.flush_all()
+        filas = self.env["inmo.visita.informe"].search(
+            [("inmueble_id", "=", self.inmueble.id)]
+        )
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas.mapped("origen").count("historico"), 3)
+        self.assertEqual(filas.mapped("origen").count("calendario"), 1)
+
+    def test_fusionar_conserva_visitas_archivadas(self):
+        """Al fusionar, el histórico y su contador pasan al que se queda."""
+        self.env["inmo.visita.historico"]._archivar(limite=self.limite)
+        original = self.env["inmo.inmueble"].create({"nombre": "Ático original"})
+
+        original._fusionar(self.inmueble)
+
+        self.assertEqual(original.visitas_archivadas, 3)
+        self.assertEqual(original.total_visitas, 4)
+        self.assertEqual(
+            self.env["inmo.visita.historico"].search_count(
+                [("inmueble_id", "=", original.id)]
+            ),
+            3,
+        )
@@ -87,3 +87,79 @@ class TestVisitaInmueble(TransactionCase):
             default_inmueble_id=self.inmueble.id
         ).default_get(["name"])
         self.assertEqual(defaults.get("name"), "Visita inmobiliaria")
+
+    def test_create_multi_y_write_agrupado(self):
+        """Crear y reasignar varias visitas a la vez mantiene cada título."""
+        otro_inmueble = self.inmueble_model.create({"nombre": "Piso centro"})
+        visitas = self.visita_model.create(
+            [
+                {
+                    "cliente_id": cliente.id,
+                    "inmueble_id": self.inmueble.id,
+                    "start": self.start + timedelta(hours=offset),
+                    "stop": self.stop + timedelta(hours=offset),
+                }
+                for offset, cliente in enumerate(
+                    [self.partner, self.partner_alt, self.partner]
+                )
+            ]
+        )
+        self.assertEqual(
+            visitas.mapped("name"),
+            [
+                "Visita de Ana Cliente a Chalet demo",
+                "Visita de Luis Comprador a Chalet demo",
+                "Visita de Ana Cliente a Chalet demo",
+            ],
+        )
+
+        visitas.write({"inmueble_id": otro_inmueble.id})
+
+        self.assertEqual(
+            visitas.mapped("name"),
+            [
+                "Visita de Ana Cliente a Piso centro",
+                "Visita de Luis Comprador a Piso centro",
+                "Visita de Ana Cliente a Piso centro",
+            ],
+        )
+        for visita in visitas:
+            self.assertIn(self.category, visita.categ_ids)
+
+    def test_no_permite_solapar_visitas_del_mismo_inmueble(self):
+        """Dos visitas al mismo inmueble no pueden coincidir en el tiempo."""
+        self._create_visita()
+        with self.assertRaises(ValidationError):
+            self.visita_model.create(
+                {
+                    "cliente_id": self.partner_alt.id,
+                    "inmueble_id": self.inmueble.id,
+                    "start": self.start + timedelta(minutes=30),
+                    "stop": self.stop + timedelta(minutes=30),
+                }
+            )
+
+        contigua = self.visita_model.create(
+            {
+                "cliente_id": self.partner_alt.id,
+                "inmueble_id": self.inmueble.id,
+                "start": self.stop,
+                "stop": self.stop + timedelta(hours=1),
+            }
+        )
+        self.assertTrue(contigua)
+
+    def test_buscar_huecos_libres(self):
+        """Los huecos libres saltan las visitas ya concertadas."""
+        self._create_visita()
+        desde = self.start - timedelta(hours=1)
+        hasta = self.stop + timedelta(hours=1)
+
+        huecos = self.visita_model.buscar_huecos_libres(
+            self.inmueble.id, desde, hasta, duracion=60
+        )
+
+        self.assertEqual(
+            huecos,
+            [(desde, self.start), (self.stop, hasta)],
+        )
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+INICIO = datetime(2031, 3, 1, 10, 0)
+
+
+class TestVisitaLoteWizard(TransactionCase):
+    """Reparto de franjas de una jornada de visitas."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.inmuebles = cls.env["inmo.inmueble"].create(
+            [{"nombre": "Ático"}, {"nombre": "Bajo con patio"}]
+        )
+        cls.clientes = cls.env["res.partner"].create(
+            [{"name": "Ana"}, {"name": "Bruno"}, {"name": "Carla"}]
+        )
+        cls.agente2 = cls.env["res.users"].create(
+            {"name": "Agente dos", "login": "agente.jornada@example.com"}
+        )
+
+    def _wizard(self, **vals):
+        valores = {
+            "inmueble_ids": [(6, 0, self.inmuebles.ids)],
+            "cliente_ids": [(6, 0, self.clientes.ids)],
+            "inicio": INICIO,
+            "fin": INICIO + timedelta(hours=2),
+            "duracion": 30,
+        }
+        valores.update(vals)
+        return self.env["inmo.visita.lote.wizard"].create(valores)
+
+    def _sin_solapes(self, visitas, campo):
+        por_recurso = {}
+        for visita in visitas.sorted("start"):
+            anterior = por_recurso.get(visita[campo])
+            self.assertFalse(anterior and anterior.stop > visita.start)
+            por_recurso[visita[campo]] = visita
+
+    def test_reparto_completo(self):
+        """Con dos agentes caben todas las visitas y nadie coincide."""
+        wizard = self._wizard(user_ids=[(6, 0, [self.env.uid, self.agente2.id])])
+        wizard.action_confirm()
+
+        visitas = wizard.visita_ids
+        self.assertEqual(len(visitas), 6)
+        self.assertFalse(wizard.sin_hueco)
+        for campo in ("inmueble_id", "cliente_id", "user_id"):
+            self._sin_solapes(visitas, campo)
+        self.assertEqual(
+            set(visitas.mapped("user_id").ids), {self.env.uid, self.agente2.id}
+        )
+        visita = visitas.filtered(lambda v: v.cliente_id == self.clientes[0])[:1]
+        self.assertEqual(
+            visita.name, f"Visita de Ana a {visita.inmueble_id.display_name}"
+        )
+        self.assertIn(
+            self.env.ref("inmo_odoo.calendar_event_type_visita"), visita.categ_ids
+        )
+
+    def test_respeta_agenda_y_limites(self):
+        """Las visitas existentes bloquean sus franjas; lo que no cabe se lista."""
+        existente = self.env["calendar.event"].create(
+            {
+                "cliente_id": self.clientes[2].id,
+                "inmueble_id": self.inmuebles[0].id,
+                "user_id": self.agente2.id,
+                "start": INICIO,
+                "stop": INICIO + timedelta(minutes=45),
+            }
+        )
+        wizard = self._wizard()
+        wizard.action_confirm()
+
+        visitas = wizard.visita_ids
+        # Un único agente: cuatro franjas de 30 minutos en dos horas.
+        self.assertEqual(len(visitas), 4)
+        self.assertEqual(len(wizard.sin_hueco.splitlines()), 2)
+        self._sin_solapes(visitas | existente, "inmueble_id")
+        self._sin_solapes(visitas | existente, "cliente_id")
+        self._sin_solapes(visitas, "user_id")
+
+        with self.assertRaises(UserError):
+            self._wizard(fin=INICIO).action_confirm()
@@ -1 +1,9 @@
-from . import inmueble_catastro_wizard
+from . import (
+    foto_lote_wizard,
+    inmueble_catastro_callejero_wizard,
+    inmueble_catastro_lote_wizard,
+    inmueble_catastro_wizard,
+    inmueble_import_wizard,
+    metricas_panel,
+    visita_lote_wizard,
+)
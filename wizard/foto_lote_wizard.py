@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import base64
+import io
+import logging
+import os
+import re
+import zipfile
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+from ..models import foto_contenido
+from ..models.catastro_service import normalizar_referencia
+from ..models.parametros import leer_parametro
+
+_logger = logging.getLogger(__name__)
+
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+# Fotos y megas como máximo por subida, para no bloquear al servidor por error.
+MAX_FOTOS = 500
+MAX_TOTAL_MB = 1024
+
+
+def _clave_natural(nombre):
+    """Ordena `foto2` antes que `foto10`."""
+    return [
+        int(trozo) if trozo.isdigit() else trozo.lower()
+        for trozo in re.split(r"(\d+)", nombre)
+    ]
+
+
+def descripcion_de(nombre):
+    """Descripción a partir del nombre del archivo, sin el número de orden
+    inicial: `03_salon-comedor.jpg` da `Salon comedor`."""
+    base = os.path.splitext(os.path.basename(nombre))[0]
+    texto = re.sub(r"^\d+[\s._-]*", "", base)
+    texto = " ".join(re.split(r"[\s_-]+", texto)).strip()
+    return texto[:1].upper() + texto[1:] if texto else False
+
+
+class FotoLoteWizard(models.TransientModel):
+    """Sube de una vez las fotos de uno o varios inmuebles.
+
+    Admite un ZIP con una carpeta por referencia catastral, o archivos
+    sueltos para el inmueble indicado. Las fotos se crean con una sola
+    llamada y las imágenes las prepara después el cron de recompresión, así
+    que la petición solo lee sus cabeceras.
+    """
+
+    _name = "inmo.foto.lote.wizard"
+    _description = "Subida masiva de fotos"
+
+    inmueble_id = fields.Many2one(
+        comodel_name="inmo.inmueble",
+        string="Inmueble",
+        help="Recibe las fotos sueltas y las que no están en ninguna carpeta "
+        "del ZIP.",
+    )
+    archivo = fields.Binary(string="ZIP")
+    nombre_archivo = fields.Char(string="Nombre del archivo")
+    adjunto_ids = fields.Many2many(comodel_name="ir.attachment", string="Fotos")
+    estado = fields.Selection(
+        selection=[("borrador", "Borrador"), ("hecho", "Hecho")],
+        default="borrador",
+        required=True,
+    )
+    foto_ids = fields.Many2many(
+        comodel_name="inmo.inmueble.foto", string="Fotos creadas", readonly=True
+    )
+    total_inmuebles = fields.Integer(string="Inmuebles", readonly=True)
+    errores = fields.Text(string="No cargadas", readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        valores = super().default_get(fields_list)
+        ctx = self.env.context
+        if ctx.get("active_model") == "inmo.inmueble" and ctx.get("active_id"):
+            valores["inmueble_id"] = ctx["active_id"]
+        return valores
+
+    def action_confirm(self):
+        """Prepara las imágenes y crea todas las fotos."""
+        self.ensure_one()
+        errores = []
+        archivos = self._leer_archivos(errores)
+        if not archivos:
+            raise UserError("No hay ninguna imagen que cargar.")
+        destinos = self._destinos(archivos, errores)
+        archivos = [archivo for archivo in archivos if archivo[0] in destinos]
+
+        validas = []
+        for clave, nombre, datos in archivos:
+            if foto_contenido.comprobar_imagen(datos):
+                errores.append(f"{nombre}: no es una imagen válida.")
+            else:
+                validas.append((destinos[clave], nombre, datos))
+
+        fotos = self._crear_fotos(validas)
+        _logger.info(
+            "Subida de fotos: %s creadas, %s no cargadas", len(fotos), len(errores)
+        )
+        self.adjunto_ids.unlink()
+        self.write(
+            {
+                "estado": "hecho",
+                "archivo": False,
+                "foto_ids": [(6, 0, fotos.ids)],
+                "total_inmuebles": len(fotos.inmueble_id),
+                "errores": "\n".join(errores) or False,
+            }
+        )
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_ver_inmuebles(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Inmuebles con fotos nuevas",
+            "res_model": "inmo.inmueble",
+            "view_mode": "tree,form",
+            "domain": [("id", "in", self.foto_ids.inmueble_id.ids)],
+        }
+
+    def _leer_archivos(self, errores):
+        """Devuelve (carpeta, nombre, datos) de cada imagen, en orden natural
+        de nombre. Las fotos sueltas van sin carpeta."""
+        max_mb = leer_parametro(
+            self.env, foto_contenido.PARAM_MAX_MB, foto_contenido.FOTO_MAX_MB
+        )
+        max_bytes = max_mb * 1024 * 1024
+        adjuntos = self.adjunto_ids.filtered(
+            lambda a: self._es_imagen(a.name, a.file_size, max_bytes, errores)
+        )
+        comprimido = None
+        miembros = []
+        if self.archivo:
+            try:
+                comprimido = zipfile.ZipFile(io.BytesIO(base64.b64decode(self.archivo)))
+            except zipfile.BadZipFile as err:
+                raise UserError("El archivo no es un ZIP válido.") from err
+            for info in comprimido.infolist():
+                partes = info.filename.split("/")
+                if info.is_dir() or any(p.startswith((".", "__")) for p in partes):
+                    continue
+                if self._es_imagen(info.filename, info.file_size, max_bytes, errores):
+                    miembros.append(info)
+        # Los límites se comprueban con los tamaños declarados, antes de
+        # descomprimir nada.
+        if len(adjuntos) + len(miembros) > MAX_FOTOS:
+            raise UserError(f"Como máximo se pueden subir {MAX_FOTOS} fotos a la vez.")
+        total = sum(adjuntos.mapped("file_size")) + sum(i.file_size for i in miembros)
+        if total > MAX_TOTAL_MB * 1024 * 1024:
+            raise UserError(
+                f"Las fotos ocupan {total / 1048576:.0f} MB; como máximo se "
+                f"pueden subir {MAX_TOTAL_MB} MB a la vez."
+            )
+
+        archivos = [(None, adjunto.name, adjunto.raw) for adjunto in adjuntos]
+        if comprimido:
+            with comprimido:
+                for info in miembros:
+                    partes = info.filename.split("/")
+                    carpeta = partes[-2] if len(partes) > 1 else None
+                    archivos.append((carpeta, info.filename, comprimido.read(info)))
+        return sorted(archivos, key=lambda a: (a[0] or "", _clave_natural(a[1])))
+
+    def _es_imagen(self, nombre, tamano, max_bytes, errores):
+        if not nombre.lower().endswith(EXTENSIONES):
+            errores.append(f"{nombre}: no es una imagen.")
+            return False
+        if tamano > max_bytes:
+            errores.append(
+                f"{nombre}: ocupa {tamano / 1048576:.1f} MB; "
+                f"el máximo es {max_bytes // 1048576} MB."
+            )
+            return False
+        return True
+
+    def _destinos(self, archivos, errores):
+        """Inmueble de cada carpeta, buscando todas las referencias juntas;
+        las fotos sin carpeta van al inmueble del asistente."""
+        carpetas = {carpeta for carpeta, _nombre, _datos in archivos if carpeta}
+        referencias = {carpeta: normalizar_referencia(carpeta) for carpeta in carpetas}
+        por_referencia = {
+            inmueble.referencia_catastral: inmueble
+            for inmueble in self.env["inmo.inmueble"].search(
+                [("referencia_catastral", "in", list(set(referencias.values())))]
+            )
+        }
+        destinos = {}
+        for carpeta, refcat in referencias.items():
+            if refcat in por_referencia:
+                destinos[carpeta] = por_referencia[refcat]
+            else:
+                errores.append(
+                    f"{carpeta}/: no hay ningún inmueble con esa referencia."
+                )
+        if self.inmueble_id:
+            destinos[None] = self.inmueble_id
+        elif any(carpeta is None for carpeta, _nombre, _datos in archivos):
+            errores.append("Las fotos sueltas necesitan un inmueble de destino.")
+        return destinos
+
+    def _crear_fotos(self, validas):
+        """Crea las fotos detrás de las que ya tenga cada inmueble. La huella
+        es la del archivo original, como al subir una foto desde la ficha."""
+        if not validas:
+            return self.env["inmo.inmueble.foto"]
+        contenidos = self.env["inmo.foto.contenido"]._obtener_o_crear(
+            [base64.b64encode(datos) for _inmueble, _nombre, datos in validas],
+            diferir=True,
+        )
+        inmuebles = self.env["inmo.inmueble"].union(
+            *(inmueble for inmueble, _nombre, _datos in validas)
+        )
+        secuencias = {
+            inmueble.id: max(inmueble.fotos_ids.mapped("secuencia"), default=0)
+            for inmueble in inmuebles
+        }
+        vals_list = []
+        for (inmueble, nombre, _datos), contenido in zip(
+            validas, contenidos, strict=True
+        ):
+            secuencias[inmueble.id] += 10
+            vals_list.append(
+                {
+                    "inmueble_id": inmueble.id,
+                    "contenido_id": contenido.id,
+                    "secuencia": secuencias[inmueble.id],
+                    "descripcion": descripcion_de(nombre),
+                }
+            )
+        return self.env["inmo.inmueble.foto"].create(vals_list)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+
+from odoo import fields, models
+from odoo.exceptions import UserError
+
+from ..models import catastro_config as cfg
+from ..models import catastro_service
+
+_logger = logging.getLogger(__name__)
+
+
+class InmuebleCatastroCallejeroWizard(models.TransientModel):
+    """Da de alta como borradores todos los inmuebles de una calle o parcela.
+
+    Los portales se consultan en paralelo y se procesan según llegan; las
+    altas se hacen por lotes y se omiten las referencias ya registradas.
+    """
+
+    _name = "inmo.inmueble.catastro.callejero.wizard"
+    _description = "Prospección de inmuebles en Catastro"
+
+    modo = fields.Selection(
+        selection=[("calle", "Calle"), ("parcela", "Parcela")],
+        string="Buscar por",
+        default="calle",
+        required=True,
+    )
+    provincia = fields.Char(string="Provincia", help="Nombre según Catastro.")
+    municipio = fields.Char(string="Municipio", help="Nombre según Catastro.")
+    sigla = fields.Char(
+        string="Tipo de vía", default="CL", help="Sigla de Catastro: CL, AV, PZ..."
+    )
+    calle = fields.Char(string="Calle")
+    numero_desde = fields.Integer(string="Desde el número", default=1)
+    numero_hasta = fields.Integer(string="Hasta el número", default=1)
+    referencia_parcela = fields.Char(
+        string="Referencia de parcela",
+        help="Los 14 primeros caracteres de la referencia catastral.",
+    )
+    max_hilos = fields.Integer(
+        string="Consultas simultáneas", default=cfg.LOTE_MAX_HILOS
+    )
+    peticiones_por_segundo = fields.Float(
+        string="Peticiones por segundo",
+        default=cfg.LOTE_PETICIONES_POR_SEGUNDO,
+        help="Ritmo máximo de consultas a Catastro. 0 desactiva el límite.",
+    )
+    estado = fields.Selection(
+        selection=[("borrador", "Borrador"), ("hecho", "Hecho")],
+        default="borrador",
+        required=True,
+    )
+    total_encontrados = fields.Integer(string="Encontrados", readonly=True)
+    total_existentes = fields.Integer(string="Ya registrados", readonly=True)
+    inmueble_ids = fields.Many2many(
+        comodel_name="inmo.inmueble", string="Inmuebles creados", readonly=True
+    )
+    errores = fields.Text(string="Errores", readonly=True)
+
+    def action_confirm(self):
+        """Recorre Catastro y crea los inmuebles nuevos como borradores."""
+        self.ensure_one()
+        vistos = set()
+        pendientes = {}
+        creados = self.env["inmo.inmueble"]
+        resumen = {"encontrados": 0, "existentes": 0}
+        errores = []
+
+        for pagina, resultado in self._paginas():
+            if isinstance(resultado, UserError):
+                errores.append(f"{pagina}: {resultado}")
+                continue
+            for datos in resultado:
+                refcat = datos["referencia_catastral"]
+                if not refcat or refcat in vistos:
+                    continue
+                vistos.add(refcat)
+                pendientes[refcat] = datos
+            if len(pendientes) >= cfg.CALLEJERO_TAMANO_LOTE:
+                creados |= self._materializar(pendientes, resumen)
+                pendientes = {}
+        creados |= self._materializar(pendientes, resumen)
+
+        self.write(
+            {
+                "estado": "hecho",
+                "total_encontrados": resumen["encontrados"],
+                "total_existentes": resumen["existentes"],
+                "inmueble_ids": [(6, 0, creados.ids)],
+                "errores": "\n".join(errores) or False,
+            }
+        )
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_ver_inmuebles(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Inmuebles de Catastro",
+            "res_model": "inmo.inmueble",
+            "view_mode": "tree,form",
+            "domain": [("id", "in", self.inmueble_ids.ids)],
+        }
+
+    def _paginas(self):
+        """Genera (portal o parcela, inmuebles o error) según el modo."""
+        if self.modo == "parcela":
+            catastro_service.configurar_cliente(self.env)
+            yield (
+                self.referencia_parcela,
+                catastro_service.consulta_por_parcela(self.referencia_parcela or ""),
+            )
+            return
+
+        if not (self.provincia and self.municipio and self.calle):
+            raise UserError("Indique provincia, municipio y calle.")
+        if self.numero_desde < 1 or self.numero_hasta < self.numero_desde:
+            raise UserError("El rango de números no es válido.")
+        numeros = range(self.numero_desde, self.numero_hasta + 1)
+        if len(numeros) > cfg.CALLEJERO_MAX_PORTALES:
+            raise UserError(
+                f"Como máximo se pueden consultar {cfg.CALLEJERO_MAX_PORTALES} "
+                "números a la vez."
+            )
+        yield from catastro_service.recorrer_calle(
+            self.env,
+            self.provincia.strip().upper(),
+            self.municipio.strip().upper(),
+            (self.sigla or "").strip().upper(),
+            self.calle.strip().upper(),
+            numeros,
+            max_hilos=self.max_hilos,
+            peticiones_por_segundo=self.peticiones_por_segundo,
+        )
+
+    def _materializar(self, pendientes, resumen):
+        """Crea de una vez los inmuebles de `pendientes` que aún no existen."""
+        Inmueble = self.env["inmo.inmueble"]
+        if not pendientes:
+            return Inmueble
+        resumen["encontrados"] += len(pendientes)
+        existentes = set(
+            Inmueble.search([("referencia_catastral", "in", list(pendientes))]).mapped(
+                "referencia_catastral"
+            )
+        )
+        resumen["existentes"] += len(existentes)
+        nuevos = [
+            datos for refcat, datos in pendientes.items() if refcat not in existentes
+        ]
+        valores = catastro_service.mapear_campos_inmuebles(self.env, nuevos)
+        for datos, vals in zip(nuevos, valores, strict=True):
+            vals.update(
+                referencia_catastral=datos["referencia_catastral"], estado="borrador"
+            )
+        _logger.info("Prospección en Catastro: %s inmuebles nuevos", len(valores))
+        return Inmueble.create(valores)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+
+from odoo import Command, api, fields, models
+from odoo.exceptions import UserError
+
+from ..models import catastro_config as cfg
+from ..models import catastro_service, metricas
+
+_logger = logging.getLogger(__name__)
+
+
+class InmuebleCatastroLoteWizard(models.TransientModel):
+    """Asistente para completar con Catastro varios inmuebles a la vez."""
+
+    _name = "inmo.inmueble.catastro.lote.wizard"
+    _description = "Asistente Catastro para varios inmuebles"
+
+    inmueble_ids = fields.Many2many(
+        comodel_name="inmo.inmueble",
+        string="Inmuebles",
+        default=lambda self: self._default_inmueble_ids(),
+    )
+    max_hilos = fields.Integer(
+        string="Consultas simultáneas",
+        default=cfg.LOTE_MAX_HILOS,
+    )
+    peticiones_por_segundo = fields.Float(
+        string="Peticiones por segundo",
+        default=cfg.LOTE_PETICIONES_POR_SEGUNDO,
+        help="Ritmo máximo de consultas a Catastro. 0 desactiva el límite.",
+    )
+    estado = fields.Selection(
+        selection=[("borrador", "Borrador"), ("hecho", "Hecho")],
+        default="borrador",
+        required=True,
+    )
+    linea_ids = fields.One2many(
+        comodel_name="inmo.inmueble.catastro.lote.linea",
+        inverse_name="wizard_id",
+        string="Resultado",
+    )
+    total_ok = fields.Integer(string="Actualizados", compute="_compute_totales")
+    total_no_encontrado = fields.Integer(
+        string="No encontrados", compute="_compute_totales"
+    )
+    total_error = fields.Integer(string="Con error", compute="_compute_totales")
+
+    @api.model
+    def _default_inmueble_ids(self):
+        ctx = self.env.context
+        if ctx.get("active_model") == "inmo.inmueble" and ctx.get("active_ids"):
+            return [Command.set(ctx["active_ids"])]
+        return False
+
+    @api.depends("linea_ids.resultado")
+    def _compute_totales(self):
+        for wizard in self:
+            resultados = wizard.linea_ids.mapped("resultado")
+            wizard.total_ok = resultados.count("ok")
+            wizard.total_no_encontrado = resultados.count("no_encontrado")
+            wizard.total_error = resultados.count("error")
+
+    def action_confirm(self):
+        """Consulta Catastro para todos los inmuebles y aplica los resultados.
+
+        Los fallos se anotan por inmueble en lugar de abortar todo el lote.
+        """
+        self.ensure_one()
+        if not self.inmueble_ids:
+            raise UserError("Seleccione al menos un inmueble.")
+
+        referencias = {
+            inmueble.id: catastro_service.normalizar_referencia(
+                inmueble.referencia_catastral
+            )
+            for inmueble in self.inmueble_ids
+        }
+        respuestas = catastro_service.consulta_lote(
+            self.env,
+            referencias.values(),
+            max_hilos=self.max_hilos,
+            peticiones_por_segundo=self.peticiones_por_segundo,
+        )
+
+        correctas = {
+            refcat: respuesta
+            for refcat, respuesta in respuestas.items()
+            if not isinstance(respuesta, UserError)
+        }
+        valores_por_ref = dict(
+            zip(
+                correctas,
+                catastro_service.mapear_campos_inmuebles(self.env, correctas.values()),
+                strict=True,
+            )
+        )
+        lineas = []
+        huellas = {}
+        grupos = defaultdict(lambda: self.env["inmo.inmueble"])
+        for inmueble in self.inmueble_ids:
+            refcat = referencias[inmueble.id]
+            linea = {"inmueble_id": inmueble.id, "referencia_catastral": refcat}
+            respuesta = respuestas.get(refcat)
+            if not refcat:
+                linea.update(resultado="error", mensaje="Sin referencia catastral.")
+            elif isinstance(respuesta, catastro_service.CatastroNoEncontradoError):
+                linea.update(resultado="no_encontrado", mensaje=str(respuesta))
+            elif isinstance(respuesta, UserError):
+                linea.update(resultado="error", mensaje=str(respuesta))
+            else:
+                # La huella es distinta en cada inmueble: se guarda aparte
+                # para que los que cambian igual compartan escritura.
+                huella = catastro_service.huella(respuesta)
+                if inmueble.catastro_hash != huella:
+                    huellas[inmueble.id] = huella
+                cambios = inmueble._cambios(valores_por_ref[refcat])
+                if cambios:
+                    grupos[tuple(sorted(cambios.items()))] |= inmueble
+                else:
+                    linea["mensaje"] = "Sin cambios."
+                linea["resultado"] = "ok"
+            lineas.append(linea)
+
+        errores_escritura = {}
+        for valores, inmuebles in grupos.items():
+            try:
+                with (
+                    self.env.cr.savepoint(),
+                    metricas.medir("catastro.escritura", self.env),
+                ):
+                    inmuebles.write(dict(valores))
+            except (UserError, ValueError) as err:
+                _logger.warning("No se pudo actualizar %s: %s", inmuebles, err)
+                errores_escritura.update(dict.fromkeys(inmuebles.ids, str(err)))
+        self.env["inmo.inmueble"]._guardar_huellas(
+            {
+                inmueble_id: huella
+                for inmueble_id, huella in huellas.items()
+                if inmueble_id not in errores_escritura
+            }
+        )
+        for linea in lineas:
+            if linea["inmueble_id"] in errores_escritura:
+                linea.update(
+                    resultado="error", mensaje=errores_escritura[linea["inmueble_id"]]
+                )
+
+        self.write(
+            {
+                "estado": "hecho",
+                "linea_ids": [Command.clear()]
+                + [Command.create(linea) for linea in lineas],
+            }
+        )
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_encolar(self):
+        """Encola una consulta en segundo plano por cada inmueble."""
+        self.ensure_one()
+        jobs = self.env["inmo.catastro.job"]._encolar(self.inmueble_ids)
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "message": f"{len(jobs)} consulta(s) encoladas para Catastro.",
+                "type": "info",
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+
+class InmuebleCatastroLoteLinea(models.TransientModel):
+    """Resultado de la consulta a Catastro de un inmueble dentro de un lote."""
+
+    _name = "inmo.inmueble.catastro.lote.linea"
+    _description = "Resultado del lote de Catastro"
+
+    wizard_id = fields.Many2one(
+        comodel_name="inmo.inmueble.catastro.lote.wizard",
+        required=True,
+        ondelete="cascade",
+    )
+    inmueble_id = fields.Many2one(comodel_name="inmo.inmueble", string="Inmueble")
+    referencia_catastral = fields.Char(string="Referencia catastral")
+    resultado = fields.Selection(
+        selection=[
+            ("ok", "Actualizado"),
+            ("no_encontrado", "No encontrado"),
+            ("error", "Error"),
+        ],
+        string="Resultado",
+        required=True,
+    )
+    mensaje = fields.Char(string="Detalle")
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
 from odoo import fields, models
-from odoo.exceptions import UserError
 
-from ..models import catastro_service
+from ..models import catastro_service, metricas
 
 
 class InmuebleCatastroWizard(models.TransientModel):
@@ -23,13 +22,34 @@ class InmuebleCatastroWizard(models.TransientModel):
         """Consulta Catastro y actualiza los campos del inmueble asociado."""
         self.ensure_one()
 
-        referencia = (self.referencia_catastral or "").strip()
-        if not referencia:
-            raise UserError("Debe indicar una referencia catastral.")
+        # Sin salir a Catastro si la referencia no es válida; si la ficha ya
+        # la precargó, la respuesta está en caché.
+        referencia = catastro_service.validar_referencia(self.referencia_catastral)
 
-        datos = catastro_service.consulta_por_referencia(referencia)
+        datos = catastro_service.consulta_con_cache(self.env, referencia)
         valores = catastro_service.mapear_campos_inmueble(self.env, datos)
-        if valores:
-            self.inmueble_id.write(valores)
+        valores["catastro_hash"] = catastro_service.huella(datos)
+        cambios = self.inmueble_id._cambios(valores)
+        if cambios:
+            with metricas.medir("catastro.escritura", self.env):
+                self.inmueble_id.write(cambios)
 
         return {"type": "ir.actions.act_window_close"}
+
+    def action_encolar(self):
+        """Deja la consulta en la cola de Catastro y cierra sin esperar."""
+        self.ensure_one()
+
+        referencia = catastro_service.validar_referencia(self.referencia_catastral)
+
+        self.env["inmo.catastro.job"]._encolar(self.inmueble_id, referencia=referencia)
+
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "message": "La consulta a Catastro se hará en segundo plano.",
+                "type": "info",
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import base64
+import csv
+import io
+import logging
+import re
+import threading
+from collections import defaultdict
+from itertools import islice
+
+import psycopg2
+from odoo import Command, fields, models
+from odoo.exceptions import UserError, ValidationError
+
+from ..models import catastro_service
+from ..models.normalizacion import normalizar_texto
+
+_logger = logging.getLogger(__name__)
+
+# Cabeceras admitidas (normalizadas) para cada campo de `inmo.inmueble`.
+_COLUMNAS = {
+    "nombre": "nombre",
+    "nombre comercial": "nombre",
+    "referencia catastral": "referencia_catastral",
+    "referencia": "referencia_catastral",
+    "refcat": "referencia_catastral",
+    "estado": "estado",
+    "tipo": "tipo_inmueble",
+    "tipo de inmueble": "tipo_inmueble",
+    "tipo inmueble": "tipo_inmueble",
+    "calle": "calle",
+    "direccion": "calle",
+    "calle2": "calle2",
+    "complemento": "calle2",
+    "complemento direccion": "calle2",
+    "codigo postal": "codigo_postal",
+    "cp": "codigo_postal",
+    "ciudad": "ciudad",
+    "municipio": "ciudad",
+    "provincia": "provincia",
+    "superficie": "superficie_construida",
+    "superficie construida": "superficie_construida",
+    "superficie construida m2": "superficie_construida",
+    "m2": "superficie_construida",
+    "habitaciones": "habitaciones",
+    "banos": "banos",
+}
+_CAMPOS_ENTEROS = ("habitaciones", "banos")
+_MILES = re.compile(r"-?\d{1,3}(\.\d{3})+")
+
+
+class InmuebleImportWizard(models.TransientModel):
+    """Importa carteras de inmuebles desde CSV o XLSX.
+
+    Las filas se leen y se procesan por lotes: cada lote se valida, se
+    normaliza y se da de alta o se actualiza por referencia catastral con una
+    sola llamada a `create` y las mínimas a `write`.
+    """
+
+    _name = "inmo.inmueble.import.wizard"
+    _description = "Importación de inmuebles"
+
+    archivo = fields.Binary(string="Archivo", required=True)
+    nombre_archivo = fields.Char(string="Nombre del archivo")
+    tamano_lote = fields.Integer(string="Filas por lote", default=500)
+    enriquecer_catastro = fields.Boolean(
+        string="Completar con Catastro",
+        help="Encola una consulta a Catastro para las filas con referencia "
+        "catastral pero sin dirección.",
+    )
+    estado = fields.Selection(
+        selection=[("borrador", "Borrador"), ("hecho", "Hecho")],
+        default="borrador",
+        required=True,
+    )
+    total_filas = fields.Integer(string="Filas leídas", readonly=True)
+    filas_creadas = fields.Integer(string="Creados", readonly=True)
+    filas_actualizadas = fields.Integer(string="Actualizados", readonly=True)
+    filas_encoladas = fields.Integer(string="Enviados a Catastro", readonly=True)
+    porcentaje_cargadas = fields.Float(
+        string="Filas cargadas (%)",
+        readonly=True,
+        help="Filas creadas o actualizadas sobre el total leído.",
+    )
+    error_ids = fields.One2many(
+        comodel_name="inmo.inmueble.import.error",
+        inverse_name="wizard_id",
+        string="Errores",
+        readonly=True,
+    )
+
+    def action_importar(self):
+        """Procesa el archivo por lotes y muestra el resumen."""
+        self.ensure_one()
+        if self.tamano_lote <= 0:
+            raise UserError("El tamaño de lote debe ser mayor que cero.")
+
+        contenido = base64.b64decode(self.archivo or b"")
+        resumen = defaultdict(int)
+        errores = []
+        filas = self._leer_filas(contenido)
+        while lote := list(islice(filas, self.tamano_lote)):
+            self._procesar_lote(lote, resumen, errores)
+            resumen["leidas"] += len(lote)
+            _logger.info(
+                "Importación de inmuebles: %s filas procesadas", resumen["leidas"]
+            )
+            self._avisar_progreso(resumen, len(errores))
+
+        self.write(
+            {
+                "estado": "hecho",
+                "total_filas": resumen["leidas"],
+                "filas_creadas": resumen["creadas"],
+                "filas_actualizadas": resumen["actualizadas"],
+                "filas_encoladas": resumen["encoladas"],
+                "porcentaje_cargadas": 100.0
+                * (resumen["creadas"] + resumen["actualizadas"])
+                / (resumen["leidas"] or 1),
+                "error_ids": [Command.clear()]
+                + [Command.create(error) for error in errores],
+            }
+        )
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def _avisar_progreso(self, resumen, total_errores):
+        """Avisa al usuario del avance tras cada lote. Va en un cursor aparte
+        porque el de la importación no se confirma hasta el final."""
+        aviso = {
+            "title": "Importación de inmuebles",
+            "message": (
+                f"{resumen['leidas']} filas procesadas: "
+                f"{resumen['creadas']} creadas, "
+                f"{resumen['actualizadas']} actualizadas, "
+                f"{total_errores} con error."
+            ),
+            "type": "info",
+        }
+        if getattr(threading.current_thread(), "testing", False):
+            # En las pruebas no se confirma nada fuera de su transacción.
+            self.env["bus.bus"]._sendone(
+                self.env.user.partner_id, "simple_notification", aviso
+            )
+            return
+        with self.env.registry.cursor() as cr:
+            self.env(cr=cr)["bus.bus"]._sendone(
+                self.env.user.partner_id, "simple_notification", aviso
+            )
+
+    def _es_xlsx(self, contenido):
+        nombre = (self.nombre_archivo or "").lower()
+        return nombre.endswith(".xlsx") or contenido[:2] == b"PK"
+
+    def _leer_filas(self, contenido):
+        """Genera (número de fila, valores por campo) sin cargar todas las
+        filas en memoria."""
+        if self._es_xlsx(contenido):
+            filas = self._leer_xlsx(contenido)
+        else:
+            filas = self._leer_csv(contenido)
+        cabecera = next(filas, None)
+        if not cabecera:
+            raise UserError("El archivo está vacío.")
+        campos = [_COLUMNAS.get(normalizar_texto(str(col or ""))) for col in cabecera]
+        if not any(campos):
+            raise UserError(
+                "No se reconoce ninguna columna. Use, por ejemplo: nombre, "
+                "referencia catastral, calle, código postal, ciudad, provincia."
+            )
+        for numero, fila in enumerate(filas, start=2):
+            valores = {
+                campo: valor
+                for campo, valor in zip(campos, fila, strict=False)
+                if campo and valor not in (None, "")
+            }
+            if valores:
+                yield numero, valores
+
+    def _leer_csv(self, contenido):
+        texto = io.TextIOWrapper(io.BytesIO(contenido), encoding="utf-8-sig")
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=";,\t")
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(texto, dialecto)
+
+    def _leer_xlsx(self, contenido):
+        try:
+            import openpyxl
+        except ImportError as err:
+            raise UserError("Para importar XLSX es necesario openpyxl.") from err
+        libro = openpyxl.load_workbook(
+            io.BytesIO(contenido), read_only=True, data_only=True
+        )
+        try:
+            yield from libro.active.iter_rows(values_only=True)
+        finally:
+            libro.close()
+
+    def _procesar_lote(self, lote, resumen, errores):
+        """Valida un lote de filas y lo da de alta o lo actualiza."""
+        Inmueble = self.env["inmo.inmueble"]
+        Provincia = self.env["res.country.state"]
+        indice, espana_id = Provincia._inmo_indice_provincias()
+
+        validas = {}
+        sin_referencia = []
+        for numero, fila in lote:
+            try:
+                valores = self._validar_fila(fila, Provincia, indice, espana_id)
+            except ValidationError as err:
+                errores.append(self._error(numero, fila, str(err)))
+                continue
+            refcat = valores.get("referencia_catastral")
+            if refcat:
+                # Si la referencia se repite en el lote gana la última fila, y
+                # la sustituida se anota para que no se pierda sin aviso.
+                if refcat in validas:
+                    anterior, valores_anteriores = validas[refcat]
+                    errores.append(
+                        self._error(
+                            anterior,
+                            valores_anteriores,
+                            f"Referencia repetida: se usa la fila {numero}.",
+                        )
+                    )
+                validas[refcat] = (numero, valores)
+            else:
+                sin_referencia.append((numero, valores))
+
+        existentes = {
+            inmueble.referencia_catastral: inmueble
+            for inmueble in Inmueble.search(
+                [("referencia_catastral", "in", list(validas))]
+            )
+        }
+        nuevas = sin_referencia + [
+            fila for refcat, fila in validas.items() if refcat not in existentes
+        ]
+        creados = self._crear(nuevas, errores)
+        resumen["creadas"] += len(creados)
+
+        # Las filas se agrupan por lo que cambian (la referencia, que es
+        # distinta en cada una, no se escribe) para compartir `write`.
+        grupos = defaultdict(list)
+        actualizados = Inmueble
+        for refcat, (numero, valores) in validas.items():
+            if refcat not in existentes:
+                continue
+            inmueble = existentes[refcat]
+            cambios = inmueble._cambios(
+                {
+                    campo: valor
+                    for campo, valor in valores.items()
+                    if campo != "referencia_catastral"
+                }
+            )
+            if cambios:
+                grupos[tuple(sorted(cambios.items()))].append((numero, inmueble))
+            else:
+                actualizados |= inmueble
+        for valores, filas in grupos.items():
+            registros = Inmueble.concat(*(inmueble for _numero, inmueble in filas))
+            try:
+                with self.env.cr.savepoint():
+                    registros.write(dict(valores))
+            except (UserError, ValueError) as err:
+                for numero, inmueble in filas:
+                    errores.append(
+                        self._error(numero, {"nombre": inmueble.nombre}, str(err))
+                    )
+            else:
+                actualizados |= registros
+        resumen["actualizadas"] += len(actualizados)
+
+        if self.enriquecer_catastro:
+            sin_direccion = (creados | actualizados).filtered(
+                lambda i: i.referencia_catastral and not (i.calle and i.ciudad)
+            )
+            if sin_direccion:
+                jobs = self.env["inmo.catastro.job"]._encolar(sin_direccion)
+                resumen["encoladas"] += len(jobs)
+
+    def _crear(self, filas, errores):
+        """Crea todas las filas con un único `create`; si falla, las crea una
+        a una para aislar las que dan error."""
+        Inmueble = self.env["inmo.inmueble"]
+        if not filas:
+            return Inmueble
+        try:
+            with self.env.cr.savepoint():
+                return Inmueble.create([valores for _numero, valores in filas])
+        except (UserError, ValueError, psycopg2.IntegrityError):
+            _logger.info("Lote de importación con errores; se crea fila a fila.")
+
+        creados = Inmueble
+        for numero, valores in filas:
+            try:
+                with self.env.cr.savepoint():
+                    creados |= Inmueble.create(valores)
+            except (UserError, ValueError, psycopg2.IntegrityError) as err:
+                errores.append(self._error(numero, valores, str(err)))
+        return creados
+
+    def _validar_fila(self, fila, Provincia, indice, espana_id):
+        """Convierte una fila del archivo en valores para `inmo.inmueble`."""
+        valores = {
+            campo: str(valor).strip()
+            for campo, valor in fila.items()
+            if campo not in ("superficie_construida", *_CAMPOS_ENTEROS)
+        }
+        if "referencia_catastral" in valores:
+            refcat = catastro_service.normalizar_referencia(
+                valores["referencia_catastral"]
+            )
+            if refcat and not catastro_service.referencia_valida(refcat):
+                raise ValidationError(
+                    f"Referencia catastral no válida: {refcat}. Revise los "
+                    "dígitos de control."
+                )
+            valores["referencia_catastral"] = refcat or False
+
+        codigo_postal = valores.get("codigo_postal", "")
+        if codigo_postal.isdigit() and len(codigo_postal) < 5:
+            # Las hojas de cálculo suelen perder el cero inicial (08001 -> 8001).
+            valores["codigo_postal"] = codigo_postal.zfill(5)
+
+        Inmueble = self.env["inmo.inmueble"]
+        for campo in ("estado", "tipo_inmueble"):
+            if campo in valores:
+                valores[campo] = self._valor_seleccion(Inmueble, campo, valores[campo])
+
+        if "provincia" in valores:
+            nombre = valores.pop("provincia")
+            provincia_id = Provincia._inmo_resolver_provincia(nombre, indice=indice)
+            if not provincia_id:
+                raise ValidationError(f"Provincia desconocida: {nombre}")
+            valores.update(provincia=provincia_id, id_pais=espana_id)
+
+        if "superficie_construida" in fila:
+            valores["superficie_construida"] = self._numero(
+                fila["superficie_construida"], float, "superficie"
+            )
+        for campo in _CAMPOS_ENTEROS:
+            if campo in fila:
+                valores[campo] = self._numero(fila[campo], int, campo)
+        return valores
+
+    def _valor_seleccion(self, Inmueble, campo, valor):
+        """Acepta la clave o la etiqueta de una opción de selección."""
+        opciones = {}
+        for clave, etiqueta in Inmueble._fields[campo].selection:
+            opciones[normalizar_texto(clave)] = clave
+            opciones[normalizar_texto(etiqueta)] = clave
+        clave = opciones.get(normalizar_texto(valor))
+        if not clave:
+            raise ValidationError(
+                f"Valor no válido para {Inmueble._fields[campo].string}: {valor}"
+            )
+        return clave
+
+    def _numero(self, valor, tipo, nombre):
+        if isinstance(valor, int | float):
+            return tipo(valor)
+        texto = str(valor).strip().replace(" ", "")
+        if "," in texto or _MILES.fullmatch(texto):
+            # Coma decimal ("89,5", "1.200,5") o solo puntos de miles ("1.200").
+            texto = texto.replace(".", "").replace(",", ".")
+        try:
+            return tipo(float(texto))
+        except ValueError as err:
+            raise ValidationError(
+                f"Valor numérico no válido en {nombre}: {valor}"
+            ) from err
+
+    def _error(self, numero, fila, mensaje):
+        return {
+            "fila": numero,
+            "referencia_catastral": fila.get("referencia_catastral") or False,
+            "nombre": fila.get("nombre") or False,
+            "mensaje": mensaje,
+        }
+
+
+class InmuebleImportError(models.TransientModel):
+    """Fila del archivo de importación que no se pudo cargar."""
+
+    _name = "inmo.inmueble.import.error"
+    _description = "Error de importación de inmuebles"
+    _order = "fila"
+
+    wizard_id = fields.Many2one(
+        comodel_name="inmo.inmueble.import.wizard",
+        required=True,
+        ondelete="cascade",
+    )
+    fila = fields.Integer(string="Fila")
+    referencia_catastral = fields.Char(string="Referencia catastral")
+    nombre = fields.Char(string="Nombre")
+    mensaje = fields.Char(string="Error")
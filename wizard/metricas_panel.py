@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from odoo import Command, api, fields, models
+
+from ..models import metricas
+
+
+class MetricasPanel(models.TransientModel):
+    """Panel con las métricas acumuladas por el proceso que atiende la
+    petición (con varios workers cada uno lleva las suyas)."""
+
+    _name = "inmo.metricas.panel"
+    _description = "Métricas de rendimiento"
+
+    activas = fields.Boolean(string="Métricas activas", readonly=True)
+    ratio_cache = fields.Float(string="Aciertos de caché (%)", readonly=True)
+    operacion_ids = fields.One2many(
+        comodel_name="inmo.metricas.linea",
+        inverse_name="panel_id",
+        string="Operaciones",
+        domain=[("tipo", "=", "operacion")],
+        readonly=True,
+    )
+    contador_ids = fields.One2many(
+        comodel_name="inmo.metricas.linea",
+        inverse_name="panel_id",
+        string="Contadores",
+        domain=[("tipo", "=", "contador")],
+        readonly=True,
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        valores = super().default_get(fields_list)
+        datos = metricas.instantanea()
+        cache = {
+            dict(etiquetas)["resultado"]: valor
+            for (nombre, etiquetas), valor in datos["contadores"].items()
+            if nombre == "catastro_cache"
+        }
+        total_cache = sum(cache.values())
+        operaciones = [
+            {
+                "tipo": "operacion",
+                "nombre": nombre,
+                "llamadas": tramo.llamadas,
+                "total_ms": tramo.segundos * 1000,
+                "media_ms": tramo.segundos * 1000 / tramo.llamadas,
+                "max_ms": tramo.maximo * 1000,
+                "consultas_sql": tramo.consultas_sql,
+                "errores": tramo.errores,
+            }
+            for nombre, tramo in sorted(datos["tramos"].items())
+            if tramo.llamadas
+        ]
+        contadores = [
+            {
+                "tipo": "contador",
+                "nombre": nombre,
+                "etiquetas": ", ".join(f"{k}={v}" for k, v in etiquetas),
+                "llamadas": valor,
+            }
+            for (nombre, etiquetas), valor in sorted(datos["contadores"].items())
+        ]
+        valores.update(
+            activas=metricas.sincronizar(self.env),
+            ratio_cache=(
+                100.0 * (total_cache - cache.get("fallos", 0)) / total_cache
+                if total_cache
+                else 0.0
+            ),
+            operacion_ids=[Command.create(linea) for linea in operaciones],
+            contador_ids=[Command.create(linea) for linea in contadores],
+        )
+        return valores
+
+    def action_actualizar(self):
+        return self._reabrir()
+
+    def action_reiniciar(self):
+        metricas.reiniciar()
+        return self._reabrir()
+
+    def action_activar(self):
+        self._cambiar_estado(True)
+        return self._reabrir()
+
+    def action_desactivar(self):
+        self._cambiar_estado(False)
+        return self._reabrir()
+
+    def _cambiar_estado(self, activas):
+        self.env["ir.config_parameter"].sudo().set_param(
+            metricas.PARAM_ACTIVAS, str(activas)
+        )
+        metricas.sincronizar(self.env)
+
+    def _reabrir(self):
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Métricas de rendimiento",
+            "res_model": self._name,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+
+class MetricasLinea(models.TransientModel):
+    """Una operación medida o un contador del panel de métricas."""
+
+    _name = "inmo.metricas.linea"
+    _description = "Línea del panel de métricas"
+
+    panel_id = fields.Many2one(
+        comodel_name="inmo.metricas.panel",
+        required=True,
+        ondelete="cascade",
+    )
+    tipo = fields.Selection(
+        selection=[("operacion", "Operación"), ("contador", "Contador")],
+        string="Tipo",
+        required=True,
+    )
+    nombre = fields.Char(string="Nombre")
+    etiquetas = fields.Char(string="Etiquetas")
+    llamadas = fields.Integer(string="Llamadas")
+    total_ms = fields.Float(string="Total (ms)", digits=(16, 1))
+    media_ms = fields.Float(string="Media (ms)", digits=(16, 2))
+    max_ms = fields.Float(string="Máximo (ms)", digits=(16, 2))
+    consultas_sql = fields.Integer(string="Consultas SQL")
+    errores = fields.Integer(string="Errores")
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Visitas como máximo por jornada, para no bloquear la agenda por error.
+MAX_VISITAS = 500
+
+
+class VisitaLoteWizard(models.TransientModel):
+    """Programa de una vez las visitas de una jornada de puertas abiertas.
+
+    Cada cliente visita cada inmueble en una franja en la que ni el inmueble,
+    ni el cliente, ni el agente asignado tienen otra visita. El reparto se
+    hace en una sola pasada y las visitas se crean con una única llamada.
+    """
+
+    _name = "inmo.visita.lote.wizard"
+    _description = "Programar jornada de visitas"
+
+    inmueble_ids = fields.Many2many(
+        comodel_name="inmo.inmueble", string="Inmuebles", required=True
+    )
+    cliente_ids = fields.Many2many(
+        comodel_name="res.partner", string="Clientes", required=True
+    )
+    user_ids = fields.Many2many(
+        comodel_name="res.users",
+        string="Agentes",
+        required=True,
+        default=lambda self: self.env.user,
+    )
+    inicio = fields.Datetime(string="Desde", required=True)
+    fin = fields.Datetime(string="Hasta", required=True)
+    duracion = fields.Integer(string="Duración (min)", default=30, required=True)
+    pausa = fields.Integer(
+        string="Pausa entre visitas (min)",
+        default=0,
+        help="Margen que se deja libre tras cada franja.",
+    )
+    estado = fields.Selection(
+        selection=[("borrador", "Borrador"), ("hecho", "Hecho")],
+        default="borrador",
+        required=True,
+    )
+    visita_ids = fields.Many2many(
+        comodel_name="calendar.event", string="Visitas creadas", readonly=True
+    )
+    sin_hueco = fields.Text(string="Sin hueco", readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        valores = super().default_get(fields_list)
+        ctx = self.env.context
+        if ctx.get("active_model") == "inmo.inmueble" and ctx.get("active_ids"):
+            valores["inmueble_ids"] = [(6, 0, ctx["active_ids"])]
+        return valores
+
+    def action_confirm(self):
+        """Reparte las franjas y crea todas las visitas."""
+        self.ensure_one()
+        vals_list, pendientes = self._asignar()
+        visitas = self.env["calendar.event"].create(vals_list)
+        _logger.info(
+            "Jornada de visitas: %s creadas, %s sin hueco",
+            len(visitas),
+            len(pendientes),
+        )
+        self.write(
+            {
+                "estado": "hecho",
+                "visita_ids": [(6, 0, visitas.ids)],
+                "sin_hueco": "\n".join(
+                    f"{cliente.display_name} - {inmueble.display_name}"
+                    for cliente, inmueble in pendientes
+                )
+                or False,
+            }
+        )
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_ver_visitas(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Visitas programadas",
+            "res_model": "calendar.event",
+            "view_mode": "calendar,tree,form",
+            "domain": [("id", "in", self.visita_ids.ids)],
+            "context": {"initial_date": fields.Datetime.to_string(self.inicio)},
+        }
+
+    def _asignar(self):
+        """Devuelve los valores de las visitas y los pares (cliente, inmueble)
+        que no caben en la jornada.
+
+        Cada cliente empieza por un inmueble distinto para que no coincidan
+        todos en el primero; a igualdad, la visita va al agente con menos.
+        """
+        if self.fin <= self.inicio or self.duracion <= 0 or self.pausa < 0:
+            raise UserError("Revise el horario, la duración y la pausa.")
+        inmuebles, clientes, agentes = (
+            self.inmueble_ids,
+            self.cliente_ids,
+            self.user_ids,
+        )
+        if len(inmuebles) * len(clientes) > MAX_VISITAS:
+            raise UserError(f"Como máximo se pueden programar {MAX_VISITAS} visitas.")
+
+        duracion = timedelta(minutes=self.duracion)
+        paso = timedelta(minutes=self.duracion + self.pausa)
+        franjas = []
+        comienzo = self.inicio
+        while comienzo + duracion <= self.fin:
+            franjas.append(comienzo)
+            comienzo += paso
+
+        ocupadas = defaultdict(set)
+        intervalos = self.env["calendar.event"]._inmo_intervalos_ocupados(
+            self.inicio,
+            self.fin,
+            inmueble_ids=inmuebles.ids,
+            user_ids=agentes.ids,
+            cliente_ids=clientes.ids,
+        )
+        for clave, lista in intervalos.items():
+            for desde, hasta in lista:
+                ocupadas[clave].update(
+                    self._franjas_solapadas(desde, hasta, len(franjas))
+                )
+
+        carga = Counter()
+        vals_list, pendientes = [], []
+        for n, cliente in enumerate(clientes):
+            desplazamiento = n % len(inmuebles)
+            for inmueble in inmuebles[desplazamiento:] + inmuebles[:desplazamiento]:
+                claves = (("inmueble", inmueble.id), ("cliente", cliente.id))
+                for indice, comienzo in enumerate(franjas):
+                    if any(indice in ocupadas[clave] for clave in claves):
+                        continue
+                    libres = [
+                        agente
+                        for agente in agentes
+                        if indice not in ocupadas[("agente", agente.id)]
+                    ]
+                    if not libres:
+                        continue
+                    agente = min(libres, key=lambda a: (carga[a.id], a.id))
+                    carga[agente.id] += 1
+                    for clave in (*claves, ("agente", agente.id)):
+                        ocupadas[clave].add(indice)
+                    vals_list.append(
+                        {
+                            "cliente_id": cliente.id,
+                            "inmueble_id": inmueble.id,
+                            "user_id": agente.id,
+                            "start": comienzo,
+                            "stop": comienzo + duracion,
+                        }
+                    )
+                    break
+                else:
+                    pendientes.append((cliente, inmueble))
+        return vals_list, pendientes
+
+    def _franjas_solapadas(self, desde, hasta, total):
+        """Índices de las franjas que se solapan con el intervalo dado."""
+        duracion = timedelta(minutes=self.duracion)
+        paso = timedelta(minutes=self.duracion + self.pausa)
+        primera = math.floor((desde - self.inicio - duracion) / paso) + 1
+        ultima = math.ceil((hasta - self.inicio) / paso) - 1
+        return range(max(0, primera), min(total - 1, ultima) + 1)